@@ -8,10 +8,13 @@ from .vector import (
     vector_to_axis,
     m2rotaxis,
     rotaxis2m,
+    apply_transformations,
 )
 from .atom import Atom, DisorderedAtom
 from .residue import Residue, DisorderedResidue
 from .chain import Chain
 from .model import Model
+from .atom_store import AtomStore
+from .selection import AtomSelection, select_mask, extract_atoms
 from .structure import Structure
 from .structure_builder import StructureBuilder
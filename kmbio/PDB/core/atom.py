@@ -6,6 +6,7 @@
 
 import copy
 import logging
+from types import MappingProxyType
 
 import numpy as np
 from Bio.Data import IUPACData
@@ -15,10 +16,28 @@ from .vector import Vector
 
 logger = logging.getLogger(__name__)
 
+_NO_CHILDREN = MappingProxyType({})
+
 
 class Atom(Entity):
     level = "A"
 
+    __slots__ = (
+        "name",
+        "fullname",
+        "_coord",
+        "_bfactor",
+        "_occupancy",
+        "altloc",
+        "serial_number",
+        "disordered",
+        "anisou_array",
+        "siguij_array",
+        "sigatm_array",
+        "element",
+        "mass",
+    )
+
     def __init__(
         self,
         name,
@@ -29,7 +48,6 @@ class Atom(Entity):
         fullname,
         serial_number,
         element=None,
-        **kwargs,
     ):
         """Create Atom object.
 
@@ -60,18 +78,21 @@ class Atom(Entity):
         @param element: atom element, e.g. "C" for Carbon, "HG" for mercury,
         @type element: uppercase string (or None if unknown)
         """
-        super().__init__(name, **kwargs)
+        # Atoms have no children, so `Entity.__init__` (which creates the child dict) is skipped
+        self._id = name  # id of atom is the atom name (e.g. "CA")
+        self._full_id = None
+        self._xtra = None
+        self._init_store()
         # Reference to the residue
         self.parent = None
         # the atomic data
         self.name = name  # eg. CA, spaces are removed from atom name
         self.fullname = fullname  # e.g. " CA ", spaces included
-        self.coord = coord
-        self.bfactor = bfactor
-        self.occupancy = occupancy
+        # A new atom is not part of a store, so its data can be set directly
+        self._coord = np.asarray(coord, dtype=np.float64)
+        self._bfactor = bfactor
+        self._occupancy = occupancy
         self.altloc = altloc
-        self._full_id = None  # (structure id, model id, chain id, residue id, atom id)
-        self._id = name  # id of atom is the atom name (e.g. "CA")
         self.disordered = 0
         self.anisou_array = None
         self.siguij_array = None
@@ -85,20 +106,7 @@ class Atom(Entity):
     def _assign_element(self, element):
         """Tries to guess element from atom name if not recognised."""
         if not element or element.capitalize() not in IUPACData.atom_weights:
-            # Inorganic elements have their name shifted left by one position
-            #  (is a convention in PDB, but not part of the standard).
-            # isdigit() check on last two characters to avoid mis-assignment of
-            # hydrogens atoms (GLN HE21 for example)
-
-            if self.fullname[0].isalpha() and not self.fullname[2:].isdigit():
-                putative_element = self.name.strip()
-            else:
-                # Hs may have digit in [0]
-                if self.name[0].isdigit():
-                    putative_element = self.name[1]
-                else:
-                    putative_element = self.name[0]
-
+            putative_element = _guess_element(self.name, self.fullname)
             if putative_element.capitalize() in IUPACData.atom_weights:
                 msg = "Used element %r for Atom (name=%s) with given element %r" % (
                     putative_element,
@@ -128,6 +136,60 @@ class Atom(Entity):
         """Print Atom object as <Atom atom_name>."""
         return "<Atom %s>" % self.id
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["_coord"] = np.array(self.coord, dtype=np.float64)
+        state["_bfactor"] = self.bfactor
+        state["_occupancy"] = self.occupancy
+        return state
+
+    @property
+    def _children(self):
+        """Atoms have no children."""
+        return _NO_CHILDREN
+
+    # Per-atom data, which lives in the structure's `AtomStore` once it has been packed
+
+    @property
+    def coord(self):
+        """Atomic coordinates (x, y, z)."""
+        return self._coord
+
+    @coord.setter
+    def coord(self, coord):
+        if self._store is None:
+            self._coord = np.asarray(coord, dtype=np.float64)
+        else:
+            self._coord[:] = coord
+
+    @property
+    def bfactor(self):
+        """Isotropic B factor."""
+        if self._store is None:
+            return self._bfactor
+        return self._store.bfactor[self._store_start]
+
+    @bfactor.setter
+    def bfactor(self, bfactor):
+        if self._store is None:
+            self._bfactor = bfactor
+        else:
+            self._store.bfactor[self._store_start] = bfactor
+
+    @property
+    def occupancy(self):
+        """Occupancy (0.0-1.0)."""
+        if self._store is None:
+            return self._occupancy
+        return self._store.occupancy[self._store_start]
+
+    @occupancy.setter
+    def occupancy(self, occupancy):
+        if self._store is None:
+            self._occupancy = occupancy
+        else:
+            self._store.occupancy[self._store_start] = occupancy
+
     def __sub__(self, other):
         """Calculate distance between two atoms.
 
@@ -194,13 +256,27 @@ class Atom(Entity):
         Parent information is lost.
         """
         # Do a shallow copy then explicitly copy what needs to be deeper.
+        # `__getstate__` detaches the copy from the store and copies the coordinates.
         shallow = copy.copy(self)
         shallow.parent = None
-        shallow.coord = copy.copy(self.coord)
-        shallow.xtra = self.xtra.copy()
+        shallow._xtra = self._xtra.copy() if self._xtra is not None else None
         return shallow
 
 
+def _guess_element(name, fullname):
+    """Guess the element of an atom from its name and full name (with spaces)."""
+    # Inorganic elements have their name shifted left by one position
+    #  (is a convention in PDB, but not part of the standard).
+    # isdigit() check on last two characters to avoid mis-assignment of
+    # hydrogens atoms (GLN HE21 for example)
+    if fullname[0].isalpha() and not fullname[2:].isdigit():
+        return name.strip()
+    # Hs may have digit in [0]
+    if name[0].isdigit():
+        return name[1]
+    return name[0]
+
+
 class DisorderedAtom(DisorderedEntityWrapper):
     """Contains all Atom objects that represent the same disordered atom.
 
@@ -0,0 +1,212 @@
+"""Columnar storage for the per-atom data of a structure."""
+import logging
+from typing import Dict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class AtomStore:
+    """Contiguous arrays holding the coordinates, B-factors and occupancies of a structure.
+
+    Atoms are laid out in hierarchy order (model, chain, residue, atom), with the siblings
+    of disordered residues and atoms stored next to each other. This means that the atoms
+    of every entity in the structure occupy a contiguous slice of the store, which is
+    recorded in the ``_store_start`` and ``_store_stop`` attributes of that entity.
+
+    The ``coord`` attribute of every packed atom is a view into :attr:`coord`,
+    and the ``bfactor`` and ``occupancy`` attributes read from and write to
+    :attr:`bfactor` and :attr:`occupancy`. Changes made through either the object API
+    or the arrays are therefore visible in both places.
+
+    Attributes:
+        atoms: List of atoms in the order in which they are stored.
+        coord: ``(N, 3)`` array of atomic coordinates.
+        bfactor: ``(N,)`` array of isotropic B-factors.
+        occupancy: ``(N,)`` array of occupancies.
+        valid: ``False`` if atoms were added to or removed from the structure
+            after the store was created.
+        residues: List of (unpacked) residues in the order in which they are stored.
+        residue_index: ``(N,)`` array with the index (into :attr:`residues`) of the residue
+            that every atom belongs to.
+        chains: List of chains in the order in which they are stored.
+        models: List of models in the order in which they are stored.
+    """
+
+    def __init__(self, atoms, coord=None, bfactor=None, occupancy=None):
+        self.atoms = atoms
+        if coord is None:
+            coord = np.array([atom.coord for atom in atoms], dtype=np.float64).reshape(-1, 3)
+        if bfactor is None:
+            bfactor = np.array([atom.bfactor for atom in atoms], dtype=np.float64)
+        if occupancy is None:
+            occupancy = np.array([atom.occupancy for atom in atoms], dtype=np.float64)
+        self.coord = coord
+        self.bfactor = bfactor
+        self.occupancy = occupancy
+        self.valid = True
+        self.residues = []
+        self.residue_index = np.zeros(len(atoms), dtype=np.int64)
+        self.chains = []
+        self.models = []
+        self._annotations = None
+        self._residue_selected = None
+
+    def __repr__(self):
+        return "<AtomStore n_atoms=%i valid=%s>" % (len(self), self.valid)
+
+    def __len__(self):
+        return len(self.atoms)
+
+    @classmethod
+    def from_entity(cls, entity) -> "AtomStore":
+        """Pack all atoms in `entity` (a structure, model, chain or residue) into a new store.
+
+        Every entity in the subtree gets a reference to the store and the bounds of its
+        slice, and every atom is rebound so that its data lives inside the store.
+        """
+        atoms = []
+        bounds = []
+        _collect_atoms(entity, atoms, bounds)
+        store = cls(atoms)
+        for child, start, stop in bounds:
+            child._store = store
+            child._store_start = start
+            child._store_stop = stop
+        coord = store.coord
+        for i, atom in enumerate(atoms):
+            atom._store = store
+            atom._store_start = i
+            atom._store_stop = i + 1
+            atom._coord = coord[i]
+        residue_bounds = [
+            (child, start, stop) for child, start, stop in bounds if child.level == "R"
+        ]
+        store.residues = [residue for residue, _, _ in residue_bounds]
+        store.residue_index = np.repeat(
+            np.arange(len(residue_bounds), dtype=np.int64),
+            [stop - start for _, start, stop in residue_bounds],
+        )
+        store.chains = [child for child, _, _ in bounds if child.level == "C"]
+        store.models = [child for child, _, _ in bounds if child.level == "M"]
+        logger.debug("Packed %i atoms of %s.", len(atoms), entity)
+        return store
+
+    @property
+    def annotations(self) -> Dict[str, np.ndarray]:
+        """Per-atom annotation columns, computed the first time that they are accessed.
+
+        Residue, chain and model attributes are broadcast to all atoms using
+        :attr:`residue_index`, so only the atom-level attributes require a pass over the atoms.
+
+        Columns:
+            - ``model_idx``, ``chain_idx``: Index of the model / chain, in storage order.
+            - ``model_id``, ``chain_id``: Ids of the model / chain.
+            - ``hetflag``, ``resseq``, ``icode``: The three parts of the residue id.
+            - ``resname``: Residue name.
+            - ``name``, ``altloc``, ``element``: Atom name, alternate location (stripped of
+              whitespace) and element.
+            - ``selected_sibling``: ``False`` for atoms which are hidden behind another
+              (selected) sibling of a disordered atom or residue.
+        """
+        if self._annotations is None:
+            self._annotations = self._annotate()
+        return self._annotations
+
+    def _annotate(self):
+        residues = self.residues
+        chain_idxs, chain_ids = _index_parents(residues, self.chains)
+        chains = [residue.parent for residue in residues]
+        model_idxs, model_ids = _index_parents(chains, self.models)
+        self._residue_selected = _is_selected_sibling(residues)
+        residue_columns = {
+            "model_idx": model_idxs,
+            "model_id": model_ids,
+            "chain_idx": chain_idxs,
+            "chain_id": chain_ids,
+            "hetflag": np.array([residue.id[0] for residue in residues], dtype=str),
+            "resseq": np.array([residue.id[1] for residue in residues], dtype=np.int64),
+            "icode": np.array([residue.id[2] for residue in residues], dtype=str),
+            "resname": np.array([residue.resname for residue in residues], dtype=str),
+        }
+        annotations = {
+            key: value[self.residue_index] for key, value in residue_columns.items()
+        }
+        atoms = self.atoms
+        annotations["name"] = np.array([atom.name for atom in atoms], dtype=str)
+        annotations["altloc"] = np.array([atom.altloc.strip() for atom in atoms], dtype=str)
+        annotations["element"] = np.array([atom.element or "" for atom in atoms], dtype=str)
+        annotations["selected_sibling"] = (
+            _is_selected_sibling(atoms) & self._residue_selected[self.residue_index]
+        )
+        return annotations
+
+    def invalidate(self):
+        """Mark the store as out of date with respect to the structure hierarchy."""
+        self.valid = False
+
+
+def _remap_bonds(bonds, bond_orders, index):
+    """Map the atom indices of `bonds` to new indices, dropping bonds of atoms which are gone.
+
+    Args:
+        bonds: ``(M, 2)`` array of bonded atoms, as indices into a store.
+        bond_orders: ``(M,)`` array with the order of every bond (or `None`).
+        index: Array with the new index of every atom in the store, or ``-1``
+            for atoms which are no longer present.
+
+    Returns:
+        Tuple of the remapped bonds and bond orders.
+    """
+    bonds = np.asarray(index)[bonds]
+    keep = (bonds >= 0).all(axis=1)
+    return bonds[keep], bond_orders[keep] if bond_orders is not None else None
+
+
+def _collect_atoms(entity, atoms, bounds):
+    """Append the atoms of `entity` to `atoms` and the slices of its subtree to `bounds`."""
+    start = len(atoms)
+    if entity.level == "R":
+        atoms.extend(entity.get_unpacked_list())
+    else:
+        children = entity.get_unpacked_list() if entity.level == "C" else entity
+        for child in children:
+            _collect_atoms(child, atoms, bounds)
+    bounds.append((entity, start, len(atoms)))
+
+
+def _index_parents(children, parents=()):
+    """Return, for every child, the index and the id of its parent.
+
+    Parents are numbered in the order given by `parents`, followed by any other parents
+    in order of appearance.
+    """
+    parent_to_idx = {id(parent): i for i, parent in enumerate(parents)}
+    parent_ids = [parent.id for parent in parents]
+    idxs = np.empty(len(children), dtype=np.int64)
+    for i, child in enumerate(children):
+        parent = child.parent if child is not None else None
+        key = id(parent)
+        if key not in parent_to_idx:
+            parent_to_idx[key] = len(parent_to_idx)
+            parent_ids.append(parent.id if parent is not None else None)
+        idxs[i] = parent_to_idx[key]
+    if not parent_ids or None in parent_ids:
+        ids = np.empty(len(parent_ids), dtype=object)
+        ids[:] = parent_ids
+    else:
+        ids = np.array(parent_ids)
+    return idxs, ids[idxs]
+
+
+def _is_selected_sibling(entities):
+    """Return a mask which is ``False`` for the non-selected siblings of disordered entities."""
+    is_selected = np.ones(len(entities), dtype=bool)
+    for i, entity in enumerate(entities):
+        if entity.parent is None:
+            continue
+        wrapper = entity.parent._children.get(entity.id, entity)
+        if wrapper is not entity:
+            is_selected[i] = getattr(wrapper, "selected_sibling", None) is entity
+    return is_selected
@@ -11,9 +11,15 @@ import logging
 from abc import abstractmethod
 from collections import OrderedDict
 from copy import copy
+from functools import lru_cache
+
+import numpy as np
 
 from kmbio.PDB.exceptions import PDBConstructionException
 
+from .atom_store import AtomStore
+from .vector import apply_transformations
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,18 +27,31 @@ class Entity:
     """
     Basic container object. Structure, Model, Chain and Residue
     are subclasses of Entity. It deals with storage and lookup.
+
+    Entity, Residue and Atom use ``__slots__``, because there are many of them.
+    Subclasses which do not define ``__slots__`` (Chain, Model and Structure)
+    get a regular instance ``__dict__``.
     """
 
+    __slots__ = ("_id", "_full_id", "parent", "_xtra", "_store", "_store_start", "_store_stop")
+
     def __init__(self, id, children=None):
         self._id = id
         self._full_id = None
         self.parent = None
         self._children = OrderedDict()
-        # Dictionary that keeps additional properties
-        self.xtra = {}
+        # Dictionary that keeps additional properties (created on first access)
+        self._xtra = None
+        self._init_store()
         if children is not None:
             self.add(children)
 
+    def _init_store(self):
+        # Columnar store holding the atoms of this entity (see `Structure.pack`)
+        self._store = None
+        self._store_start = None
+        self._store_stop = None
+
     # Special methods
 
     def __getitem__(self, id):
@@ -48,6 +67,7 @@ class Entity:
         """Remove a child."""
         child = self._children.pop(id)
         child.parent = None
+        self._invalidate_store()
 
     def __contains__(self, id):
         """True if there is a child element with the given id."""
@@ -61,8 +81,43 @@ class Entity:
         """Return the number of children."""
         return len(self._children)
 
+    def __getstate__(self):
+        state = {}
+        for name in _get_slot_names(type(self)):
+            try:
+                state[name] = getattr(self, name)
+            except AttributeError:
+                pass
+        state.update(getattr(self, "__dict__", {}))
+        # Stores are rebuilt on demand, so do not drag them along
+        state["_store"] = None
+        state["_store_start"] = None
+        state["_store_stop"] = None
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     # Private methods
 
+    def _invalidate_store(self):
+        """Mark the columnar store containing this entity as out of date.
+
+        Called whenever children are added or removed.
+        """
+        if self._store is not None:
+            self._store.invalidate()
+
+    def _get_store_coord(self):
+        """Return the coordinates of all atoms in this entity as a view into its store.
+
+        The entity is packed first if it is not part of an up-to-date store.
+        """
+        if self._store is None or not self._store.valid:
+            self.pack()
+        return self._store.coord[self._store_start : self._store_stop]
+
     def reset_full_id(self):
         """Reset the full_id.
 
@@ -78,6 +133,28 @@ class Entity:
 
     # Public methods
 
+    @property
+    def xtra(self):
+        """Dictionary that keeps additional properties."""
+        if self._xtra is None:
+            self._xtra = {}
+        return self._xtra
+
+    @xtra.setter
+    def xtra(self, xtra):
+        self._xtra = xtra
+
+    def pack(self) -> AtomStore:
+        """Move the data of all atoms in this entity into a new contiguous :class:`AtomStore`.
+
+        After packing, ``atom.coord`` is a view into the ``coord`` array of the store (and
+        similarly for B-factors and occupancies), so operations on the whole entity can work
+        on a single array while the object API keeps working.
+        """
+        if self._store is not None:
+            self._store.invalidate()
+        return AtomStore.from_entity(self)
+
     @property
     def id(self):
         return self._id
@@ -124,6 +201,7 @@ class Entity:
         """Remove and return a child."""
         child = self._children.pop(id)
         child.parent = None
+        self._invalidate_store()
         return child
 
     def clear(self):
@@ -131,6 +209,7 @@ class Entity:
             child.parent = None
         self._children.clear()
         self.xtra.clear()
+        self._invalidate_store()
 
     def add(self, entities):
         """Add a child to the Entity."""
@@ -143,13 +222,15 @@ class Entity:
         elif not isinstance(entities, list):
             # Like a generator...
             entities = list(entities)
-        if any(entity.id in self for entity in entities):
+        ids = [entity.id for entity in entities]
+        if not self._children.keys().isdisjoint(ids):
             raise PDBConstructionException("Some of the entities are defined twice")
-        if len({entity.id for entity in entities}) < len(entities):
+        if len(set(ids)) < len(ids):
             raise PDBConstructionException("Some of the entities are duplicates")
-        for entity in entities:
+        for entity_id, entity in zip(ids, entities):
             entity.parent = self
-            self._children[entity.id] = entity
+            self._children[entity_id] = entity
+        self._invalidate_store()
 
     def insert(self, pos, entities):
         """Add a child to the Entity at a specified position."""
@@ -217,17 +298,58 @@ class Entity:
         >>> translation=array((0, 0, 1))
         >>> entity.transform(rotation, translation)
         """
-        for entity in self:
-            entity.transform(rot, tran)
+        coord = self._get_store_coord()
+        coord[:] = np.dot(coord, rot) + tran
+
+    def transform_copies(self, rotations, translations):
+        """
+        Create one transformed copy of this entity for every rotation and translation.
+
+        The coordinates of all copies are calculated in a single batched matrix multiply.
+
+        Parameters
+        ----------
+        rotations : `numpy.Array`
+            A Kx3x3 array of rotation matrices.
+        translations : `numpy.Array`
+            A Kx3 array of translation vectors.
+
+        Returns
+        -------
+        copies : `list`
+            List of K copies of this entity, in the order of the transformations.
+        """
+        # Copies only keep the selected sibling of disordered entities,
+        # so take the coordinates from a template copy
+        template = self.copy()
+        coords = apply_transformations(template._get_store_coord(), rotations, translations)
+        copies = []
+        for i, coord in enumerate(coords):
+            entity = template.copy() if i < len(coords) - 1 else template
+            entity._get_store_coord()[:] = coord
+            copies.append(entity)
+        return copies
 
     def copy(self):
         shallow = copy(self)  # Copy class type, etc.
         # Need a generator from self because lazy evaluation:
         Entity.__init__(shallow, shallow.id, (c.copy() for c in self))
-        shallow.xtra = self.xtra.copy()
+        shallow._xtra = self._xtra.copy() if self._xtra is not None else None
         return shallow
 
 
+@lru_cache(maxsize=None)
+def _get_slot_names(cls):
+    """Return the names of all ``__slots__`` defined by `cls` and its base classes."""
+    names = []
+    for base in reversed(cls.__mro__):
+        slots = base.__dict__.get("__slots__", ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        names.extend(name for name in slots if name not in ("__dict__", "__weakref__"))
+    return tuple(names)
+
+
 class DisorderedEntityWrapper(object):
     """
     This class is a simple wrapper class that groups a number of equivalent
@@ -250,10 +372,10 @@ class DisorderedEntityWrapper(object):
 
     def __getattr__(self, method):
         """Forward the method call to the selected child."""
-        if not hasattr(self, "selected_sibling"):
+        if "selected_sibling" not in self.__dict__:
             # Avoid problems with pickling
             # Unpickling goes into infinite loop!
-            raise AttributeError
+            raise AttributeError(method)
         return getattr(self.selected_sibling, method)
 
     def __getitem__(self, id):
@@ -265,6 +387,8 @@ class DisorderedEntityWrapper(object):
     def __setitem__(self, id, child):
         """Add a child, associated with a certain id."""
         self._siblings[id] = child
+        if self._parent is not None:
+            self._parent._invalidate_store()
 
     def __contains__(self, id):
         """True if the child has the given id."""
@@ -24,6 +24,8 @@ class Residue(Entity):
 
     level = "R"
 
+    __slots__ = ("_children", "disordered", "resname", "segid")
+
     def __init__(self, id, resname, segid, **kwargs):
         self.disordered = 0
         self.resname = resname
@@ -0,0 +1,247 @@
+"""Select atoms from a structure using boolean masks over its :class:`AtomStore`.
+
+Queries are compiled into a single boolean mask, with one element for every atom in
+``structure.atom_store``. Every criterion is evaluated on whole annotation columns,
+so the cost of a selection does not depend on Python-level iteration over atoms.
+
+Typical use:
+
+    >>> mask = select_mask(structure, chains=["A"], residues=range(10, 21))
+    >>> binding_site = structure.select(within=(5.0, {"resnames": ["HEM"]}), hetatms=False)
+"""
+import logging
+from copy import copy
+from numbers import Real
+
+import numpy as np
+
+from kmbio.PDB.exceptions import PDBException
+
+from .atom_store import _remap_bonds
+from .entity import DisorderedEntityWrapper, Entity
+
+logger = logging.getLogger(__name__)
+
+
+class AtomSelection:
+    """A lightweight view of a subset of the atoms of a structure.
+
+    Attributes:
+        structure: The structure from which atoms were selected.
+        mask: Boolean mask over the atoms in ``structure.atom_store``.
+    """
+
+    def __init__(self, structure, mask):
+        self.structure = structure
+        self.store = structure.atom_store
+        self.mask = mask
+
+    def __repr__(self):
+        return "<AtomSelection structure=%s n_atoms=%i>" % (self.structure.id, len(self))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.mask))
+
+    @property
+    def indices(self):
+        """Indices of the selected atoms in the atom store."""
+        return np.flatnonzero(self.mask)
+
+    @property
+    def atoms(self):
+        """List of the selected atoms."""
+        atoms = self.store.atoms
+        return [atoms[i] for i in self.indices]
+
+    @property
+    def residues(self):
+        """List of residues with at least one selected atom."""
+        residues = self.store.residues
+        return [residues[i] for i in np.unique(self.store.residue_index[self.mask])]
+
+    @property
+    def coord(self):
+        """``(M, 3)`` array with the coordinates of the selected atoms."""
+        return self.store.coord[self.mask]
+
+    def to_structure(self):
+        """Create a new structure containing copies of the selected atoms."""
+        return extract_atoms(self.structure, self.mask)
+
+
+def select_mask(
+    structure,
+    models=None,
+    chains=None,
+    residues=None,
+    hetatms=None,
+    *,
+    resnames=None,
+    elements=None,
+    altlocs=None,
+    within=None,
+):
+    """Compile a query into a boolean mask over the atoms in ``structure.atom_store``.
+
+    All criteria which are not ``None`` have to be satisfied for an atom to be selected.
+
+    Args:
+        structure: Structure from which to select atoms.
+        models: Model id or list of model ids.
+        chains: Chain id or list of chain ids.
+        residues: Residue sequence number, ``range`` of sequence numbers,
+            or list of sequence numbers and ranges.
+        hetatms: ``True`` to select only HETATM residues (including waters),
+            ``False`` to exclude them. A number adds all HETATM residues (in the same model)
+            that have an atom within that distance of atoms selected by the other criteria.
+        resnames: Residue name or list of residue names.
+        elements: Element or list of elements.
+        altlocs: Alternate location or list of alternate locations.
+            Use ``""`` to select atoms without an alternate location.
+        within: Tuple of ``(radius, query)``, where `query` is a dictionary of keyword
+            arguments to this function, or a boolean mask. Selects atoms within
+            `radius` of the atoms selected by `query` (in the same model).
+
+    Returns:
+        Boolean array with one element for every atom in ``structure.atom_store``.
+    """
+    store = structure.atom_store
+    annotations = store.annotations
+    mask = np.ones(len(store), dtype=bool)
+    if models is not None:
+        mask &= np.isin(annotations["model_id"], _as_list(models))
+    if chains is not None:
+        mask &= np.isin(annotations["chain_id"], _as_list(chains))
+    if residues is not None:
+        mask &= _residue_mask(annotations["resseq"], residues)
+    if resnames is not None:
+        mask &= np.isin(annotations["resname"], _as_list(resnames))
+    if elements is not None:
+        elements = [element.upper() for element in _as_list(elements)]
+        mask &= np.isin(annotations["element"], elements)
+    if altlocs is not None:
+        altlocs = [altloc.strip() for altloc in _as_list(altlocs)]
+        mask &= np.isin(annotations["altloc"], altlocs)
+    if within is not None:
+        radius, query = within
+        if isinstance(query, dict):
+            query = select_mask(structure, **query)
+        mask &= _within_mask(store, np.asarray(query, dtype=bool), radius)
+    if hetatms is not None:
+        is_hetatm = annotations["hetflag"] != " "
+        if isinstance(hetatms, bool):
+            mask &= is_hetatm if hetatms else ~is_hetatm
+        elif isinstance(hetatms, Real):
+            close = _within_mask(store, mask & ~is_hetatm, hetatms) & is_hetatm
+            if models is not None:
+                close &= np.isin(annotations["model_id"], _as_list(models))
+            # Add the *whole* residue
+            close_residues = np.unique(store.residue_index[close])
+            mask |= np.isin(store.residue_index, close_residues)
+        else:
+            raise PDBException("Wrong value for 'hetatms': {!r}".format(hetatms))
+    return mask
+
+
+def extract_atoms(structure, mask):
+    """Create a new structure containing copies of the atoms for which `mask` is ``True``.
+
+    Entities with no selected atoms are omitted. Where a disordered atom or residue
+    has several selected siblings, the currently selected sibling is preferred.
+    """
+    store = structure.atom_store
+    if len(mask) != len(store):
+        raise PDBException(
+            "Mask has {} elements, but structure has {} atoms.".format(len(mask), len(store))
+        )
+    counts = np.r_[0, np.cumsum(mask)]
+    # Copy of every extracted atom, by the id of the original atom
+    atom_copies = {}
+    new_structure = _extract(structure, counts, atom_copies)
+    if new_structure is None:
+        new_structure = _empty_copy(structure)
+    bonds = structure.bonds
+    if bonds is not None:
+        # Bonds are mapped to the copies of the atoms, in the store of the new structure
+        new_index = {id(atom): i for i, atom in enumerate(new_structure.atom_store.atoms)}
+        index = np.array(
+            [new_index.get(id(atom_copies.get(id(atom))), -1) for atom in store.atoms],
+            dtype=np.int64,
+        )
+        new_structure.bonds, new_structure.bond_orders = _remap_bonds(
+            bonds, structure.bond_orders, index
+        )
+    return new_structure
+
+
+def _extract(entity, counts, atom_copies):
+    if counts[entity._store_stop] == counts[entity._store_start]:
+        return None
+    if entity.level == "A":
+        atom_copies[id(entity)] = entity.copy()
+        return atom_copies[id(entity)]
+    new_entity = _empty_copy(entity)
+    for child in entity:
+        if isinstance(child, DisorderedEntityWrapper):
+            siblings = [child.selected_sibling] + [
+                c for c in child.disordered_get_list() if c is not child.selected_sibling
+            ]
+        else:
+            siblings = [child]
+        for sibling in siblings:
+            new_child = _extract(sibling, counts, atom_copies)
+            if new_child is not None:
+                new_entity.add(new_child)
+                break
+    return new_entity
+
+
+def _empty_copy(entity):
+    shallow = copy(entity)
+    Entity.__init__(shallow, shallow.id)
+    shallow.xtra = entity.xtra.copy()
+    if entity.level == "S":
+        # Bonds refer to the atoms of `entity`, so they are remapped by `extract_atoms`
+        shallow.bonds = None
+        shallow.bond_orders = None
+    return shallow
+
+
+def _as_list(values):
+    # NumPy scalars (e.g. values taken from `to_dataframe()`) are not iterable either
+    if values is None or np.isscalar(values):
+        return [values]
+    return list(values)
+
+
+def _residue_mask(resseq, residues):
+    mask = np.zeros(len(resseq), dtype=bool)
+    numbers = []
+    for residue in [residues] if isinstance(residues, range) else _as_list(residues):
+        if isinstance(residue, range):
+            start, stop, step = residue.start, residue.stop, residue.step
+            in_range = (resseq >= start) & (resseq < stop) if step > 0 else (
+                (resseq <= start) & (resseq > stop)
+            )
+            mask |= in_range & ((resseq - start) % step == 0)
+        else:
+            numbers.append(residue)
+    if numbers:
+        mask |= np.isin(resseq, numbers)
+    return mask
+
+
+def _within_mask(store, query_mask, radius):
+    """Select atoms within `radius` of any atom in `query_mask` and in the same model."""
+    # Imported here to avoid a circular import (tools depend on core)
+    from kmbio.PDB.tools.neighbor_search import coordinate_index
+
+    mask = np.zeros(len(store), dtype=bool)
+    model_idx = store.annotations["model_idx"]
+    for model in np.unique(model_idx[query_mask]):
+        model_atoms = np.flatnonzero(model_idx == model)
+        index = coordinate_index(store.coord[model_atoms])
+        _, atom_idxs = index.query_ball(store.coord[query_mask & (model_idx == model)], radius)
+        mask[model_atoms[atom_idxs]] = True
+    logger.debug("Found %i atoms within %s of %i atoms.", mask.sum(), radius, query_mask.sum())
+    return mask
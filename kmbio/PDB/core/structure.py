@@ -4,12 +4,15 @@
 # as part of this package.
 
 """The structure class, representing a macromolecular structure."""
+
 from typing import List, NamedTuple
 
 import numpy as np
 import pandas as pd
 
+from .atom_store import AtomStore, _remap_bonds
 from .entity import Entity
+from .selection import AtomSelection, extract_atoms, select_mask
 
 
 class StructureRow(NamedTuple):
@@ -45,6 +48,11 @@ class Structure(Entity):
 
     level = "S"
 
+    _bonds = None
+    _bond_orders = None
+    #: Store which the atom indices in `_bonds` refer to
+    _bonds_store = None
+
     def __repr__(self):
         return "<Structure id=%s>" % self.id
 
@@ -66,6 +74,62 @@ class Structure(Entity):
     def __gt__(self, other):
         return self.id.lower() > other.id.lower()
 
+    @property
+    def atom_store(self) -> AtomStore:
+        """Columnar store with the data of all atoms, (re)packed if out of date."""
+        if self._store is None or not self._store.valid:
+            self.pack()
+        return self._store
+
+    @property
+    def bonds(self):
+        """``(M, 2)`` array of bonded atoms, as indices into :attr:`atom_store` (or `None`).
+
+        `None` means that bonds were not read from the file. Bonds are set as indices into
+        the current :attr:`atom_store`. They refer to the same atoms after the store is
+        repacked (e.g. after sorting the structure), and bonds of atoms which are removed
+        from the structure are dropped.
+        """
+        self._update_bonds()
+        return self._bonds
+
+    @bonds.setter
+    def bonds(self, bonds):
+        self._bonds = bonds
+        self._bonds_store = self.atom_store if bonds is not None else None
+
+    @property
+    def bond_orders(self):
+        """``(M,)`` array with the order of every bond in :attr:`bonds`."""
+        self._update_bonds()
+        return self._bond_orders
+
+    @bond_orders.setter
+    def bond_orders(self, bond_orders):
+        self._bond_orders = bond_orders
+
+    def _update_bonds(self):
+        """Remap the bonds to the current atom store, if it was repacked (PRIVATE)."""
+        if self._bonds is None:
+            return
+        store = self.atom_store
+        if self._bonds_store is store:
+            return
+        store_index = {id(atom): i for i, atom in enumerate(store.atoms)}
+        index = np.array(
+            [store_index.get(id(atom), -1) for atom in self._bonds_store.atoms], dtype=np.int64
+        )
+        self._bonds, self._bond_orders = _remap_bonds(self._bonds, self._bond_orders, index)
+        self._bonds_store = store
+
+    def copy(self):
+        structure = super().copy()
+        # Copies only keep the selected sibling of disordered entities,
+        # so the atom indices of bonds are no longer valid
+        structure.bonds = None
+        structure.bond_orders = None
+        return structure
+
     def extract_models(self, model_ids):
         # TODO: Not sure if this is neccessary
         structure = Structure(self.id)
@@ -73,53 +137,84 @@ class Structure(Entity):
             structure.add(self[model_id].copy())
         return structure
 
-    def select(self, models=None, chains=None, residues=None, hetatms=None):
+    def select(
+        self, models=None, chains=None, residues=None, hetatms=None, *, view=False, **kwargs
+    ):
         """This method allows you to select things from structures using a variety of queries.
 
-        In particular, you should be able to select one or more chains,
-        and all HETATMs that are within a certain distance of those chains.
+        In particular, you can select one or more chains,
+        and all HETATMs that are within a certain distance of those chains:
+
+            >>> structure.select(chains=["A"], hetatms=5.0)
+
+        The query is compiled into a boolean mask over the atoms in :attr:`atom_store`.
+        See :func:`kmbio.PDB.core.selection.select_mask` for all supported criteria.
+
+        Args:
+            view: If ``True``, return a lightweight :class:`AtomSelection` instead of
+                a new structure.
+
+        Returns:
+            A new structure with copies of the selected atoms, or an :class:`AtomSelection`.
+        """
+        mask = select_mask(self, models, chains, residues, hetatms, **kwargs)
+        if view:
+            return AtomSelection(self, mask)
+        return extract_atoms(self, mask)
+
+    def to_dataframe(self, categorical: bool = False) -> pd.DataFrame:
+        """Convert this structure into a pandas DataFrame.
+
+        The DataFrame contains one row for every atom that is reached when iterating over
+        the structure (i.e. only the selected sibling of every disordered atom or residue),
+        with the columns listed in :class:`StructureRow`. Columns are filled directly from
+        the :attr:`atom_store`, rather than atom by atom.
+
+        Args:
+            categorical: Store the ``chain_id``, ``residue_resname`` and ``atom_name``
+                columns as :class:`pandas.Categorical`, which uses much less memory
+                for large structures.
         """
-        raise NotImplementedError
-
-    def to_dataframe(self) -> pd.DataFrame:
-        """Convert this structure into a pandas DataFrame."""
-        data = []
-        model_idx, chain_idx, residue_idx, atom_idx = -1, -1, -1, -1
-        for model in self.models:
-            model_idx += 1
-            for chain in model.chains:
-                chain_idx += 1
-                for residue in chain.residues:
-                    residue_idx += 1
-                    for atom in residue.atoms:
-                        atom_idx += 1
-                        data.append(
-                            StructureRow(
-                                structure_id=self.id,
-                                model_idx=model_idx,
-                                model_id=model.id,
-                                chain_idx=chain_idx,
-                                chain_id=chain.id,
-                                residue_idx=residue_idx,
-                                residue_id_0=residue.id[0],
-                                residue_id_1=residue.id[1],
-                                residue_id_2=residue.id[2],
-                                residue_resname=residue.resname,
-                                residue_segid=residue.segid,
-                                atom_idx=atom_idx,
-                                atom_name=atom.name,
-                                atom_fullname=atom.fullname,
-                                atom_x=atom.coord[0],
-                                atom_y=atom.coord[1],
-                                atom_z=atom.coord[2],
-                                atom_bfactor=atom.bfactor,
-                                atom_occupancy=atom.occupancy,
-                                atom_altloc=atom.altloc,
-                                atom_serial_number=atom.serial_number,
-                                atom_extra_bonds=[],
-                            )
-                        )
-        df = pd.DataFrame(data)
+        store = self.atom_store
+        annotations = store.annotations
+        idxs = np.flatnonzero(annotations["selected_sibling"])
+        atoms = [store.atoms[i] for i in idxs]
+        residue_index = store.residue_index[idxs]
+        # Residues are numbered in the order of iteration, including residues with no atoms
+        residue_idxs = np.cumsum(store._residue_selected) - 1
+        residue_segids = np.array([residue.segid for residue in store.residues], dtype=object)
+        coord = store.coord[idxs]
+        df = pd.DataFrame(
+            {
+                "structure_id": np.full(len(idxs), self.id, dtype=object),
+                "model_idx": annotations["model_idx"][idxs],
+                "model_id": annotations["model_id"][idxs],
+                "chain_idx": annotations["chain_idx"][idxs],
+                "chain_id": annotations["chain_id"][idxs],
+                "residue_idx": residue_idxs[residue_index],
+                "residue_id_0": annotations["hetflag"][idxs],
+                "residue_id_1": annotations["resseq"][idxs],
+                "residue_id_2": annotations["icode"][idxs],
+                "residue_resname": annotations["resname"][idxs],
+                "residue_segid": residue_segids[residue_index],
+                "atom_idx": np.arange(len(idxs), dtype=np.int64),
+                "atom_name": annotations["name"][idxs],
+                "atom_fullname": [atom.fullname for atom in atoms],
+                "atom_x": coord[:, 0],
+                "atom_y": coord[:, 1],
+                "atom_z": coord[:, 2],
+                "atom_bfactor": store.bfactor[idxs],
+                "atom_occupancy": store.occupancy[idxs],
+                "atom_altloc": [atom.altloc for atom in atoms],
+                "atom_serial_number": [atom.serial_number for atom in atoms],
+                "atom_extra_bonds": [[] for _ in range(len(idxs))],
+            },
+            columns=StructureRow._fields,
+        )
+        df = df.infer_objects()
+        if categorical:
+            for column in ["chain_id", "residue_resname", "atom_name"]:
+                df[column] = df[column].astype("category")
         return df
 
     @staticmethod
@@ -144,47 +239,72 @@ class Structure(Entity):
 
         assert (df["structure_id"] == df["structure_id"].iloc[0]).all()
         structure = Structure(df["structure_id"].iloc[0])
-        # Groupby skips rows with NAs
-        structure_df = df.drop(columns=["structure_id"])
-        for (_, model_id), model_df in _groupby(structure_df, ["model_idx", "model_id"]):
-            model = Model(model_id)
-            structure.add(model)
-            for (_, chain_id), chain_df in _groupby(model_df, ["chain_idx", "chain_id"]):
-                chain = Chain(chain_id)
+        # Rows are sorted by entity index, so that every entity is a contiguous block of rows
+        order = np.lexsort(
+            [
+                df[column].to_numpy()
+                for column in ["atom_idx", "residue_idx", "chain_idx", "model_idx"]
+            ]
+        )
+        df = df.iloc[order]
+        # A new entity starts wherever its index or any of its attributes changes
+        model_starts = _block_starts(df, ["model_idx", "model_id"])
+        chain_starts = model_starts | _block_starts(df, ["chain_idx", "chain_id"])
+        residue_starts = chain_starts | _block_starts(
+            df,
+            [
+                "residue_idx",
+                "residue_id_0",
+                "residue_id_1",
+                "residue_id_2",
+                "residue_resname",
+                "residue_segid",
+            ],
+        )
+        atom_starts = residue_starts | _block_starts(df, ["atom_idx", "atom_name"])
+        assert atom_starts.all()
+        values = {column: df[column].tolist() for column in df.columns if column != "structure_id"}
+        coords = df[["atom_x", "atom_y", "atom_z"]].to_numpy(dtype=np.float64)
+        atoms = [
+            Atom(
+                name=name,
+                coord=coord,
+                bfactor=bfactor,
+                occupancy=occupancy,
+                altloc=altloc,
+                fullname=fullname,
+                serial_number=serial_number,
+            )
+            for name, coord, bfactor, occupancy, altloc, fullname, serial_number in zip(
+                values["atom_name"],
+                coords,
+                values["atom_bfactor"],
+                values["atom_occupancy"],
+                values["atom_altloc"],
+                values["atom_fullname"],
+                values["atom_serial_number"],
+            )
+        ]
+        bounds = np.r_[np.flatnonzero(residue_starts), len(df)]
+        model, chain = None, None
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            if model_starts[start]:
+                model = Model(values["model_id"][start])
+                structure.add(model)
+            if chain_starts[start]:
+                chain = Chain(values["chain_id"][start])
                 model.add(chain)
-                for (
-                    (_, residue_id_0, residue_id_1, residue_id_2, residue_resname, residue_segid),
-                    residue_df,
-                ) in _groupby(
-                    chain_df,
-                    [
-                        "residue_idx",
-                        "residue_id_0",
-                        "residue_id_1",
-                        "residue_id_2",
-                        "residue_resname",
-                        "residue_segid",
-                    ],
-                ):
-                    residue = Residue(
-                        (residue_id_0, residue_id_1, residue_id_2),
-                        resname=residue_resname,
-                        segid=residue_segid,
-                    )
-                    chain.add(residue)
-                    for (_, atom_name), atom_df in _groupby(residue_df, ["atom_idx", "atom_name"]):
-                        assert len(atom_df) == 1
-                        atom_s = atom_df.iloc[0]
-                        atom = Atom(
-                            name=atom_name,
-                            coord=(atom_s.atom_x, atom_s.atom_y, atom_s.atom_z),
-                            bfactor=atom_s.atom_bfactor,
-                            occupancy=atom_s.atom_occupancy,
-                            altloc=atom_s.atom_altloc,
-                            fullname=atom_s.atom_fullname,
-                            serial_number=atom_s.atom_serial_number,
-                        )
-                        residue.add(atom)
+            residue = Residue(
+                (
+                    values["residue_id_0"][start],
+                    values["residue_id_1"][start],
+                    values["residue_id_2"][start],
+                ),
+                resname=values["residue_resname"][start],
+                segid=values["residue_segid"][start],
+            )
+            chain.add(residue)
+            residue.add(atoms[start:stop])
         return structure
 
     @property
@@ -211,17 +331,17 @@ class Structure(Entity):
                 yield a
 
 
-def _groupby(df, columns, *args, **kwargs):
-    """Groupby columns, *not* ignoring rows containing NANs.
+def _block_starts(df, columns):
+    """Return a boolean mask which is ``True`` for rows that differ from the previous row.
 
-    Have to use this until pandas-dev/pandas#3729 is fixed.
+    Null values are considered to be equal to one another.
     """
-    if df[columns].isnull().any().any():
-        assert not (df[columns] == np.inf).any().any()
-        df[columns] = df[columns].fillna(np.inf)
-        for group_key, group_df in df.groupby(columns, *args, **kwargs):
-            group_key = [(k if k != np.inf else np.nan) for k in group_key]
-            yield group_key, group_df
-    else:
-        for group_key, group_df in df.groupby(columns, *args, **kwargs):
-            yield group_key, group_df
+    starts = np.zeros(len(df), dtype=bool)
+    starts[:1] = True
+    for column in columns:
+        values = df[column].to_numpy()
+        is_null = pd.isnull(values)
+        changed = values[1:] != values[:-1]
+        starts[1:] |= changed & ~(is_null[1:] & is_null[:-1])
+        starts[1:] |= is_null[1:] != is_null[:-1]
+    return starts
@@ -202,6 +202,32 @@ def calc_dihedral(v1, v2, v3, v4):
     return angle
 
 
+def apply_transformations(coord, rotations, translations):
+    """
+    Apply K right multiplying rotations and translations to an array of coordinates.
+
+    Example:
+
+        >>> coords = apply_transformations(chain_coord, rotations, translations)
+        >>> coords.shape
+        (K, N, 3)
+
+    @type coord: Numeric array
+    @param coord: Nx3 array of coordinates
+
+    @type rotations: Numeric array
+    @param rotations: Kx3x3 array of rotation matrices
+
+    @type translations: Numeric array
+    @param translations: Kx3 array of translation vectors
+
+    @return: KxNx3 array with one set of transformed coordinates per transformation.
+    """
+    rotations = np.asarray(rotations, dtype=np.float64).reshape(-1, 3, 3)
+    translations = np.asarray(translations, dtype=np.float64).reshape(-1, 1, 3)
+    return np.matmul(coord, rotations) + translations
+
+
 class Vector(object):
     "3D vector"
 
@@ -1,4 +1,4 @@
 from .routes import DEFAULT_ROUTES
 from .loaders import load, guess_pdb_id, guess_pdb_type, get_parser
-from .savers import PDBIO, Select, save
+from .savers import KMBIO, MMCIFIO, PDBIO, Select, save
 from .viewers import structure_to_ngl, view_structure
@@ -8,20 +8,31 @@ from pathlib import Path
 from typing import Type
 from urllib.parse import urlparse
 
-from kmbio.PDB import MMCIFParser, MMTFParser, Parser, PDBParser, Structure, open_url
+from kmbio.PDB import KMBParser, MMCIFParser, MMTFParser, Parser, PDBParser, Structure, open_url
 
 from .routes import DEFAULT_ROUTES
 
 logger = logging.getLogger(__name__)
 
 
-def load(pdb_file: str, structure_id: str = None, **kwargs) -> Structure:
+def load(pdb_file: str, structure_id: str = None, fast: bool = False, **kwargs) -> Structure:
     """Load local PDB file.
 
     Args:
         pdb_file: File to load.
+        fast: If ``True``, parse only the atomic coordinates, skipping all other data
+            in the file. Currently, this only affects mmCIF files.
         kwargs: Optional keyword arguments to be passed to the parser
-            ``__init__`` and ``get_structure`` methods.
+            ``__init__`` and ``get_structure`` methods. All parsers accept ``models``,
+            ``chains`` and ``altloc`` filters, which skip building the atoms of
+            other models, chains and alternate locations
+            (e.g. ``load(pdb_file, models=0, chains=["A", "B"], altloc="A")``).
+            ``altloc`` can also be ``"first"`` or ``"highest_occupancy"``, and
+            ``skip_water=True`` and ``skip_hydrogen=True`` skip building waters and
+            hydrogens (e.g. ``load(pdb_file, altloc="first", skip_water=True)``).
+            With ``bioassembly_id=N``, ``lazy_bioassembly=True`` returns a
+            :class:`~kmbio.PDB.BioassemblyView`, which calculates the coordinates of
+            the copies in the bioassembly only when they are requested.
 
     Load example:
         >>> import urllib.request
@@ -49,9 +60,10 @@ def load(pdb_file: str, structure_id: str = None, **kwargs) -> Structure:
     if scheme in DEFAULT_ROUTES:
         pdb_file = DEFAULT_ROUTES[scheme](pdb_id, pdb_type)
 
-    parser = get_parser(pdb_type, **kwargs)
+    parser = get_parser(pdb_type, fast=fast, **kwargs)
 
-    with open_url(pdb_file) as fh:
+    # MMTF and KMB files are binary
+    with open_url(pdb_file, binary=pdb_type in ["mmtf", "kmb"]) as fh:
         structure = parser.get_structure(fh)
         if not structure.id:
             structure.id = pdb_id
@@ -72,7 +84,7 @@ def guess_pdb_id(pdb_file: str) -> str:
     '100d'
     """
     pdb_id = op.basename(pdb_file)
-    for extension in [".gz", ".pdb", ".ent", ".cif"]:
+    for extension in [".gz", ".pdb", ".ent", ".cif", ".kmb"]:
         pdb_id = pdb_id.partition(extension)[0]
     if len(pdb_id) == 7 and (pdb_id.startswith("ent") or pdb_id.startswith("pdb")):
         pdb_id = pdb_id[3:]
@@ -100,19 +112,25 @@ def guess_pdb_type(pdb_file: str) -> str:
             return "cif"
         elif suffix in [".mmtf"]:
             return "mmtf"
+        elif suffix in [".kmb"]:
+            return "kmb"
     raise Exception(f"Could not guess pdb type for file '{pdb_file}'!")
 
 
-def get_parser(pdb_type: str, **kwargs) -> Parser:
+def get_parser(pdb_type: str, fast: bool = False, **kwargs) -> Parser:
     """Get `kmbio.PDB` parser appropriate for `pdb_type`."""
     MyParser: Type[Parser]
     if pdb_type == "pdb":
         MyParser = PDBParser
     elif pdb_type == "cif":
         kwargs.setdefault("use_auth_id", False)
+        if fast:
+            kwargs.setdefault("coordinates_only", True)
         MyParser = MMCIFParser
     elif pdb_type == "mmtf":
         MyParser = MMTFParser
+    elif pdb_type == "kmb":
+        MyParser = KMBParser
     else:
         raise Exception("Wrong pdb_type: '{}'".format(pdb_type))
     init_params = set(inspect.signature(MyParser).parameters)
@@ -3,21 +3,63 @@
 # license.  Please see the LICENSE file that should have been included
 # as part of this package.
 """Output of PDB files."""
+import json
 import logging
 from pathlib import Path
-from typing import TextIO, Union
+from typing import BinaryIO, List, NamedTuple, Optional, TextIO, Union
 
+import numpy as np
+import pandas as pd
 from Bio.Data.IUPACData import atom_weights
 
-from kmbio.PDB import Structure, StructureBuilder
+from kmbio.PDB import Atom, Chain, Model, Residue, Structure, StructureBuilder
+from kmbio.PDB.core.atom_store import _is_selected_sibling
+from kmbio.PDB.parsers.kmb_parser import KMB_FORMAT_VERSION
+
+from .loaders import guess_pdb_type
 
 logger = logging.getLogger(__name__)
 
+#: Number of lines which are formatted and written at a time by the bulk PDB and mmCIF writers
+BULK_WRITE_CHUNK_SIZE = 65536
+
+#: Columns of the ``_atom_site`` loop written by :class:`MMCIFIO`
+MMCIF_ATOM_SITE_COLUMNS = [
+    "group_PDB",
+    "id",
+    "type_symbol",
+    "label_atom_id",
+    "label_alt_id",
+    "label_comp_id",
+    "label_asym_id",
+    "label_seq_id",
+    "pdbx_PDB_ins_code",
+    "Cartn_x",
+    "Cartn_y",
+    "Cartn_z",
+    "occupancy",
+    "B_iso_or_equiv",
+    "auth_seq_id",
+    "auth_asym_id",
+    "pdbx_PDB_model_num",
+]
+
 
 def save(
-    structure: Structure, filename: Union[str, Path], include_disordered=True,
+    structure: Structure,
+    filename: Union[str, Path],
+    include_disordered=True,
+    fmt: Optional[str] = None,
 ):
-    """Save kmbio `Structure` object as a PDB.
+    """Save kmbio `Structure` object as a PDB, an mmCIF or a binary ``.kmb`` file.
+
+    Args:
+        structure: Structure to save.
+        filename: Name of the output file.
+        include_disordered: If `False`, only write the first alternate location
+            of disordered atoms.
+        fmt: Format of the output file (``"pdb"``, ``"cif"`` or ``"kmb"``). By default,
+            the format is guessed from the file extension, falling back to ``"pdb"``.
 
     Examples:
         >>> tmpfile = tempfile.NamedTemporaryFile()
@@ -27,7 +69,19 @@ def save(
         >>> allequal(s1, s2)
         True
     """
-    io = PDBIO()
+    if fmt is None:
+        try:
+            fmt = guess_pdb_type(str(filename))
+        except Exception:
+            fmt = "pdb"
+    if fmt == "pdb":
+        io = PDBIO()
+    elif fmt == "cif":
+        io = MMCIFIO()
+    elif fmt == "kmb":
+        io = KMBIO()
+    else:
+        raise ValueError("Can not save structures in the '{}' format!".format(fmt))
     io.set_structure(structure)
     select = Select() if include_disordered else NotDisordered()
     io.save(filename, select=select)
@@ -77,10 +131,10 @@ class NotDisordered(Select):
             return False
 
     def accept_atom(self, atom):
-        if not atom.disordered_flag:
+        if not atom.disordered:
             return True
         elif atom.altloc == "A":
-            atom.disordered_flag = False
+            atom.disordered = 0
             atom.altloc = " "
             return True
         else:
@@ -88,7 +142,130 @@ class NotDisordered(Select):
             return False
 
 
-class PDBIO(object):
+class _Selection(NamedTuple):
+    """Models, chains, residues and atoms to write, in the order in which they are written."""
+
+    models: List[Model]
+    chains: List[Chain]
+    residues: List[Residue]
+    atoms: List[Atom]
+    #: Number of chains in every model
+    chain_counts: np.ndarray
+    #: Number of residues in every chain
+    residue_counts: np.ndarray
+    #: Number of atoms in every residue
+    atom_counts: np.ndarray
+    coord: np.ndarray
+    bfactor: np.ndarray
+    occupancy: np.ndarray
+
+
+class StructureIO(object):
+    """Base class for writers of a Structure object (or a subset of a Structure object)."""
+
+    def set_structure(self, pdb_object):
+        # Check what the user is providing and build a structure appropriately
+        if pdb_object.level == "S":
+            structure = pdb_object
+        else:
+            sb = StructureBuilder()
+            sb.init_structure("pdb")
+            sb.init_seg(" ")
+            # Build parts as necessary
+            if pdb_object.level == "M":
+                sb.structure.add(pdb_object)
+                self.structure = sb.structure
+            else:
+                sb.init_model(0)
+                if pdb_object.level == "C":
+                    sb.structure[0].add(pdb_object)
+                else:
+                    sb.init_chain("A")
+                    if pdb_object.level == "R":
+                        try:
+                            parent_id = pdb_object.parent.id
+                            sb.structure[0]["A"].id = parent_id
+                        except Exception:
+                            pass
+                        sb.structure[0]["A"].add(pdb_object)
+                    else:
+                        # Atom
+                        sb.init_residue("DUM", " ", 1, " ")
+                        try:
+                            parent_id = pdb_object.parent.parent.id
+                            sb.structure[0]["A"].id = parent_id
+                        except Exception:
+                            pass
+                        sb.structure[0]["A"].ix[0].add(pdb_object)
+
+            # Return structure
+            structure = sb.structure
+        self.structure = structure
+        # Entities wrapped into a new structure still belong to (and are packed into the store of)
+        # their original structure, so only structures are written in bulk
+        self._bulk_writable = pdb_object.level == "S"
+
+    def _get_atoms(self, select) -> "_Selection":
+        """Collect the models, chains, residues and atoms accepted by `select` (PRIVATE).
+
+        The data of the atoms is taken from the atom store, unless it has to be
+        gathered atom by atom (for custom selections and wrapped entities).
+        """
+        bulk = type(select) is Select and self._bulk_writable
+        if bulk:
+            store = self.structure.atom_store
+        models, chains, residues, atoms = [], [], [], []
+        chain_counts, residue_counts, atom_counts = [], [], []
+        for model in self.structure:
+            if not select.accept_model(model):
+                continue
+            models.append(model)
+            num_chains = len(chains)
+            for chain in model:
+                if not select.accept_chain(chain):
+                    continue
+                chains.append(chain)
+                num_residues = len(residues)
+                for residue in chain.get_unpacked_list():
+                    if not select.accept_residue(residue):
+                        continue
+                    residues.append(residue)
+                    if bulk:
+                        atom_counts.append(residue._store_stop - residue._store_start)
+                        continue
+                    residue_atoms = [
+                        atom for atom in residue.get_unpacked_list() if select.accept_atom(atom)
+                    ]
+                    atoms.extend(residue_atoms)
+                    atom_counts.append(len(residue_atoms))
+                residue_counts.append(len(residues) - num_residues)
+            chain_counts.append(len(chains) - num_chains)
+        if bulk:
+            atoms, coord, bfactor, occupancy = (
+                store.atoms,
+                store.coord,
+                store.bfactor,
+                store.occupancy,
+            )
+        else:
+            coord = np.array([atom.coord for atom in atoms], dtype=np.float64).reshape(-1, 3)
+            bfactor = np.array([atom.bfactor for atom in atoms], dtype=np.float64)
+            occupancy = np.array([atom.occupancy for atom in atoms], dtype=np.float64)
+        return _Selection(
+            models,
+            chains,
+            residues,
+            atoms,
+            np.array(chain_counts, dtype=np.int64),
+            np.array(residue_counts, dtype=np.int64),
+            np.array(atom_counts, dtype=np.int64),
+            coord,
+            bfactor,
+            occupancy,
+        )
+
+
+class PDBIO(StructureIO):
     """Write a Structure object (or a subset of a Structure object) as a PDB file.
 
     Example:
@@ -107,6 +284,7 @@ class PDBIO(object):
         @type use_model_flag: int
         """
         self.use_model_flag = use_model_flag
+        self._bulk_writable = False
 
     # private mathods
 
@@ -167,45 +345,6 @@ class PDBIO(object):
 
     # Public methods
 
-    def set_structure(self, pdb_object):
-        # Check what the user is providing and build a structure appropriately
-        if pdb_object.level == "S":
-            structure = pdb_object
-        else:
-            sb = StructureBuilder()
-            sb.init_structure("pdb")
-            sb.init_seg(" ")
-            # Build parts as necessary
-            if pdb_object.level == "M":
-                sb.structure.add(pdb_object)
-                self.structure = sb.structure
-            else:
-                sb.init_model(0)
-                if pdb_object.level == "C":
-                    sb.structure[0].add(pdb_object)
-                else:
-                    sb.init_chain("A")
-                    if pdb_object.level == "R":
-                        try:
-                            parent_id = pdb_object.parent.id
-                            sb.structure[0]["A"].id = parent_id
-                        except Exception:
-                            pass
-                        sb.structure[0]["A"].add(pdb_object)
-                    else:
-                        # Atom
-                        sb.init_residue("DUM", " ", 1, " ")
-                        try:
-                            parent_id = pdb_object.parent.parent.id
-                            sb.structure[0]["A"].id = parent_id
-                        except Exception:
-                            pass
-                        sb.structure[0]["A"].ix[0].add(pdb_object)
-
-            # Return structure
-            structure = sb.structure
-        self.structure = structure
-
     def save(
         self,
         file: Union[str, Path, TextIO],
@@ -236,7 +375,6 @@ class PDBIO(object):
         """
         assert atom_numbering in ["keep", "by_model", "by_chain"]
 
-        get_atom_line = self._get_atom_line
         if isinstance(file, (str, Path)):
             fp = open(file, "w")
             close_file = 1
@@ -249,6 +387,18 @@ class PDBIO(object):
             model_flag = 1
         else:
             model_flag = 0
+        # The default selection writes every atom, so the atoms can be formatted in bulk
+        bulk = type(select) is Select and self._bulk_writable
+        if not (bulk and self._save_bulk(fp, model_flag, atom_numbering)):
+            self._save_atoms(fp, select, model_flag, atom_numbering)
+        if write_end:
+            fp.write("END\n")
+        if close_file:
+            fp.close()
+
+    def _save_atoms(self, fp, select, model_flag, atom_numbering):
+        """Write the atoms accepted by `select` one at a time (PRIVATE)."""
+        get_atom_line = self._get_atom_line
         for model in self.structure:
             if not select.accept_model(model):
                 continue
@@ -291,12 +441,458 @@ class PDBIO(object):
                     fp.write("TER\n")
             if model_flag and model_residues_written:
                 fp.write("ENDMDL\n")
-        if write_end:
-            fp.write("END\n")
+
+    def _save_bulk(self, fp, model_flag, atom_numbering):
+        """Format and write all atoms at once, using the columns of the atom store (PRIVATE).
+
+        Produces the same output as :meth:`_save_atoms` with the default selection.
+        Atoms which do not fit into the fixed-width columns (and floats which are too close
+        to a rounding tie to be rounded by NumPy in the same way as by Python) are formatted
+        with :meth:`_get_atom_line`.
+
+        Returns ``False`` (without writing anything) if the atoms can not be written in bulk.
+        """
+        store = self.structure.atom_store
+        atoms = store.atoms
+        residues = store.residues
+        residue_index = store.residue_index
+        if atom_numbering == "keep":
+            atom_numbers = np.array([atom.serial_number for atom in atoms])
+            if len(atoms) and atom_numbers.dtype.kind not in "iu":
+                return False
+        else:
+            atom_numbers = np.zeros(len(atoms), dtype=np.int64)
+            groups = store.models if atom_numbering == "by_model" else store.chains
+            for group in groups:
+                atom_numbers[group._store_start : group._store_stop] = np.arange(
+                    1, group._store_stop - group._store_start + 1
+                )
+        elements = [atom.element for atom in atoms]
+        for element in pd.unique(np.asarray(elements, dtype=object)):
+            if element and element.strip().upper().capitalize() not in atom_weights:
+                raise ValueError("Unrecognised element %r" % element)
+
+        # Residue-level fields are formatted once for every residue
+        # (first column, width, values, number of decimals or string formatter)
+        residue_columns = [
+            (0, 6, [residue.id[0] != " " for residue in residues], _format_record_type),
+            (17, 3, [residue.resname for residue in residues], "{:>3s}"),
+            (20, 2, [residue.parent.id for residue in residues], "{:>2s}"),
+            (22, 4, [residue.id[1] for residue in residues], 0),
+            (26, 1, [residue.id[2] for residue in residues], "{:1s}"),
+            (66, 7, [residue.segid for residue in residues], "{:>7s}"),
+        ]
+        residue_lines, residue_fallback = _format_columns(len(residues), residue_columns)
+        lines = residue_lines[residue_index]
+        fallback = residue_fallback[residue_index]
+        atom_columns = [
+            (6, 5, atom_numbers, 0),
+            (12, 4, [atom.fullname for atom in atoms], _format_atom_name),
+            (16, 1, [atom.altloc for atom in atoms], "{:1s}"),
+            (30, 8, store.coord[:, 0], 3),
+            (38, 8, store.coord[:, 1], 3),
+            (46, 8, store.coord[:, 2], 3),
+            (54, 6, store.occupancy, 2),
+            (60, 6, store.bfactor, 2),
+            (73, 5, elements, _format_element),
+        ]
+        _format_columns(len(atoms), atom_columns, lines, fallback)
+
+        for i in np.flatnonzero(fallback):
+            residue = residues[residue_index[i]]
+            hetfield, resseq, icode = residue.id
+            line = self._get_atom_line(
+                atoms[i],
+                hetfield,
+                residue.segid,
+                int(atom_numbers[i]),
+                residue.resname,
+                resseq,
+                icode,
+                residue.parent.id,
+            )
+            try:
+                lines[i] = np.frombuffer(line.encode("ascii"), dtype=np.uint8)
+            except UnicodeEncodeError:
+                return False
+
+        for model in self.structure:
+            if model_flag:
+                fp.write("MODEL      %s\n" % model.serial_num)
+            model_residues_written = 0
+            for chain in model:
+                if chain._store_stop == chain._store_start:
+                    continue
+                for chunk_start in range(
+                    chain._store_start, chain._store_stop, BULK_WRITE_CHUNK_SIZE
+                ):
+                    chunk_stop = min(chunk_start + BULK_WRITE_CHUNK_SIZE, chain._store_stop)
+                    fp.write(lines[chunk_start:chunk_stop].tobytes().decode("ascii"))
+                fp.write("TER\n")
+                model_residues_written = 1
+            if model_flag and model_residues_written:
+                fp.write("ENDMDL\n")
+        return True
+
+
+class MMCIFIO(StructureIO):
+    """Write a Structure object (or a subset of a Structure object) as an mmCIF file.
+
+    Only the ``_atom_site`` category is written, so there is no limit on the number of atoms
+    and chains (unlike in PDB files). Every column is formatted at once and the rows are
+    written in chunks of :data:`BULK_WRITE_CHUNK_SIZE`.
+
+    Structures do not keep the label ids of mmCIF files, so the ``label_asym_id`` and
+    ``label_seq_id`` columns are filled with the chain ids and residue numbers of the structure
+    (with ``.`` as the ``label_seq_id`` of hetero residues). Models are numbered from 1
+    if they do not all have a positive serial number.
+
+    Example:
+
+        >>> p=PDBParser()
+        >>> s=p.get_structure("1fat", "1fat.pdb")
+        >>> io=MMCIFIO()
+        >>> io.set_structure(s)
+        >>> io.save("out.cif")
+    """
+
+    def __init__(self):
+        self._bulk_writable = False
+
+    # Public methods
+
+    def save(self, file: Union[str, Path, TextIO], select=Select()) -> None:
+        """
+        Args:
+            file: output file
+            select: selects which entities will be written (see :meth:`PDBIO.save`).
+        """
+        if isinstance(file, (str, Path)):
+            fp = open(file, "w")
+            close_file = 1
+        else:
+            fp = file
+            close_file = 0
+        selection = self._get_atoms(select)
+        atoms, residues = selection.atoms, selection.residues
+        coord = selection.coord
+        residue_index = np.repeat(np.arange(len(residues)), selection.atom_counts)
+        chains = [residue.parent for residue in residues]
+        # mmCIF model numbers start at 1, but models read from PDB files without MODEL records
+        # and from MMTF files have a serial number of 0
+        model_nums = {id(model): model.serial_num for model in selection.models}
+        if not all(isinstance(num, int) and num > 0 for num in model_nums.values()):
+            model_nums = {id(model): i + 1 for i, model in enumerate(self.structure)}
+        # Residue-level columns are formatted once for every residue
+        # (name, values, number of decimals or value which is written if the value is missing)
+        residue_columns = [
+            ("group_PDB", ["ATOM" if r.id[0] == " " else "HETATM" for r in residues], "?"),
+            ("label_comp_id", [residue.resname for residue in residues], "?"),
+            ("label_asym_id", [chain.id for chain in chains], "?"),
+            # Hetero residues (ligands and waters) have no label sequence number
+            ("label_seq_id", [str(r.id[1]) if r.id[0] == " " else "" for r in residues], "."),
+            ("pdbx_PDB_ins_code", [residue.id[2].strip() for residue in residues], "?"),
+            ("auth_seq_id", [residue.id[1] for residue in residues], 0),
+            ("auth_asym_id", [chain.id for chain in chains], "?"),
+            ("pdbx_PDB_model_num", [model_nums[id(chain.parent)] for chain in chains], 0),
+        ]
+        atom_columns = [
+            ("id", np.arange(1, len(atoms) + 1), 0),
+            ("type_symbol", [atom.element or "" for atom in atoms], "?"),
+            ("label_atom_id", [atom.name for atom in atoms], "?"),
+            ("label_alt_id", [atom.altloc.strip() for atom in atoms], "."),
+            ("Cartn_x", coord[:, 0], 3),
+            ("Cartn_y", coord[:, 1], 3),
+            ("Cartn_z", coord[:, 2], 3),
+            ("occupancy", selection.occupancy, 2),
+            ("B_iso_or_equiv", selection.bfactor, 2),
+        ]
+        columns = {}
+        for name, values, fmt in residue_columns:
+            columns[name] = _format_cif_column(values, fmt)[residue_index]
+        for name, values, fmt in atom_columns:
+            columns[name] = _format_cif_column(values, fmt)
+        columns = [(name, columns[name]) for name in MMCIF_ATOM_SITE_COLUMNS]
+
+        fp.write("data_%s\n#\nloop_\n" % "_".join(str(self.structure.id).split()))
+        for name, _ in columns:
+            fp.write("_atom_site.%s\n" % name)
+        starts = np.cumsum([0] + [chars.shape[1] + 1 for _, chars in columns])
+        for chunk_start in range(0, len(atoms), BULK_WRITE_CHUNK_SIZE):
+            chunk_stop = min(chunk_start + BULK_WRITE_CHUNK_SIZE, len(atoms))
+            lines = np.full((chunk_stop - chunk_start, starts[-1]), ord(" "), dtype=np.uint8)
+            for start, (_, chars) in zip(starts, columns):
+                lines[:, start : start + chars.shape[1]] = chars[chunk_start:chunk_stop]
+            lines[:, -1] = ord("\n")
+            fp.write(lines.tobytes().decode("utf-8"))
+        fp.write("#\n")
         if close_file:
             fp.close()
 
 
+class KMBIO(StructureIO):
+    """Write a Structure object (or a subset of a Structure object) as a binary ``.kmb`` file.
+
+    A ``.kmb`` file is an uncompressed NumPy ``.npz`` archive with the columns of the atoms,
+    residues, chains and models of the structure, in the order of the atom store.
+    The header of the structure, including its bioassembly data, is stored as JSON and
+    the ``bonds`` read from MMTF files are kept. Unlike PDB and mmCIF files, ``.kmb`` files
+    record which sibling of every disordered atom and residue is selected.
+    Anisotropic B-factors are not stored.
+
+    ``.kmb`` files are read by :class:`kmbio.PDB.parsers.kmb_parser.KMBParser`.
+
+    Example:
+
+        >>> p=PDBParser()
+        >>> s=p.get_structure("1fat", "1fat.pdb")
+        >>> io=KMBIO()
+        >>> io.set_structure(s)
+        >>> io.save("out.kmb")
+    """
+
+    def __init__(self):
+        self._bulk_writable = False
+
+    # Public methods
+
+    def save(self, file: Union[str, Path, BinaryIO], select=Select()) -> None:
+        """
+        Args:
+            file: output file (opened in binary mode)
+            select: selects which entities will be written (see :meth:`PDBIO.save`).
+        """
+        selection = self._get_atoms(select)
+        models, chains, residues, atoms = (
+            selection.models,
+            selection.chains,
+            selection.residues,
+            selection.atoms,
+        )
+        serial_numbers = [atom.serial_number for atom in atoms]
+        arrays = {
+            "model_id": np.array([model.id for model in models], dtype=np.int64),
+            "model_serial_num": np.array([model.serial_num for model in models], dtype=np.int64),
+            "model_num_chains": selection.chain_counts,
+            "chain_id": np.array([chain.id for chain in chains], dtype=str),
+            "chain_num_residues": selection.residue_counts,
+            "residue_hetflag": np.array([residue.id[0] for residue in residues], dtype=str),
+            "residue_resseq": np.array([residue.id[1] for residue in residues], dtype=np.int64),
+            "residue_icode": np.array([residue.id[2] for residue in residues], dtype=str),
+            "residue_resname": np.array([residue.resname for residue in residues], dtype=str),
+            "residue_segid": np.array([residue.segid for residue in residues], dtype=str),
+            "residue_num_atoms": selection.atom_counts,
+            "residue_disordered": np.array([r.disordered for r in residues], dtype=np.int64),
+            "residue_wrapped": _is_wrapped(residues),
+            "residue_selected": _is_selected_sibling(residues),
+            "atom_name": np.array([atom.name for atom in atoms], dtype=str),
+            "atom_fullname": np.array([atom.fullname for atom in atoms], dtype=str),
+            "atom_altloc": np.array([atom.altloc for atom in atoms], dtype=str),
+            "atom_element": np.array([atom.element or "" for atom in atoms], dtype=str),
+            "atom_serial_number": np.array(
+                [-1 if n is None else n for n in serial_numbers], dtype=np.int64
+            ),
+            "atom_has_serial_number": np.array([n is not None for n in serial_numbers]),
+            "atom_coord": np.asarray(selection.coord, dtype=np.float64).reshape(-1, 3),
+            "atom_bfactor": np.asarray(selection.bfactor, dtype=np.float64),
+            "atom_occupancy": np.asarray(selection.occupancy, dtype=np.float64),
+            "atom_disordered": np.array([atom.disordered for atom in atoms], dtype=np.int64),
+            "atom_wrapped": _is_wrapped(atoms),
+            "atom_selected": _is_selected_sibling(atoms),
+        }
+        # Bonds are indices into the atom store, so they are only valid if all atoms are written
+        if type(select) is Select and self._bulk_writable and self.structure.bonds is not None:
+            arrays["bonds"] = np.asarray(self.structure.bonds, dtype=np.int64).reshape(-1, 2)
+            arrays["bond_orders"] = np.asarray(self.structure.bond_orders, dtype=np.int64)
+        metadata = {
+            "format_version": KMB_FORMAT_VERSION,
+            "id": self.structure.id,
+            "header": getattr(self.structure, "header", {}),
+        }
+        arrays["metadata"] = np.array(json.dumps(metadata, default=_to_json))
+        if isinstance(file, (str, Path)):
+            with open(file, "wb") as fh:
+                np.savez(fh, **arrays)
+        else:
+            np.savez(file, **arrays)
+
+
+def _format_record_type(is_hetero):
+    return "HETATM" if is_hetero else "ATOM  "
+
+
+def _format_atom_name(fullname):
+    return fullname.strip().ljust(3).rjust(4)
+
+
+def _format_element(element):
+    return (element.strip().upper().rjust(2) if element else "  ").rjust(5)
+
+
+def _format_columns(num_lines, columns, lines=None, fallback=None):
+    """Format `columns` into an array of PDB lines.
+
+    Args:
+        num_lines: Number of lines.
+        columns: List of ``(first column, width, values, formatter)`` tuples, where
+            `formatter` is the number of decimals of numeric values, or a function or
+            format string which is applied to every unique value.
+        lines: ``(num_lines, 81)`` array of characters to fill (default: a new blank line).
+        fallback: Boolean mask of the lines which have to be formatted by Python instead,
+            which is updated in place.
+
+    Returns:
+        Tuple of `lines` and `fallback`.
+    """
+    if lines is None:
+        lines = np.full((num_lines, 81), ord(" "), dtype=np.uint8)
+        lines[:, 80] = ord("\n")
+    if fallback is None:
+        fallback = np.zeros(num_lines, dtype=bool)
+    for start, width, values, fmt in columns:
+        if isinstance(fmt, int):
+            chars, overflow = _format_numbers(values, width, fmt)
+        else:
+            chars, overflow = _format_strings(values, width, fmt)
+        lines[:, start : start + width] = chars
+        fallback |= overflow
+    return lines, fallback
+
+
+def _format_strings(values, width, fmt):
+    """Format `values` with `fmt` (a function or a format string), once for every unique value.
+
+    Returns an ``(N, width)`` array of characters and a boolean mask of the values
+    which are not formatted into exactly `width` ASCII characters.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    table = np.full((len(uniques), width), ord(" "), dtype=np.uint8)
+    invalid = np.zeros(len(uniques), dtype=bool)
+    for i, value in enumerate(uniques):
+        value = fmt(value) if callable(fmt) else fmt.format(value)
+        if len(value) == width and value.isascii():
+            table[i] = np.frombuffer(value.encode("ascii"), dtype=np.uint8)
+        else:
+            invalid[i] = True
+    return table[codes], invalid[codes]
+
+
+def _format_numbers(values, width, precision=0):
+    """Format `values` as ``"%{width}d"`` (or ``"%{width}.{precision}f"``) using NumPy.
+
+    Returns an ``(N, width)`` array of characters and a boolean mask of the values which
+    have to be formatted by Python instead, because they do not fit into `width` characters,
+    are not finite, or are too close to a rounding tie.
+    """
+    values = np.asarray(values, dtype=np.float64 if precision else np.int64)
+    if precision:
+        with np.errstate(invalid="ignore", over="ignore"):
+            scaled = np.abs(values) * 10 ** precision
+            fraction = scaled - np.floor(scaled)
+            fallback = ~np.isfinite(scaled) | (np.abs(fraction - 0.5) < 1e-6)
+            scaled[fallback] = 0
+        digits = np.floor(scaled + 0.5).astype(np.int64)
+        negative = np.signbit(values)
+    else:
+        digits = np.abs(values)
+        negative = values < 0
+        fallback = np.zeros(len(values), dtype=bool)
+    # Number of digits shown (including the zeros before the decimal point of small values)
+    powers = 10 ** np.arange(precision + 1, width, dtype=np.int64)
+    num_digits = precision + 1 + np.searchsorted(powers, digits, side="right")
+    first_column = width - num_digits - (precision > 0)
+    fallback |= first_column - negative < 0
+
+    # Digits are extracted one column at a time, so fill the transposed array
+    digits = np.minimum(digits, 10 ** width - 1).astype(np.int32)
+    chars = np.empty((width, len(values)), dtype=np.uint8)
+    for column in range(width - 1, -1, -1):
+        if precision and column == width - 1 - precision:
+            chars[column] = ord(".")
+        else:
+            digits, digit = np.divmod(digits, 10)
+            np.add(digit, ord("0"), out=chars[column], casting="unsafe")
+    chars[np.arange(width)[:, None] < first_column] = ord(" ")
+    rows = np.flatnonzero(negative & ~fallback)
+    chars[first_column[rows] - 1, rows] = ord("-")
+    chars = chars.T
+    return chars, fallback
+
+
+def _format_cif_column(values, fmt):
+    """Format `values` as an ``(N, width)`` array of the characters of mmCIF tokens.
+
+    Args:
+        values: Values to format.
+        fmt: Number of decimals of numeric values, or the token which is written
+            in place of empty strings.
+    """
+    if isinstance(fmt, str):
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        tokens = [_quote_cif(str(value), fmt).encode("utf-8") for value in uniques]
+        table = np.full((len(tokens), max(map(len, tokens), default=1)), ord(" "), np.uint8)
+        for i, token in enumerate(tokens):
+            table[i, : len(token)] = np.frombuffer(token, dtype=np.uint8)
+        return table[codes]
+    values = np.asarray(values, dtype=np.float64 if fmt else np.int64)
+    finite = values[np.isfinite(values)]
+    width = 1
+    if len(finite):
+        width = len("%.*f" % (fmt, np.abs(finite).max())) + bool(np.signbit(finite).any())
+    if width <= 9:
+        chars, fallback = _format_numbers(values, width, fmt)
+    else:
+        chars = np.empty((len(values), width), dtype=np.uint8)
+        fallback = np.ones(len(values), dtype=bool)
+    for i in np.flatnonzero(fallback):
+        value = values[i]
+        token = "%*.*f" % (width, fmt, value) if np.isfinite(value) else "?".rjust(width)
+        chars[i] = np.frombuffer(token.encode("ascii"), dtype=np.uint8)
+    return chars
+
+
+def _is_wrapped(entities):
+    """Return a boolean array which is ``True`` for the siblings of disordered entities."""
+    return np.array(
+        [
+            entity.parent is not None and entity.parent._children.get(entity.id) is not entity
+            for entity in entities
+        ],
+        dtype=bool,
+    )
+
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("Object of type {} is not JSON serializable".format(type(value).__name__))
+
+
+def _quote_cif(value, missing="?"):
+    """Return `value` as an mmCIF token, quoting it if necessary.
+
+    Empty strings are written as `missing`.
+    """
+    if not value:
+        return missing
+    if "\n" in value or "\r" in value:
+        raise ValueError("Can not write multi-line value %r to an mmCIF loop" % value)
+    if (
+        value in (".", "?")
+        or value[0] in "_#$'\"[];"
+        or any(char.isspace() for char in value)
+        or value.lower().startswith(("data_", "save_", "loop_", "global_", "stop_"))
+    ):
+        if "' " not in value:
+            return "'%s'" % value
+        elif '" ' not in value:
+            return '"%s"' % value
+        raise ValueError("Can not quote value %r in an mmCIF file" % value)
+    return value
+
+
 if __name__ == "__main__":
 
     from kmbio.PDB.PDBParser import PDBParser
@@ -7,8 +7,15 @@ except ImportError:
     warnings.warn("Cound not import cythonized `mmcif2dict` function. Performance will suffer!")
     from .mmcif_to_dict import MMCIF2Dict as mmcif2dict
 
-from .bioassembly import ProcessRemark350, get_mmcif_bioassembly_data
+from .bioassembly import (
+    BioassemblyView,
+    ProcessRemark350,
+    get_mmcif_bioassembly_data,
+    get_mmcif_transformations,
+    get_mmtf_bioassembly_data,
+)
 from .parser import Parser
 from .pdb_parser import PDBParser
 from .mmcif_parser import MMCIFParser, FastMMCIFParser
 from .mmtf_parser import MMTFParser
+from .kmb_parser import KMBParser
@@ -1,147 +1,547 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
 """
 Turn an mmCIF file into a dictionary.
 
+The file is scanned as raw bytes (memory-mapped when a filename is given).
+The tokenizer only records the start and stop offsets of every token,
+and a token is decoded into a Python string only once it is stored in the dictionary.
+When only some categories are requested, loops belonging to other categories
+are skipped line by line, without splitting them into tokens.
+Numeric columns can be parsed directly into NumPy arrays.
 """
-from cpython cimport bool
-
-
-cdef list split(unicode line):
-
-    cdef list tokens = []
-    cdef bool is_double_quote = False
-    cdef bool is_single_quote = False
-    cdef unicode cur_token = u''
-    cdef unicode whitespace = u' \t\r\n'
-    cdef unicode DQ = u'"'
-    cdef unicode SQ = u"'"
-    cdef unicode c
-
-    def flush():
-        nonlocal tokens, cur_token
-        if cur_token:
-            tokens.append(cur_token)
-            cur_token = u''
-
-    for c in line:
-        if is_double_quote:
-            if c == DQ:
-                flush()
-                is_double_quote = False
-            else:
-                cur_token += c
-        elif is_single_quote:
-            if c == SQ:
-                flush()
-                is_single_quote = False
-            else:
-                cur_token += c
-        elif c == DQ:
-            flush()
-            is_double_quote = True
-        elif c == SQ:
-            flush()
-            is_single_quote = True
-        elif c in whitespace:
-            flush()
+import mmap
+import os
+
+import numpy as np
+
+from cpython.long cimport PyLong_FromUnsignedLongLong
+from cpython.unicode cimport PyUnicode_DecodeUTF8
+from libc.math cimport NAN
+from libc.stdint cimport uint64_t
+from libc.string cimport memcmp
+
+# Token kinds
+cdef enum:
+    END = 0
+    WORD = 1  # Unquoted token
+    QUOTED = 2  # Token enclosed in single or double quotes
+    TEXT = 3  # Multi-line text field, enclosed in lines starting with ';'
+    COMMENT = 4
+
+
+# Decoded one- and two-byte tokens, which make up most of the values in mmCIF files
+cdef list _short_tokens = [None] * (256 + 65536)
+
+
+# Powers of ten which are represented exactly as doubles
+cdef double _POW10[23]
+_POW10[0] = 1.0
+for _i in range(1, 23):
+    _POW10[_i] = _POW10[_i - 1] * 10.0
+
+
+cdef inline bint is_missing(const unsigned char* s, Py_ssize_t length) noexcept nogil:
+    """Return `True` for the '?' (unknown) and '.' (not applicable) placeholders."""
+    return length == 1 and (s[0] == b'?' or s[0] == b'.')
+
+
+cdef int parse_double(const unsigned char* s, Py_ssize_t length, double* out) noexcept nogil:
+    """Parse a decimal number, such as '-12.345' or '1.5E-3'.
+
+    Returns 0 on success, and -1 if the number could not be parsed exactly,
+    in which case the caller should fall back on Python's `float`.
+    """
+    cdef Py_ssize_t i = 0
+    cdef bint negative = False
+    cdef bint exp_negative = False
+    cdef uint64_t mantissa = 0
+    cdef int n_digits = 0
+    cdef int n_fraction = 0
+    cdef int exponent = 0
+    cdef bint fraction = False
+    cdef double value
+    if i < length and (s[i] == b'-' or s[i] == b'+'):
+        negative = s[i] == b'-'
+        i += 1
+    while i < length:
+        if b'0' <= s[i] <= b'9':
+            mantissa = mantissa * 10 + (s[i] - c'0')
+            n_digits += 1
+            n_fraction += fraction
+            if n_digits > 18:
+                return -1
+        elif s[i] == b'.' and not fraction:
+            fraction = True
         else:
-            cur_token += c
-    flush()
+            break
+        i += 1
+    if n_digits == 0:
+        return -1
+    if i < length and (s[i] == b'e' or s[i] == b'E'):
+        i += 1
+        if i < length and (s[i] == b'-' or s[i] == b'+'):
+            exp_negative = s[i] == b'-'
+            i += 1
+        if i == length:
+            return -1
+        while i < length and b'0' <= s[i] <= b'9' and exponent < 1000:
+            exponent = exponent * 10 + (s[i] - c'0')
+            i += 1
+        if exp_negative:
+            exponent = -exponent
+    if i != length:
+        return -1
+    exponent -= n_fraction
+    if mantissa == 0:
+        value = 0.0
+    elif mantissa > (1ULL << 53) or exponent < -22 or exponent > 22:
+        # Outside of the range where the result is correctly rounded
+        return -1
+    elif exponent < 0:
+        value = <double> mantissa / _POW10[-exponent]
+    else:
+        value = <double> mantissa * _POW10[exponent]
+    out[0] = -value if negative else value
+    return 0
 
-    return tokens
 
+cdef int parse_int(const unsigned char* s, Py_ssize_t length, int* out) noexcept nogil:
+    """Parse a 32-bit integer. Returns 0 on success and -1 on failure."""
+    cdef Py_ssize_t i = 0
+    cdef bint negative = False
+    cdef long long value = 0
+    if i < length and (s[i] == b'-' or s[i] == b'+'):
+        negative = s[i] == b'-'
+        i += 1
+    if i == length or length - i > 10:
+        return -1
+    while i < length:
+        if not (b'0' <= s[i] <= b'9'):
+            return -1
+        value = value * 10 + (s[i] - c'0')
+        i += 1
+    if negative:
+        value = -value
+    if value < -2147483648 or value > 2147483647:
+        return -1
+    out[0] = <int> value
+    return 0
 
-def tokenize(handle):
-    cdef unicode line
-    cdef unicode token
 
-    for line in handle:
-        if line.startswith(u"#"):
-            yield line.strip()
-        elif line.startswith(u";"):
-            # Multi-line string are enclosed in ';'
-            token = line[1:].strip()
-            for line in handle:
-                line = line.strip()
-                if line == u';':
+cdef inline bint is_whitespace(unsigned char c) noexcept nogil:
+    return c == b' ' or c == b'\t' or c == b'\n' or c == b'\r'
+
+
+cdef class Tokenizer:
+    """Split a buffer containing an mmCIF file into tokens.
+
+    Tokens are produced by calling `next_token`, which sets the :attr:`kind`, :attr:`start`
+    and :attr:`stop` attributes of the tokenizer without creating any Python objects.
+    """
+
+    cdef const unsigned char[:] buf
+    # Pointer to the start of `buf`, which keeps the underlying buffer alive
+    cdef const unsigned char* data
+    cdef Py_ssize_t pos
+    cdef Py_ssize_t n
+    cdef readonly int kind
+    cdef readonly Py_ssize_t start
+    cdef readonly Py_ssize_t stop
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.n = len(self.buf)
+        self.data = &self.buf[0] if self.n else NULL
+        self.pos = 0
+        self.kind = END
+        self.start = 0
+        self.stop = 0
+
+    def __iter__(self):
+        while self.next_token() != END:
+            if self.kind != COMMENT:
+                yield self.get_token()
+
+    cdef int next_token(self) noexcept nogil:
+        """Advance to the next token and return its kind."""
+        cdef const unsigned char* buf = self.data
+        cdef Py_ssize_t pos = self.pos
+        cdef Py_ssize_t n = self.n
+        cdef unsigned char c, quote
+
+        while pos < n and is_whitespace(buf[pos]):
+            pos += 1
+        if pos >= n:
+            self.pos = n
+            self.kind = END
+            return END
+
+        c = buf[pos]
+        if c == b';' and (pos == 0 or buf[pos - 1] == b'\n' or buf[pos - 1] == b'\r'):
+            self.start = pos + 1
+            self.stop, self.pos = self._find_text_field_end(pos + 1)
+            self.kind = TEXT
+        elif c == b'#':
+            self.start = pos
+            while pos < n and buf[pos] != b'\n' and buf[pos] != b'\r':
+                pos += 1
+            self.stop = pos
+            self.pos = pos
+            self.kind = COMMENT
+        elif c == b'"' or c == b"'":
+            # The closing quote has to be followed by whitespace
+            quote = c
+            pos += 1
+            self.start = pos
+            while pos < n and buf[pos] != b'\n' and buf[pos] != b'\r':
+                if buf[pos] == quote and (pos + 1 == n or is_whitespace(buf[pos + 1])):
                     break
-                token += line
-            yield token
-        elif '"' in line or "'" in line:
-            for token in split(line.strip()):
-                yield token
+                pos += 1
+            self.stop = pos
+            self.pos = pos + 1 if pos < n and buf[pos] == quote else pos
+            self.kind = QUOTED
         else:
-            for token in line.strip().split():
-                yield token
+            self.start = pos
+            while pos < n and not is_whitespace(buf[pos]):
+                pos += 1
+            self.stop = pos
+            self.pos = pos
+            self.kind = WORD
+        return self.kind
+
+    cdef (Py_ssize_t, Py_ssize_t) _find_text_field_end(self, Py_ssize_t pos) noexcept nogil:
+        """Find the line containing only ';', which ends the text field starting at `pos`.
+
+        Returns the offset of the start of that line and the offset right after the ';'.
+        """
+        cdef const unsigned char* buf = self.data
+        cdef Py_ssize_t n = self.n
+        cdef Py_ssize_t line_start, p
+        while pos < n:
+            # Move to the start of the next line
+            while pos < n and buf[pos] != b'\n' and buf[pos] != b'\r':
+                pos += 1
+            while pos < n and (buf[pos] == b'\n' or buf[pos] == b'\r'):
+                pos += 1
+            line_start = pos
+            p = pos
+            while p < n and (buf[p] == b' ' or buf[p] == b'\t'):
+                p += 1
+            if p < n and buf[p] == b';':
+                p += 1
+                while p < n and (buf[p] == b' ' or buf[p] == b'\t'):
+                    p += 1
+                if p == n or buf[p] == b'\n' or buf[p] == b'\r':
+                    return line_start, p
+        return n, n
+
+    cdef void skip_loop(self) noexcept nogil:
+        """Skip the remainder of the current loop.
+
+        Advances to the first line which starts a new key, loop, data block or comment.
+        Values in a loop cannot start with '_', and quoted values cannot span lines,
+        so only multi-line text fields need special handling.
+        """
+        cdef const unsigned char* buf = self.data
+        cdef Py_ssize_t n = self.n
+        cdef Py_ssize_t pos = self.pos
+        cdef Py_ssize_t line_start, p
+        cdef bint in_header = True
+        while True:
+            # Move to the start of the next line
+            while pos < n and buf[pos] != b'\n' and buf[pos] != b'\r':
+                pos += 1
+            while pos < n and (buf[pos] == b'\n' or buf[pos] == b'\r'):
+                pos += 1
+            if pos >= n:
+                break
+            line_start = pos
+            if buf[pos] == b';':
+                _, pos = self._find_text_field_end(pos + 1)
+                in_header = False
+                continue
+            p = pos
+            while p < n and (buf[p] == b' ' or buf[p] == b'\t'):
+                p += 1
+            if p == n or buf[p] == b'\n' or buf[p] == b'\r':
+                continue
+            if buf[p] == b'_':
+                if in_header:
+                    continue
+                break
+            if buf[p] == b'#' or (
+                n - p >= 5
+                and (memcmp(buf + p, b"loop_", 5) == 0 or memcmp(buf + p, b"data_", 5) == 0)
+                and (n - p == 5 or is_whitespace(buf[p + 5]))
+            ):
+                break
+            in_header = False
+        self.pos = pos
 
+    cdef inline bint token_startswith(self, unsigned char c) noexcept nogil:
+        return self.stop > self.start and self.data[self.start] == c
 
-def process_tokens(tokens):
+    cdef inline bint token_equals(self, const char* value, Py_ssize_t length) noexcept nogil:
+        return (
+            self.stop - self.start == length
+            and memcmp(self.data + self.start, value, length) == 0
+        )
+
+    cpdef str get_token(self):
+        """Decode the current token."""
+        cdef str text
+        cdef Py_ssize_t length = self.stop - self.start
+        cdef Py_ssize_t idx
+        if length <= 0:
+            return u""
+        if length <= 2 and self.kind != TEXT:
+            if length == 1:
+                idx = self.data[self.start]
+            else:
+                idx = 256 + (self.data[self.start] << 8) + self.data[self.start + 1]
+            text = <str> _short_tokens[idx]
+            if text is None:
+                text = PyUnicode_DecodeUTF8(<const char*> self.data + self.start, length, NULL)
+                _short_tokens[idx] = text
+            return text
+        text = PyUnicode_DecodeUTF8(<const char*> self.data + self.start, length, NULL)
+        if self.kind == TEXT:
+            # Lines of multi-line strings are stripped and concatenated
+            return u"".join([line.strip() for line in text.split(u"\n")])
+        return text
+
+    cdef str get_interned_token(self, dict strings):
+        """Decode the current token, reusing the string created for an identical token.
+
+        Only tokens of up to seven bytes are interned, which covers the atom names,
+        residue names and chain ids that repeat throughout the `_atom_site` loop.
+        """
+        cdef Py_ssize_t length = self.stop - self.start
+        cdef uint64_t packed
+        cdef Py_ssize_t i
+        cdef object text
+        if length <= 2 or length > 7 or self.kind == TEXT:
+            return self.get_token()
+        packed = <uint64_t> length
+        for i in range(self.start, self.stop):
+            packed = (packed << 8) | self.data[i]
+        key = PyLong_FromUnsignedLongLong(packed)
+        text = strings.get(key)
+        if text is None:
+            text = PyUnicode_DecodeUTF8(<const char*> self.data + self.start, length, NULL)
+            strings[key] = text
+        return <str> text
+
+
+cdef class TypedColumn:
+    """Column of numeric values, parsed directly into a NumPy array.
+
+    Supported dtypes are ``float64``, where missing values ('?' and '.') are stored as NaN,
+    and ``int32``, which does not allow for missing values.
+    """
+
+    cdef readonly str key
+    cdef readonly object dtype
+    cdef bint is_float
+    cdef object array
+    cdef double[::1] float_values
+    cdef int[::1] int_values
+    cdef Py_ssize_t size
+
+    def __init__(self, key, dtype):
+        self.key = key
+        self.dtype = np.dtype(dtype)
+        if self.dtype == np.float64:
+            self.is_float = True
+        elif self.dtype == np.int32:
+            self.is_float = False
+        else:
+            raise ValueError(
+                "Unsupported dtype '{}' for key '{}' (use float64 or int32).".format(dtype, key)
+            )
+        self.size = 0
+        self._set_array(np.empty(64, dtype=self.dtype))
+
+    cdef _set_array(self, array):
+        self.array = array
+        if self.is_float:
+            self.float_values = array
+        else:
+            self.int_values = array
+
+    cdef int append(self, Tokenizer tokenizer) except -1:
+        cdef const unsigned char* s = tokenizer.data + tokenizer.start
+        cdef Py_ssize_t length = tokenizer.stop - tokenizer.start
+        cdef double float_value = 0
+        cdef int int_value = 0
+        if self.size == len(self.array):
+            array = np.empty(2 * self.size, dtype=self.dtype)
+            array[: self.size] = self.array
+            self._set_array(array)
+        if self.is_float:
+            if is_missing(s, length) and tokenizer.kind == WORD:
+                float_value = NAN
+            elif tokenizer.kind == TEXT or parse_double(s, length, &float_value) != 0:
+                float_value = self._parse_fallback(tokenizer, float)
+            self.float_values[self.size] = float_value
+        else:
+            if tokenizer.kind == TEXT or parse_int(s, length, &int_value) != 0:
+                int_value = self._parse_fallback(tokenizer, int)
+            self.int_values[self.size] = int_value
+        self.size += 1
+        return 0
+
+    cdef object _parse_fallback(self, Tokenizer tokenizer, type_):
+        token = tokenizer.get_token()
+        try:
+            value = type_(token)
+            if type_ is int:
+                # Raise an error if the value does not fit into an int32
+                np.int32(value)
+        except (ValueError, OverflowError):
+            raise ValueError(
+                "Could not convert value '{}' of key '{}' to {}."
+                .format(token, self.key, self.dtype)
+            ) from None
+        return value
+
+    def to_array(self):
+        return self.array[: self.size].copy()
+
+
+cdef inline bint is_selected(str key, frozenset categories):
+    return categories is None or key.partition(u".")[0] in categories
+
+
+cdef dict parse_tokens(Tokenizer tokenizer, frozenset categories=None, dict dtypes=None):
     cdef dict mmcif_dict = {}
-    cdef list keys = []
-    cdef unicode token = next(tokens)
-    cdef bool loop_flag = False
-    cdef unicode key = None
+    cdef dict strings = {}
+    cdef list columns = []
+    cdef list typed_columns = []
+    cdef object column
+    cdef TypedColumn typed_column
+    cdef bint loop_flag = False
+    cdef Py_ssize_t i = 0  # Index of the current value in the loop
+    cdef Py_ssize_t n = 0  # Number of columns in the loop
+    cdef int kind
+    cdef str token
+    cdef str key = None
+    cdef bint keep_value = True
 
+    # The first token is the data block header ("data_XXXX")
+    while tokenizer.next_token() == COMMENT:
+        pass
+    if tokenizer.kind == END:
+        return mmcif_dict
+    token = tokenizer.get_token()
     mmcif_dict[token[0:5]] = token[5:]
-    i = 0
-    n = 0
-    for token in tokens:
-        # Parse loops
-        if token == u"loop_":
-            # Start a new loop block
-            loop_flag = True
-            keys = []
-            i = 0  # Index of the current column
-            n = 0  # Number of columns in this "DataFrame"
+
+    while True:
+        kind = tokenizer.next_token()
+        if kind == END:
+            break
+        elif kind == COMMENT:
+            # Comment lines separate categories
+            loop_flag = False
             continue
-        elif loop_flag:
-            if token == '#':
-                loop_flag = False
-                continue
-            elif token.startswith(u"_") and i == 0:
-                # Parse column names into `keys`
-                mmcif_dict[token] = []
-                keys.append(token)
-                n += 1
+        elif kind == WORD:
+            if tokenizer.token_equals(b"loop_", 5):
+                # Start a new loop block
+                loop_flag = True
+                columns = []
+                i = 0
+                n = 0
                 continue
+            elif tokenizer.token_startswith(b'_'):
+                if loop_flag and i == 0:
+                    # Parse column names
+                    token = tokenizer.get_token()
+                    if not is_selected(token, categories):
+                        tokenizer.skip_loop()
+                        loop_flag = False
+                        continue
+                    if dtypes and token in dtypes:
+                        column = TypedColumn(token, dtypes[token])
+                        typed_columns.append(column)
+                    else:
+                        column = []
+                    mmcif_dict[token] = column
+                    columns.append(column)
+                    n += 1
+                    continue
+                loop_flag = False
+        if loop_flag and n:
+            # Add elements one column at a time
+            column = columns[i % n]
+            if type(column) is list:
+                (<list> column).append(tokenizer.get_interned_token(strings))
             else:
-                # Add elements one column at a time
-                mmcif_dict[keys[i % n]].append(token)
-                i += 1
-                continue
-        if token == '#':
-            continue 
-        # Key-value pairs
-        if key is None:
-            key = token
+                (<TypedColumn> column).append(tokenizer)
+            i += 1
+        elif key is None:
+            # Key-value pairs
+            key = tokenizer.get_token()
+            keep_value = is_selected(key, categories)
         else:
-            mmcif_dict[key] = token
+            if keep_value:
+                if dtypes and key in dtypes:
+                    typed_column = TypedColumn(key, dtypes[key])
+                    typed_column.append(tokenizer)
+                    mmcif_dict[key] = typed_column.to_array()[0]
+                else:
+                    mmcif_dict[key] = tokenizer.get_token()
             key = None
+    for typed_column in typed_columns:
+        mmcif_dict[typed_column.key] = typed_column.to_array()
     return mmcif_dict
 
 
-def mmcif2dict(file):
+def tokenize(data):
+    """Iterate over all tokens in `data` (a bytes-like object), skipping comments."""
+    return iter(Tokenizer(data))
+
+
+def mmcif2dict(file, categories=None, dtypes=None):
     """Parse a mmCIF file and return a dictionary.
 
     Parameters
     ----------
     file : str
-        Name of the mmCIF file OR an open filehandle.
+        Name of the mmCIF file, an open filehandle (in text or binary mode),
+        or a bytes-like object with the contents of the file.
+    categories : Iterable[str], optional
+        Names of the categories to keep (e.g. ``{"_atom_site", "_cell"}``).
+        Values of all other categories are skipped without being decoded.
+        By default, all categories are kept.
+    dtypes : Mapping[str, dtype], optional
+        Mapping from keys (e.g. ``"_atom_site.Cartn_x"``) to the dtype of their values,
+        either ``float64`` or ``int32``. Loop columns for these keys are returned as NumPy arrays,
+        and single values as NumPy scalars. Missing float values ('?' and '.') are set to NaN.
+        All other values are returned as strings.
     """
-    cdef dict mmcif_dict
-    cdef bool close_handle
-
-    if isinstance(file, str):
-        handle = open(file, 'rt')
-        close_handle = True
+    if categories is not None:
+        categories = frozenset(
+            c if c.startswith(u"_") else u"_" + c for c in categories
+        )
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as fh:
+            if os.fstat(fh.fileno()).st_size == 0:
+                return {}
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _parse_buffer(data, categories, dtypes)
+    elif isinstance(file, (bytes, bytearray, memoryview)):
+        data = file
     else:
-        handle = file
-        close_handle = False
+        data = file.read()
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+    return _parse_buffer(data, categories, dtypes)
 
-    try:
-        tokens = tokenize(handle)
-        mmcif_dict = process_tokens(tokens)
-    finally:
-        if close_handle:
-            handle.close()
 
-    return mmcif_dict
+def _parse_buffer(data, categories, dtypes):
+    # The tokenizer (and its view of `data`) is released when this function returns,
+    # so that memory maps can be closed
+    if dtypes is not None:
+        dtypes = dict(dtypes)
+    return parse_tokens(Tokenizer(data), categories, dtypes)
+
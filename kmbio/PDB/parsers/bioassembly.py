@@ -5,7 +5,7 @@ from collections import OrderedDict, namedtuple
 import numpy as np
 import pandas as pd
 
-from kmbio.PDB import BioassemblyError, Model, Structure, uniqueify
+from kmbio.PDB import BioassemblyError, Model, Structure, apply_transformations, uniqueify
 
 logger = logging.getLogger(__name__)
 
@@ -60,25 +60,222 @@ def get_translation(row):
     ]
 
 
-def apply_bioassembly(structure, bioassembly_data):
+def apply_bioassembly(structure, bioassembly_data, as_dataframe=False, lazy=False):
+    """Construct a bioassembly by applying transformations to the chains of the first model.
+
+    The coordinates of all transformed copies of a chain are calculated together,
+    with a single batched matrix multiply (see :meth:`Entity.transform_copies`).
+
+    Parameters
+    ----------
+    structure : :class:`Structure`
+        The asymmetric unit.
+    bioassembly_data : `dict`
+        Mapping from chain ids to lists of :class:`Transformation`, as returned for a single
+        bioassembly id by :class:`ProcessRemark350` or :func:`get_mmcif_bioassembly_data`.
+    as_dataframe : `bool`
+        Return the bioassembly as a DataFrame in the format of :meth:`Structure.to_dataframe`.
+        This requires only a single copy of every chain, instead of one copy per
+        transformation.
+    lazy : `bool`
+        Return a :class:`BioassemblyView`, which calculates the coordinates of the
+        transformed chains only when they are requested.
+
+    Returns
+    -------
+    bioassembly : :class:`Structure`, `pandas.DataFrame` or :class:`BioassemblyView`
+        The bioassembly, with one model for every transformation id.
+    """
     logger.debug("apply_bioassembly(%s, %s)", structure, bioassembly_data)
+    if lazy:
+        return BioassemblyView(structure, bioassembly_data)
+    if as_dataframe:
+        return _get_bioassembly_dataframe(structure, bioassembly_data)
     bioassembly = Structure(structure.id)
     for chain_id, transformations in bioassembly_data.items():
-        for transformation_id, rotation, translation in transformations:
-            transformation_idx = transformation_id - 1
-            rotation = np.array(rotation, dtype=np.float64)
-            translation = np.array(translation, dtype=np.float64)
+        _, rotations, translations = _stack_transformations(transformations)
+        chains = structure[0][chain_id].transform_copies(rotations, translations)
+        for transformation, chain in zip(transformations, chains):
+            transformation_idx = transformation.transformation_id - 1
             try:
                 model = bioassembly[transformation_idx]
             except KeyError:
                 model = Model(transformation_idx)
                 bioassembly.add(model)
-            chain = structure[0][chain_id].copy()
-            chain.transform(rotation, translation)
             model.add(chain)
     return bioassembly
 
 
+def _stack_transformations(transformations):
+    """Return the ids, ``(K, 3, 3)`` rotations and ``(K, 3)`` translations of `transformations`."""
+    transformation_ids = np.array([t.transformation_id for t in transformations], dtype=np.int64)
+    rotations = np.array([t.rotation for t in transformations], dtype=np.float64).reshape(-1, 3, 3)
+    translations = np.array([t.translation for t in transformations], dtype=np.float64)
+    return transformation_ids, rotations, translations.reshape(-1, 3)
+
+
+def _get_bioassembly_dataframe(structure, bioassembly_data):
+    # Template with a single copy of every chain that takes part in the bioassembly
+    chains = [structure[0][chain_id].copy() for chain_id in bioassembly_data]
+    template = Structure(structure.id)
+    template.add(Model(0))
+    template[0].add(chains)
+    df = template.to_dataframe()
+    chain_bounds = np.searchsorted(df["chain_idx"].values, np.arange(len(chains) + 1))
+    chain_residue_starts = np.cumsum([0] + [len(chain) for chain in chains])
+
+    # Transformed coordinates of every chain, and the (chain, copy) pairs that make up each model
+    chain_coords = []
+    model_chains = OrderedDict()
+    for chain_idx, transformations in enumerate(bioassembly_data.values()):
+        transformation_ids, rotations, translations = _stack_transformations(transformations)
+        start, stop = chain_bounds[chain_idx : chain_idx + 2]
+        coord = df[["atom_x", "atom_y", "atom_z"]].values[start:stop]
+        chain_coords.append(apply_transformations(coord, rotations, translations))
+        for copy_idx, transformation_id in enumerate(transformation_ids.tolist()):
+            model_chains.setdefault(transformation_id - 1, []).append((chain_idx, copy_idx))
+
+    rows, coords, residue_idxs, block_sizes, model_idxs, model_ids = [], [], [], [], [], []
+    residue_offset = 0
+    for model_idx, (model_id, pairs) in enumerate(model_chains.items()):
+        for chain_idx, copy_idx in pairs:
+            start, stop = chain_bounds[chain_idx : chain_idx + 2]
+            rows.append(np.arange(start, stop))
+            coords.append(chain_coords[chain_idx][copy_idx])
+            residue_idxs.append(
+                df["residue_idx"].values[start:stop]
+                - chain_residue_starts[chain_idx]
+                + residue_offset
+            )
+            residue_offset += len(chains[chain_idx])
+            block_sizes.append(stop - start)
+            model_idxs.append(model_idx)
+            model_ids.append(model_id)
+    if not rows:
+        return df.iloc[:0]
+
+    df = df.iloc[np.concatenate(rows)].reset_index(drop=True)
+    coord = np.concatenate(coords)
+    df["model_idx"] = np.repeat(model_idxs, block_sizes)
+    df["model_id"] = np.repeat(model_ids, block_sizes)
+    df["chain_idx"] = np.repeat(np.arange(len(block_sizes)), block_sizes)
+    df["residue_idx"] = np.concatenate(residue_idxs)
+    df["atom_idx"] = np.arange(len(df))
+    df["atom_x"] = coord[:, 0]
+    df["atom_y"] = coord[:, 1]
+    df["atom_z"] = coord[:, 2]
+    df["atom_extra_bonds"] = [[] for _ in range(len(df))]
+    return df
+
+
+class BioassemblyView:
+    """A lazy view of a bioassembly.
+
+    Only the asymmetric unit and the transformations are stored. The coordinates of the
+    transformed chains are calculated when they are requested, and :class:`Model` and
+    :class:`Chain` objects are created only when a model is accessed.
+
+    Models are numbered as in :func:`apply_bioassembly`, and atoms are returned in the
+    order of ``apply_bioassembly(structure, bioassembly_data).to_dataframe()``.
+
+    Attributes
+    ----------
+    structure : :class:`Structure`
+        The asymmetric unit.
+    bioassembly_data : `dict`
+        Mapping from chain ids to lists of :class:`Transformation`.
+    """
+
+    def __init__(self, structure, bioassembly_data):
+        self.structure = structure
+        self.bioassembly_data = bioassembly_data
+        # Model id -> [(chain id, index into the transformations of that chain), ...]
+        self._model_chains = OrderedDict()
+        for chain_id, transformations in bioassembly_data.items():
+            for copy_idx, transformation in enumerate(transformations):
+                self._model_chains.setdefault(transformation.transformation_id - 1, []).append(
+                    (chain_id, copy_idx)
+                )
+
+    def __repr__(self):
+        return "<BioassemblyView structure=%s n_models=%i>" % (self.structure.id, len(self))
+
+    def __len__(self):
+        return len(self._model_chains)
+
+    def __contains__(self, model_id):
+        return model_id in self._model_chains
+
+    def __iter__(self):
+        for model_id in self._model_chains:
+            yield self[model_id]
+
+    def __getitem__(self, model_id):
+        """Create the model with id `model_id`, holding transformed copies of its chains."""
+        model = Model(model_id)
+        for chain_id, copy_idx in self._model_chains[model_id]:
+            _, rotation, translation = self.bioassembly_data[chain_id][copy_idx]
+            chain = self.structure[0][chain_id].copy()
+            chain.transform(np.array(rotation, dtype=np.float64), np.array(translation))
+            model.add(chain)
+        return model
+
+    @property
+    def id(self):
+        return self.structure.id
+
+    @property
+    def model_ids(self):
+        """Ids of the models in the bioassembly."""
+        return list(self._model_chains)
+
+    @property
+    def coord(self):
+        """``(N, 3)`` array with the coordinates of all atoms in the bioassembly."""
+        return self.get_coord()
+
+    def get_coord(self, model_id=None):
+        """Calculate the coordinates of all atoms in model `model_id` (default: all models)."""
+        if model_id is None:
+            chain_copies = {
+                chain_id: self._transform_chain(chain_id) for chain_id in self.bioassembly_data
+            }
+            coords = [
+                chain_copies[chain_id][copy_idx]
+                for model_chains in self._model_chains.values()
+                for chain_id, copy_idx in model_chains
+            ]
+        else:
+            coords = [
+                self._transform_chain(chain_id, [copy_idx])[0]
+                for chain_id, copy_idx in self._model_chains[model_id]
+            ]
+        if not coords:
+            return np.zeros((0, 3), dtype=np.float64)
+        return np.concatenate(coords)
+
+    def to_structure(self):
+        """Create all models of the bioassembly (see :func:`apply_bioassembly`)."""
+        return apply_bioassembly(self.structure, self.bioassembly_data)
+
+    def to_dataframe(self):
+        """Convert the bioassembly into a DataFrame (see :func:`apply_bioassembly`)."""
+        return apply_bioassembly(self.structure, self.bioassembly_data, as_dataframe=True)
+
+    def _transform_chain(self, chain_id, copy_idxs=None):
+        """Return a ``(K, N, 3)`` array with the coordinates of the copies of chain `chain_id`."""
+        transformations = self.bioassembly_data[chain_id]
+        if copy_idxs is not None:
+            transformations = [transformations[copy_idx] for copy_idx in copy_idxs]
+        _, rotations, translations = _stack_transformations(transformations)
+        # Copies of the chain keep only the selected sibling of disordered atoms and residues
+        chain = self.structure[0][chain_id]
+        store = self.structure.atom_store
+        selected = store.annotations["selected_sibling"][chain._store_start : chain._store_stop]
+        coord = store.coord[chain._store_start : chain._store_stop][selected]
+        return apply_transformations(coord, rotations, translations)
+
+
 # === PDB ===
 class ProcessRemark350:
 
@@ -234,16 +431,51 @@ def mmcif_key_to_dataframe(sdict, key):
     return pd.DataFrame(data)
 
 
+def _mmcif_columns(sdict, keys):
+    """Return the values of ``keys`` as sequences (single-row categories are stored as scalars)."""
+    return [sdict[key] if np.ndim(sdict[key]) else [sdict[key]] for key in keys]
+
+
 def get_label_id_to_auth_id_mapping(sdict):
-    label_id_to_auth_id_df = mmcif_key_to_dataframe(sdict, "_atom_site")[
-        ["_atom_site.label_asym_id", "_atom_site.auth_asym_id"]
-    ].drop_duplicates()
-    label_id_to_auth_id = dict(label_id_to_auth_id_df.values.tolist())
-    if len(label_id_to_auth_id) != len(label_id_to_auth_id_df):
+    pairs = set(
+        zip(*_mmcif_columns(sdict, ["_atom_site.label_asym_id", "_atom_site.auth_asym_id"]))
+    )
+    label_id_to_auth_id = dict(pairs)
+    if len(label_id_to_auth_id) != len(pairs):
         raise Exception("Cound not reliably map 'label_asym_id' to 'auth_asym_id'!")
     return label_id_to_auth_id
 
 
+def get_mmcif_transformations(sdict):
+    """Extract the numbered transformations in the ``_pdbx_struct_oper_list`` mmCIF category.
+
+    Returns
+    -------
+    transformation_ids : `numpy.ndarray`
+        Integer ids of the ``K`` transformations.
+    rotations : `numpy.ndarray`
+        ``(K, 3, 3)`` array of rotation matrices, transposed as in :func:`get_rotation`.
+    translations : `numpy.ndarray`
+        ``(K, 3)`` array of translation vectors.
+    """
+    ids, *values = _mmcif_columns(
+        sdict,
+        ["_pdbx_struct_oper_list.id"]
+        + [
+            "_pdbx_struct_oper_list.matrix[{}][{}]".format(i, j)
+            for i in range(1, 4)
+            for j in range(1, 4)
+        ]
+        + ["_pdbx_struct_oper_list.vector[{}]".format(i) for i in range(1, 4)],
+    )
+    ids = np.asarray(ids)
+    mask = np.char.isdigit(ids)
+    values = np.array(values, dtype=np.float64)[:, mask].T
+    rotations = values[:, :9].reshape(-1, 3, 3).transpose(0, 2, 1)
+    translations = values[:, 9:]
+    return ids[mask].astype(np.int64), rotations, translations
+
+
 def get_mmcif_bioassembly_data(sdict, use_auth_id=False):
     """Extract chain ids and transformations for each bioassembly from mmCIF data.
 
@@ -251,65 +483,100 @@ def get_mmcif_bioassembly_data(sdict, use_auth_id=False):
     --------
     :class:`ProcessRemark350`
     """
-    # _pdbx_struct_assembly_gen
-    df = mmcif_key_to_dataframe(sdict, "_pdbx_struct_assembly_gen").set_index(
-        "_pdbx_struct_assembly_gen.assembly_id"
-    )
-    df = df[df["_pdbx_struct_assembly_gen.oper_expression"] != "P"]
-    _pdbx_struct_assembly_gen = df
-
-    # _pdbx_struct_oper_list
-    df = mmcif_key_to_dataframe(sdict, "_pdbx_struct_oper_list").set_index(
-        "_pdbx_struct_oper_list.id"
-    )
-    df = df[df.index.str.isdigit()]
-    df["transformation_id"] = df.index.astype(int)
-    df["rotation"] = df.apply(get_rotation, axis=1)
-    df["translation"] = df.apply(get_translation, axis=1)
-    _pdbx_struct_oper_list = df
-    logger.debug("_pdbx_struct_oper_list: %s", _pdbx_struct_oper_list)
+    transformations = {
+        transformation_id: Transformation(transformation_id, rotation, translation)
+        for transformation_id, rotation, translation in zip(
+            *(values.tolist() for values in get_mmcif_transformations(sdict))
+        )
+    }
+    logger.debug("transformations: %s", transformations)
 
     if use_auth_id:
         label_id_to_auth_id = get_label_id_to_auth_id_mapping(sdict)
 
     bioassembly_data = OrderedDict()
-    for bioassembly_id in _pdbx_struct_assembly_gen.index.drop_duplicates():
-        logger.debug("bioassembly_id: %s", bioassembly_id)
-        df = _pdbx_struct_assembly_gen.loc[bioassembly_id:bioassembly_id]
-        for chain_ids, transformation_ids in zip(
-            df["_pdbx_struct_assembly_gen.asym_id_list"],
-            df["_pdbx_struct_assembly_gen.oper_expression"],
-        ):
-            logger.debug("chain_ids: %s, transformation_ids: %s", chain_ids, transformation_ids)
-            chain_ids = chain_ids.split(",")
-            transformation_ids = _decode_transformation_ids(transformation_ids)
-            logger.debug(
-                "(transformed) chain_ids: %s, transformation_ids: %s", chain_ids, transformation_ids
-            )
-            transformations = _pdbx_struct_oper_list.loc[
-                [str(i) for i in transformation_ids],
-                ["transformation_id", "rotation", "translation"],
-            ].itertuples(index=False, name="Transformation")
-            transformations = list(transformations)  # Required to materialize generator
+    for bioassembly_id, chain_ids, transformation_ids in zip(
+        *_mmcif_columns(
+            sdict,
+            [
+                "_pdbx_struct_assembly_gen.assembly_id",
+                "_pdbx_struct_assembly_gen.asym_id_list",
+                "_pdbx_struct_assembly_gen.oper_expression",
+            ],
+        )
+    ):
+        if transformation_ids == "P":
+            continue
+        logger.debug(
+            "bioassembly_id: %s, chain_ids: %s, transformation_ids: %s",
+            bioassembly_id,
+            chain_ids,
+            transformation_ids,
+        )
+        chain_ids = chain_ids.split(",")
+        transformation_ids = _decode_transformation_ids(transformation_ids)
+        logger.debug(
+            "(transformed) chain_ids: %s, transformation_ids: %s", chain_ids, transformation_ids
+        )
+        bioassembly_transformations = [transformations[i] for i in transformation_ids]
+        if use_auth_id:
+            chain_ids = uniqueify([label_id_to_auth_id[c] for c in chain_ids])
+        for chain_id in chain_ids:
+            chain_transformations = bioassembly_data.setdefault(
+                str(bioassembly_id), OrderedDict()
+            ).setdefault(chain_id, [])
             if use_auth_id:
-                chain_ids = uniqueify([label_id_to_auth_id[c] for c in chain_ids])
+                existing_transformation_ids = set(
+                    t.transformation_id for t in chain_transformations
+                )
+            else:
+                # There should be no duplicates in this case
+                existing_transformation_ids = set()
+            chain_transformations.extend(
+                t
+                for t in bioassembly_transformations
+                if t.transformation_id not in existing_transformation_ids
+            )
+    return bioassembly_data
+
+
+# === MMTF ===
+def get_mmtf_bioassembly_data(bio_assembly_list, chain_names):
+    """Extract chain ids and transformations for each bioassembly from MMTF data.
+
+    Parameters
+    ----------
+    bio_assembly_list : `list`
+        The ``bioAssemblyList`` of a decoded MMTF file.
+    chain_names : `list`
+        The (author) name of every chain in the file, which is used as the chain id.
+
+    Transformations are numbered in order of first appearance within every bioassembly.
+
+    See also
+    --------
+    :func:`get_mmcif_bioassembly_data`
+    """
+    bioassembly_data = OrderedDict()
+    for bioassembly_idx, bioassembly in enumerate(bio_assembly_list):
+        bioassembly_id = str(bioassembly.get("name", bioassembly_idx + 1))
+        transformation_ids = {}
+        for transform in bioassembly["transformList"]:
+            # Row-major 4x4 matrix
+            matrix = np.reshape(np.array(transform["matrix"], dtype=np.float64), (4, 4))
+            transformation_id = transformation_ids.setdefault(
+                tuple(transform["matrix"]), len(transformation_ids) + 1
+            )
+            transformation = Transformation(
+                transformation_id, matrix[:3, :3].T.tolist(), matrix[:3, 3].tolist()
+            )
+            chain_ids = uniqueify([chain_names[i] for i in transform["chainIndexList"]])
             for chain_id in chain_ids:
-                if use_auth_id:
-                    existing_transformation_ids = set(
-                        t.transformation_id
-                        for t in bioassembly_data.get(str(bioassembly_id), {}).get(chain_id, [])
-                    )
-                else:
-                    # There should be no duplicates in this case
-                    existing_transformation_ids = set()
-                new_transformations = [
-                    t
-                    for t in transformations
-                    if t.transformation_id not in existing_transformation_ids
-                ]
-                bioassembly_data.setdefault(str(bioassembly_id), OrderedDict()).setdefault(
-                    chain_id, []
-                ).extend(new_transformations)
+                transformations = bioassembly_data.setdefault(
+                    bioassembly_id, OrderedDict()
+                ).setdefault(chain_id, [])
+                if all(t.transformation_id != transformation_id for t in transformations):
+                    transformations.append(transformation)
     return bioassembly_data
 
 
@@ -0,0 +1,388 @@
+"""Parser for the binary ``.kmb`` structure files written by :class:`kmbio.PDB.KMBIO`.
+
+A ``.kmb`` file is an uncompressed NumPy ``.npz`` archive with one array per column of
+the atoms, residues, chains and models of a structure, which are laid out in the order
+of the atom store (see :class:`kmbio.PDB.core.atom_store.AtomStore`). The hierarchy is
+stored as the number of chains in every model, residues in every chain and atoms in
+every residue. The structure id and header (including bioassembly data) are stored
+as JSON in the ``metadata`` array.
+"""
+import io
+import json
+import struct
+import zipfile
+from collections import OrderedDict
+from typing import Union
+
+import numpy as np
+
+from kmbio.PDB.core.atom import Atom, DisorderedAtom
+from kmbio.PDB.core.atom_store import _remap_bonds
+from kmbio.PDB.core.chain import Chain
+from kmbio.PDB.core.model import Model
+from kmbio.PDB.core.residue import DisorderedResidue, Residue
+from kmbio.PDB.core.structure import Structure
+from kmbio.PDB.exceptions import BioassemblyError, PDBConstructionException
+
+from .bioassembly import Transformation, apply_bioassembly
+from .parser import Parser, _filter_mask, _gc_paused
+
+#: Version of the ``.kmb`` file format written by :class:`kmbio.PDB.KMBIO`
+KMB_FORMAT_VERSION = 1
+
+
+class KMBParser(Parser):
+    """Load a structure from a binary ``.kmb`` file.
+
+    Nothing has to be parsed, so loading a ``.kmb`` file is much faster than loading
+    a text file. Most of the time is spent creating the atoms, residues and chains,
+    which get their own copies of the data. Only :func:`read_kmb_arrays`, which
+    memory-maps the arrays in a regular file, gives zero-copy access to the columns.
+
+    Disordered atoms and residues are restored with the same selected siblings,
+    as are the ``bonds`` and ``bond_orders`` of the structure.
+    """
+
+    def __init__(
+        self, models=None, chains=None, altloc=None, skip_water=False, skip_hydrogen=False
+    ):
+        """Create a KMBParser object.
+
+        :param models: model id or list of model ids to build
+        :param chains: chain id or list of chain ids to build
+        :param altloc: alternate location or list of alternate locations to build,
+            or "first" / "highest_occupancy" to build a single alternate location of every residue
+            (atoms without an alternate location are always built)
+        :param skip_water: if True, water molecules are not built
+        :param skip_hydrogen: if True, hydrogen (and deuterium) atoms are not built
+        """
+        self.models = models
+        self.chains = chains
+        self.altloc = altloc
+        self.skip_water = skip_water
+        self.skip_hydrogen = skip_hydrogen
+
+    @property
+    def _filters(self):
+        return {
+            "models": self.models,
+            "chains": self.chains,
+            "altloc": self.altloc,
+            "skip_water": self.skip_water,
+            "skip_hydrogen": self.skip_hydrogen,
+        }
+
+    def get_structure(
+        self,
+        filename,
+        structure_id=None,
+        bioassembly_id: Union[int, bool] = 0,
+        lazy_bioassembly: bool = False,
+    ):
+        """Load a structure from a ``.kmb`` file.
+
+        :param filename: the input file path or a binary filehandle
+        :param structure_id: the id to use for the structure (defaults to the id in the file)
+        :param bioassembly_id: the id of the bioassembly to return
+            (if 0, return the asymmetric unit)
+        :param lazy_bioassembly: return the bioassembly as a `BioassemblyView`
+        :return the structure
+        """
+        if isinstance(filename, str):
+            with open(filename, "rb") as fh:
+                arrays = read_kmb_arrays(fh)
+        else:
+            arrays = read_kmb_arrays(filename)
+        structure = self._build_structure(arrays, structure_id)
+        if bioassembly_id != 0:
+            try:
+                bioassembly_data = structure.header["bioassembly_data"][str(int(bioassembly_id))]
+            except KeyError:
+                if bioassembly_id is True:
+                    pass
+                else:
+                    raise BioassemblyError
+            else:
+                structure = apply_bioassembly(structure, bioassembly_data, lazy=lazy_bioassembly)
+        return structure
+
+    # Private methods
+
+    def _build_structure(self, arrays, structure_id=None):
+        metadata = json.loads(str(arrays["metadata"]))
+        if metadata["format_version"] > KMB_FORMAT_VERSION:
+            raise PDBConstructionException(
+                "Unsupported .kmb format version: {}".format(metadata["format_version"])
+            )
+        atom_residues = np.repeat(
+            np.arange(len(arrays["residue_resseq"])), arrays["residue_num_atoms"]
+        )
+        residue_chains = np.repeat(np.arange(len(arrays["chain_id"])), arrays["chain_num_residues"])
+        chain_models = np.repeat(np.arange(len(arrays["model_id"])), arrays["model_num_chains"])
+        num_atoms = len(atom_residues)
+        columns = _AtomColumns(arrays, atom_residues, residue_chains, chain_models)
+        keep = _filter_mask(columns, **self._filters)
+        if keep is None:
+            atom_index = slice(None)
+            residue_index = slice(None)
+            chain_index = slice(None)
+            model_index = slice(None)
+            residue_num_atoms = np.asarray(arrays["residue_num_atoms"])
+        else:
+            # Residues, chains and models without any kept atoms are skipped
+            atom_index = np.flatnonzero(keep)
+            residue_num_atoms = np.bincount(
+                atom_residues[atom_index], minlength=len(arrays["residue_resseq"])
+            )
+            residue_index = np.flatnonzero(residue_num_atoms)
+            residue_num_atoms = residue_num_atoms[residue_index]
+            chain_index = np.unique(residue_chains[residue_index])
+            model_index = np.unique(chain_models[chain_index])
+        # Bounds of the atoms of every residue, the residues of every chain
+        # and the chains of every model
+        chain_num_residues = np.bincount(
+            residue_chains[residue_index], minlength=len(arrays["chain_id"])
+        )[chain_index]
+        model_num_chains = np.bincount(
+            chain_models[chain_index], minlength=len(arrays["model_id"])
+        )[model_index]
+        residue_bounds = np.r_[0, np.cumsum(residue_num_atoms)].tolist()
+        chain_bounds = np.r_[0, np.cumsum(chain_num_residues)].tolist()
+        model_bounds = np.r_[0, np.cumsum(model_num_chains)].tolist()
+
+        # Per-model, per-chain and per-residue values, as Python objects
+        model_ids = arrays["model_id"][model_index].tolist()
+        model_serial_nums = arrays["model_serial_num"][model_index].tolist()
+        chain_ids = arrays["chain_id"][chain_index].tolist()
+        residue_ids = list(
+            zip(
+                arrays["residue_hetflag"][residue_index].tolist(),
+                arrays["residue_resseq"][residue_index].tolist(),
+                arrays["residue_icode"][residue_index].tolist(),
+            )
+        )
+        resnames = arrays["residue_resname"][residue_index].tolist()
+        segids = arrays["residue_segid"][residue_index].tolist()
+        residue_disordered = arrays["residue_disordered"][residue_index].tolist()
+        residue_wrapped = arrays["residue_wrapped"][residue_index].tolist()
+        residue_selected = arrays["residue_selected"][residue_index].tolist()
+        # Per-atom values, as Python objects
+        names = arrays["atom_name"][atom_index].tolist()
+        fullnames = arrays["atom_fullname"][atom_index].tolist()
+        altlocs = arrays["atom_altloc"][atom_index].tolist()
+        elements = arrays["atom_element"][atom_index].tolist()
+        serial_numbers = np.where(
+            arrays["atom_has_serial_number"][atom_index],
+            arrays["atom_serial_number"][atom_index],
+            None,
+        ).tolist()
+        atom_disordered = arrays["atom_disordered"][atom_index].tolist()
+        atom_wrapped = arrays["atom_wrapped"][atom_index]
+        atom_selected = arrays["atom_selected"][atom_index].tolist()
+        wrapped_counts = np.r_[0, np.cumsum(atom_wrapped)].tolist()
+        atom_wrapped = atom_wrapped.tolist()
+        coord = np.asarray(arrays["atom_coord"])[atom_index]
+        bfactor = arrays["atom_bfactor"][atom_index].tolist()
+        occupancy = arrays["atom_occupancy"][atom_index].tolist()
+
+        structure = Structure(structure_id if structure_id is not None else metadata["id"])
+        structure.header = _header_from_json(metadata["header"])
+        residues = []
+        chains = []
+        with _gc_paused():
+            for i, residue_id in enumerate(residue_ids):
+                start, stop = residue_bounds[i], residue_bounds[i + 1]
+                residue = Residue(residue_id, resnames[i], segids[i])
+                residue.disordered = residue_disordered[i]
+                residue_atoms = [
+                    Atom(*args)
+                    for args in zip(
+                        names[start:stop],
+                        coord[start:stop],
+                        bfactor[start:stop],
+                        occupancy[start:stop],
+                        altlocs[start:stop],
+                        fullnames[start:stop],
+                        serial_numbers[start:stop],
+                        elements[start:stop],
+                    )
+                ]
+                if wrapped_counts[stop] == wrapped_counts[start]:
+                    residue.add(residue_atoms)
+                else:
+                    residue.add(
+                        _wrap_siblings(
+                            residue_atoms,
+                            atom_wrapped[start:stop],
+                            atom_selected[start:stop],
+                            DisorderedAtom,
+                            "altloc",
+                        )
+                    )
+                for atom, disordered in zip(residue_atoms, atom_disordered[start:stop]):
+                    atom.disordered = disordered
+                residues.append(residue)
+            for i, chain_id in enumerate(chain_ids):
+                start, stop = chain_bounds[i], chain_bounds[i + 1]
+                chain = Chain(chain_id)
+                chain_residues = residues[start:stop]
+                if any(residue_wrapped[start:stop]):
+                    chain_residues = _wrap_siblings(
+                        chain_residues,
+                        residue_wrapped[start:stop],
+                        residue_selected[start:stop],
+                        DisorderedResidue,
+                        "resname",
+                    )
+                    if keep is not None:
+                        # Like the other parsers, residues are only wrapped if they have siblings
+                        chain_residues = [
+                            (
+                                residue.disordered_get_list()[0]
+                                if isinstance(residue, DisorderedResidue)
+                                and len(residue.disordered_get_list()) == 1
+                                else residue
+                            )
+                            for residue in chain_residues
+                        ]
+                chain.add(chain_residues)
+                chains.append(chain)
+            for i, model_id in enumerate(model_ids):
+                model = Model(model_id, model_serial_nums[i])
+                model.add(chains[model_bounds[i] : model_bounds[i + 1]])
+                structure.add(model)
+
+        if "bonds" in arrays:
+            bonds = np.asarray(arrays["bonds"])
+            bond_orders = np.asarray(arrays["bond_orders"])
+            if keep is not None:
+                store_index = np.full(num_atoms, -1, dtype=np.int64)
+                store_index[atom_index] = np.arange(len(atom_index))
+                # Bonds of atoms which are filtered out are dropped
+                bonds, bond_orders = _remap_bonds(bonds, bond_orders, store_index)
+            structure.bonds = bonds
+            structure.bond_orders = bond_orders
+        return structure
+
+
+def read_kmb_arrays(fh):
+    """Read the arrays in a ``.kmb`` file.
+
+    Arrays in a regular file are memory-mapped in copy-on-write mode, so they are not
+    read into memory until they are accessed, and changes to them are not written to the file.
+
+    Args:
+        fh: Binary filehandle.
+
+    Returns:
+        Dictionary of arrays.
+    """
+    arrays = {}
+    with zipfile.ZipFile(fh) as archive:
+        for info in archive.infolist():
+            name = info.filename[: -len(".npy")]
+            array = None
+            if isinstance(fh, io.BufferedReader) and info.compress_type == zipfile.ZIP_STORED:
+                array = _memmap_member(fh, info)
+            if array is None:
+                with archive.open(info) as member:
+                    array = np.lib.format.read_array(member, allow_pickle=False)
+            arrays[name] = array
+    return arrays
+
+
+def _memmap_member(fh, info):
+    """Memory-map the array stored (without compression) in the archive member `info`.
+
+    Returns `None` if the array can not be memory-mapped.
+    """
+    fh.seek(info.header_offset)
+    local_header = fh.read(30)
+    name_length, extra_length = struct.unpack("<HH", local_header[26:30])
+    fh.seek(info.header_offset + 30 + name_length + extra_length)
+    version = np.lib.format.read_magic(fh)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fh)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fh)
+    else:
+        return None
+    if dtype.hasobject or not shape or not np.prod(shape):
+        return None
+    return np.memmap(
+        fh,
+        dtype=dtype,
+        mode="c",
+        offset=fh.tell(),
+        shape=shape,
+        order="F" if fortran_order else "C",
+    )
+
+
+class _AtomColumns:
+    """Per-atom columns used by `_filter_mask`, expanded from the arrays of a ``.kmb`` file."""
+
+    def __init__(self, arrays, atom_residues, residue_chains, chain_models):
+        self.arrays = arrays
+        self.atom_residues = atom_residues
+        self.residue_chains = residue_chains
+        self.chain_models = chain_models
+
+    def __getitem__(self, key):
+        arrays = self.arrays
+        if key in ("altloc", "occupancy", "element", "name", "fullname"):
+            return np.asarray(arrays["atom_" + key])
+        if key == "model_id":
+            atom_chains = self.residue_chains[self.atom_residues]
+            return arrays["model_id"][self.chain_models[atom_chains]]
+        if key == "chainid":
+            return arrays["chain_id"][self.residue_chains[self.atom_residues]]
+        if key == "hetero_flag":
+            # Only the first character ("H" or "W") of the hetero flag is used by the filters
+            return arrays["residue_hetflag"].astype("U1")[self.atom_residues]
+        return arrays["residue_" + key][self.atom_residues]
+
+
+def _wrap_siblings(entities, wrapped, selected, wrapper_class, key):
+    """Group consecutive `wrapped` entities with the same id into disordered wrappers.
+
+    Args:
+        entities: List of atoms or residues.
+        wrapped: Whether every entity is a sibling in a disordered wrapper.
+        selected: Whether every entity is the selected sibling of its wrapper.
+        wrapper_class: :class:`DisorderedAtom` or :class:`DisorderedResidue`.
+        key: Attribute which identifies the siblings (``altloc`` or ``resname``).
+
+    Returns:
+        List of entities and wrappers.
+    """
+    children = []
+    wrapper = None
+    for entity, is_wrapped, is_selected in zip(entities, wrapped, selected):
+        if not is_wrapped:
+            children.append(entity)
+            wrapper = None
+            continue
+        if wrapper is None or wrapper.id != entity.id:
+            wrapper = wrapper_class(entity.id)
+            children.append(wrapper)
+        wrapper.disordered_add(entity)
+        if is_selected:
+            wrapper.disordered_select(getattr(entity, key))
+    return children
+
+
+def _header_from_json(header):
+    """Restore the bioassembly transformations in a header loaded from JSON."""
+    if "bioassembly_data" in header:
+        header["bioassembly_data"] = OrderedDict(
+            (
+                bioassembly_id,
+                OrderedDict(
+                    (chain_id, [Transformation(*t) for t in transformations])
+                    for chain_id, transformations in chains.items()
+                ),
+            )
+            for bioassembly_id, chains in header["bioassembly_data"].items()
+        )
+    return header
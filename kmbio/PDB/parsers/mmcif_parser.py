@@ -3,27 +3,67 @@
 # license.  Please see the LICENSE file that should have been included
 # as part of this package.
 """mmCIF parsers."""
+
 import logging
 from typing import Union
 
 import numpy as np
-from Bio.File import as_handle
 
-from kmbio.PDB import StructureBuilder
+from kmbio.PDB import Atom, Residue, StructureBuilder
 from kmbio.PDB.exceptions import BioassemblyError, PDBConstructionException
 
 from . import mmcif2dict
 from .bioassembly import apply_bioassembly, get_mmcif_bioassembly_data
-from .parser import Parser
+from .parser import Parser, _changes, _filter_mask, _take
 
 logger = logging.getLogger(__name__)
 
+#: mmCIF categories used to build a structure
+STRUCTURE_CATEGORIES = ("_pdbx_database_status", "_atom_site", "_cell", "_symmetry")
+
+#: mmCIF categories used to build a structure in the "coordinates only" mode
+COORDINATE_CATEGORIES = ("_pdbx_database_status", "_atom_site")
+
+#: Additional mmCIF categories required to construct bioassemblies
+BIOASSEMBLY_CATEGORIES = ("_pdbx_struct_assembly_gen", "_pdbx_struct_oper_list")
+
+#: Numeric columns which are parsed directly into NumPy arrays
+STRUCTURE_DTYPES = {
+    "_atom_site.Cartn_x": np.float64,
+    "_atom_site.Cartn_y": np.float64,
+    "_atom_site.Cartn_z": np.float64,
+    "_atom_site.B_iso_or_equiv": np.float64,
+    "_atom_site.occupancy": np.float64,
+    "_atom_site.pdbx_PDB_model_num": np.int32,
+}
+
+#: Columns with the anisotropic B factors of every atom
+ANISO_KEYS = (
+    "_atom_site.aniso_U[1][1]",
+    "_atom_site.aniso_U[1][2]",
+    "_atom_site.aniso_U[1][3]",
+    "_atom_site.aniso_U[2][2]",
+    "_atom_site.aniso_U[2][3]",
+    "_atom_site.aniso_U[3][3]",
+)
+STRUCTURE_DTYPES.update({key: np.float64 for key in ANISO_KEYS})
+
 
 class MMCIFParser(Parser):
     """Parse a mmCIF file and return a Structure object."""
 
-    def __init__(self, structure_builder=None, use_auth_id=True):
-        """Create a PDBParser object.
+    def __init__(
+        self,
+        structure_builder=None,
+        use_auth_id=True,
+        coordinates_only=False,
+        models=None,
+        chains=None,
+        altloc=None,
+        skip_water=False,
+        skip_hydrogen=False,
+    ):
+        """Create a MMCIFParser object.
 
         The mmCIF parser calls a number of standard methods in an aggregated
         StructureBuilder object. Normally this object is instanciated by the
@@ -37,11 +77,32 @@ class MMCIFParser(Parser):
          use_auth_id : `bool`
             If `True` (default) the author chain and sequence id is used
             (match with PDB information). If `False`, the mmCIF seq and chain id is used.
+         coordinates_only : `bool`
+            If `True`, only the `_atom_site` category is parsed, and all other categories
+            (such as the unit cell and symmetry) are skipped without being tokenized.
+         models : `int` | `list`
+            Model id or list of model ids (counted from 0) to build.
+         chains : `str` | `list`
+            Chain id or list of chain ids to build.
+         altloc : `str` | `list`
+            Alternate location or list of alternate locations to build,
+            or ``"first"`` / ``"highest_occupancy"`` to build a single alternate location
+            of every residue. Atoms without an alternate location are always built.
+         skip_water : `bool`
+            If `True`, water molecules are not built.
+         skip_hydrogen : `bool`
+            If `True`, hydrogen (and deuterium) atoms are not built.
         """
         if structure_builder is not None:
             self._structure_builder = structure_builder
         else:
             self._structure_builder = StructureBuilder()
+        self.coordinates_only = coordinates_only
+        self.models = models
+        self.chains = chains
+        self.altloc = altloc
+        self.skip_water = skip_water
+        self.skip_hydrogen = skip_hydrogen
         # self.header = None
         # self.trailer = None
         self.line_counter = 0
@@ -56,30 +117,57 @@ class MMCIFParser(Parser):
 
     # Public methods
 
-    def get_structure(self, filename, structure_id=None, bioassembly_id: Union[int, bool] = 0):
+    def get_structure(
+        self,
+        filename,
+        structure_id=None,
+        bioassembly_id: Union[int, bool] = 0,
+        lazy_bioassembly: bool = False,
+    ):
         """Return the structure.
 
         Parameters
         ----------
         filename: Name of the mmCIF file OR an open filehandle
         structure_id: The id that will be used for the structure
+        bioassembly_id: The id of the bioassembly to return (0 for the asymmetric unit)
+        lazy_bioassembly: Return the bioassembly as a `BioassemblyView`
         """
-        self._mmcif_dict = mmcif2dict(filename)
+        categories = COORDINATE_CATEGORIES if self.coordinates_only else STRUCTURE_CATEGORIES
+        if bioassembly_id != 0 or not self.coordinates_only:
+            categories += BIOASSEMBLY_CATEGORIES
+        try:
+            self._mmcif_dict = mmcif2dict(filename, categories=categories, dtypes=STRUCTURE_DTYPES)
+        except ValueError as e:
+            raise PDBConstructionException(str(e))
         self._build_structure(structure_id)
 
+        # Like the PDB and MMTF parsers, bioassembly data is kept in the header of the structure
+        header = {}
+        try:
+            header["bioassembly_data"] = get_mmcif_bioassembly_data(
+                self._mmcif_dict, self.use_auth_id
+            )
+        except KeyError:
+            pass
+        except Exception as e:
+            # Bioassembly data is optional, unless a bioassembly is requested
+            if bioassembly_id != 0:
+                raise
+            logger.info("Could not extract bioassembly data: %s", e)
+        self._structure_builder.set_header(header)
         structure = self._structure_builder.get_structure()
 
         if bioassembly_id != 0:
             try:
-                bioassembly_data = get_mmcif_bioassembly_data(self._mmcif_dict, self.use_auth_id)
-                bioassembly_data = bioassembly_data[str(int(bioassembly_id))]
+                bioassembly_data = header["bioassembly_data"][str(int(bioassembly_id))]
             except KeyError:
                 if bioassembly_id is True:
                     pass
                 else:
                     raise BioassemblyError
             else:
-                structure = apply_bioassembly(structure, bioassembly_data)
+                structure = apply_bioassembly(structure, bioassembly_data, lazy=lazy_bioassembly)
         return structure
 
     # Private methods
@@ -90,11 +178,14 @@ class MMCIFParser(Parser):
             structure_id = mmcif_dict.get("_pdbx_database_status.entry_id", None)
         atom_id_list = mmcif_dict["_atom_site.label_atom_id"]
         residue_id_list = mmcif_dict["_atom_site.label_comp_id"]
+        num_atoms = len(atom_id_list)
 
         try:
             element_list = mmcif_dict["_atom_site.type_symbol"]
         except KeyError:
             element_list = None
+        if not element_list:
+            element_list = [None] * num_atoms
 
         if self.use_auth_id:
             seq_id_list = mmcif_dict["_atom_site.auth_seq_id"]
@@ -102,139 +193,184 @@ class MMCIFParser(Parser):
         else:
             seq_id_list = mmcif_dict["_atom_site.label_seq_id"]
             chain_id_list = mmcif_dict["_atom_site.label_asym_id"]
-            seq_id_auth_list = mmcif_dict["_atom_site.auth_seq_id"]
-
-        # coords
-        x_list = [float(x) for x in mmcif_dict["_atom_site.Cartn_x"]]
-        y_list = [float(x) for x in mmcif_dict["_atom_site.Cartn_y"]]
-        z_list = [float(x) for x in mmcif_dict["_atom_site.Cartn_z"]]
-        alt_list = mmcif_dict["_atom_site.label_alt_id"]
-        icode_list = mmcif_dict["_atom_site.pdbx_PDB_ins_code"]
-        b_factor_list = mmcif_dict["_atom_site.B_iso_or_equiv"]
-        occupancy_list = mmcif_dict["_atom_site.occupancy"]
-        fieldname_list = mmcif_dict["_atom_site.group_PDB"]
+        # hetero atoms do not have seq_id number in seq_label only '.'
+        # use the auth_seq number
+        seq_ids = np.asarray(seq_id_list)
+        if not self.use_auth_id:
+            seq_ids = np.where(seq_ids == ".", mmcif_dict["_atom_site.auth_seq_id"], seq_ids)
         try:
-            serial_list = [int(n) for n in mmcif_dict["_atom_site.pdbx_PDB_model_num"]]
+            seq_ids = seq_ids.astype(np.int64)
+        except ValueError:
+            raise PDBConstructionException("Invalid residue number")
+
+        # coords (parsed into NumPy arrays by `mmcif2dict`)
+        coords = np.c_[
+            mmcif_dict["_atom_site.Cartn_x"],
+            mmcif_dict["_atom_site.Cartn_y"],
+            mmcif_dict["_atom_site.Cartn_z"],
+        ]
+        altlocs = np.asarray(mmcif_dict["_atom_site.label_alt_id"])
+        altlocs = np.where(altlocs == ".", " ", altlocs)
+        icodes = np.asarray(mmcif_dict["_atom_site.pdbx_PDB_ins_code"])
+        icodes = np.where(icodes == "?", " ", icodes)
+        b_factors = mmcif_dict["_atom_site.B_iso_or_equiv"]
+        if np.isnan(b_factors).any():
+            raise PDBConstructionException("Invalid or missing B factor")
+        occupancies = mmcif_dict["_atom_site.occupancy"]
+        if np.isnan(occupancies).any():
+            raise PDBConstructionException("Invalid or missing occupancy")
+        try:
+            serial_ids = mmcif_dict["_atom_site.pdbx_PDB_model_num"]
         except KeyError:
             # No model number column
-            serial_list = None
-        except ValueError:
-            # Invalid model number (malformed file)
-            raise PDBConstructionException("Invalid model number")
+            serial_ids = None
         try:
-            aniso_u11 = mmcif_dict["_atom_site.aniso_U[1][1]"]
-            aniso_u12 = mmcif_dict["_atom_site.aniso_U[1][2]"]
-            aniso_u13 = mmcif_dict["_atom_site.aniso_U[1][3]"]
-            aniso_u22 = mmcif_dict["_atom_site.aniso_U[2][2]"]
-            aniso_u23 = mmcif_dict["_atom_site.aniso_U[2][3]"]
-            aniso_u33 = mmcif_dict["_atom_site.aniso_U[3][3]"]
-            aniso_flag = 1
+            aniso = np.c_[tuple(mmcif_dict[key] for key in ANISO_KEYS)]
         except KeyError:
             # no anisotropic B factors
-            aniso_flag = 0
+            aniso = None
+        resnames = np.asarray(residue_id_list)
+        hetatm_flags = np.where(
+            np.asarray(mmcif_dict["_atom_site.group_PDB"]) == "HETATM",
+            np.where(np.isin(resnames, ["HOH", "WAT"]), "W", "H"),
+            " ",
+        )
+
+        # Every model, chain and residue is a contiguous block of atoms
+        model_starts = np.zeros(num_atoms, dtype=bool)
+        model_starts[:1] = True
+        if serial_ids is not None:
+            model_starts[1:] = serial_ids[1:] != serial_ids[:-1]
+        # Historically, Biopython PDB parser uses model_id to mean array index
+        # so serial_id means the Model ID specified in the file
+        model_ids = np.cumsum(model_starts) - 1
+        # Index of every atom in the `_atom_site` loop
+        atom_index = np.arange(num_atoms)
+
+        keep = _filter_mask(
+            {
+                "model_id": model_ids,
+                "chainid": np.asarray(chain_id_list),
+                "altloc": altlocs,
+                "hetero_flag": hetatm_flags,
+                "resseq": seq_ids,
+                "icode": icodes,
+                "occupancy": occupancies,
+                "element": element_list,
+                "name": atom_id_list,
+                "fullname": atom_id_list,
+            },
+            self.models,
+            self.chains,
+            self.altloc,
+            self.skip_water,
+            self.skip_hydrogen,
+        )
+        if keep is not None:
+            # Skip atoms which are filtered out
+            atom_index = np.flatnonzero(keep)
+            atom_id_list, residue_id_list, element_list, chain_id_list = (
+                _take(values, keep)
+                for values in (atom_id_list, residue_id_list, element_list, chain_id_list)
+            )
+            seq_ids, coords, altlocs, icodes, b_factors, occupancies = (
+                _take(values, keep)
+                for values in (seq_ids, coords, altlocs, icodes, b_factors, occupancies)
+            )
+            resnames, hetatm_flags, model_ids = (
+                _take(values, keep) for values in (resnames, hetatm_flags, model_ids)
+            )
+            if serial_ids is not None:
+                serial_ids = serial_ids[keep]
+            if aniso is not None:
+                aniso = aniso[keep]
+            num_atoms = len(atom_index)
+            model_starts = _changes(model_ids)
+            model_starts[:1] = True
+        chain_starts = model_starts | _changes(np.asarray(chain_id_list))
+        residue_starts = chain_starts | _changes(hetatm_flags, seq_ids, icodes, resnames)
+        bounds = np.r_[np.flatnonzero(residue_starts), num_atoms].tolist()
+        # Number of atoms with an alternate location before every atom
+        altloc_counts = np.r_[0, np.cumsum(altlocs != " ")]
+
+        # Per-atom values, as Python objects
+        coords = list(coords)
+        b_factor_list = b_factors.tolist()
+        occupancy_list = occupancies.tolist()
+        altloc_list = altlocs.tolist()
+        seq_id_list = seq_ids.tolist()
+        icode_list = icodes.tolist()
+        hetatm_flag_list = hetatm_flags.tolist()
+        serial_list = serial_ids.tolist() if serial_ids is not None else None
+        model_id_list = model_ids.tolist()
+        line_counters = atom_index.tolist()
+        if aniso is not None:
+            aniso_list = [None if np.isnan(u).any() else u for u in aniso]
 
-        # Now loop over atoms and build the structure
-        current_chain_id = None
-        current_residue_id = None
-        current_resname = None
         structure_builder = self._structure_builder
         structure_builder.init_structure(structure_id)
         structure_builder.init_seg(" ")
-        # Historically, Biopython PDB parser uses model_id to mean array index
-        # so serial_id means the Model ID specified in the file
-        current_model_id = -1
-        current_serial_id = -1
-
-        for i in range(0, len(atom_id_list)):
+        # Atoms can be created in bulk, unless the structure builder has custom logic for that
+        create_atoms = type(structure_builder).init_atom is StructureBuilder.init_atom
 
+        for start, stop in zip(bounds[:-1], bounds[1:]):
             # set the line_counter for 'ATOM' lines only and not
             # as a global line counter found in the PDBParser()
             # this number should match the '_atom_site.id' index in the MMCIF
-            structure_builder.set_line_counter(i)
-
-            x = x_list[i]
-            y = y_list[i]
-            z = z_list[i]
-            resname = residue_id_list[i]
-            chainid = chain_id_list[i]
-            altloc = alt_list[i]
-            if altloc == ".":
-                altloc = " "
-            # hetero atoms do not have seq_id number in seq_label only '.'
-            # use the auth_seq number
-            if seq_id_list[i] == ".":
-                assert not self.use_auth_id
-                int_resseq = int(seq_id_auth_list[i])
-            else:
-                int_resseq = int(seq_id_list[i])
-
-            icode = icode_list[i]
-            if icode == "?":
-                icode = " "
-            name = atom_id_list[i]
-            # occupancy & B factor
-            try:
-                tempfactor = float(b_factor_list[i])
-            except ValueError:
-                raise PDBConstructionException("Invalid or missing B factor")
-            try:
-                occupancy = float(occupancy_list[i])
-            except ValueError:
-                raise PDBConstructionException("Invalid or missing occupancy")
-            fieldname = fieldname_list[i]
-            if fieldname == "HETATM":
-                if resname == "HOH" or resname == "WAT":
-                    hetatm_flag = "W"
+            structure_builder.set_line_counter(line_counters[start])
+            if model_starts[start]:
+                if serial_list is not None:
+                    structure_builder.init_model(model_id_list[start], serial_list[start])
                 else:
-                    hetatm_flag = "H"
-            else:
-                hetatm_flag = " "
-
-            resseq = (hetatm_flag, int_resseq, icode)
-
-            if serial_list is not None:
-                # model column exists; use it
-                serial_id = serial_list[i]
-                if current_serial_id != serial_id:
-                    # if serial changes, update it and start new model
-                    current_serial_id = serial_id
-                    current_model_id += 1
-                    structure_builder.init_model(current_model_id, current_serial_id)
-                    current_chain_id = None
-                    current_residue_id = None
-                    current_resname = None
-            else:
-                # no explicit model column; initialize single model
-                structure_builder.init_model(current_model_id)
-
-            if current_chain_id != chainid:
-                current_chain_id = chainid
-                structure_builder.init_chain(current_chain_id)
-                current_residue_id = None
-                current_resname = None
-
-            if current_residue_id != resseq or current_resname != resname:
-                current_residue_id = resseq
-                current_resname = resname
-                structure_builder.init_residue(resname, hetatm_flag, int_resseq, icode)
-
-            coord = np.array((x, y, z), np.float64)
-            element = element_list[i] if element_list else None
-            structure_builder.init_atom(
-                name, coord, tempfactor, occupancy, altloc, name, element=element
+                    structure_builder.init_model(model_id_list[start])
+            if chain_starts[start]:
+                structure_builder.init_chain(chain_id_list[start])
+            structure_builder.init_residue(
+                residue_id_list[start],
+                hetatm_flag_list[start],
+                seq_id_list[start],
+                icode_list[start],
             )
-            if aniso_flag == 1:
-                u = (
-                    aniso_u11[i],
-                    aniso_u12[i],
-                    aniso_u13[i],
-                    aniso_u22[i],
-                    aniso_u23[i],
-                    aniso_u33[i],
+            residue = structure_builder.residue
+            names = atom_id_list[start:stop]
+            if (
+                create_atoms
+                and type(residue) is Residue
+                and not len(residue)
+                and altloc_counts[stop] == altloc_counts[start]
+                and len(set(names)) == len(names)
+            ):
+                # A new residue without any disordered atoms
+                atoms = [
+                    Atom(name, coord, b_factor, occupancy, " ", name, None, element)
+                    for name, coord, b_factor, occupancy, element in zip(
+                        names,
+                        coords[start:stop],
+                        b_factor_list[start:stop],
+                        occupancy_list[start:stop],
+                        element_list[start:stop],
+                    )
+                ]
+                if aniso is not None:
+                    for atom, anisou_array in zip(atoms, aniso_list[start:stop]):
+                        atom.anisou_array = anisou_array
+                residue.add(atoms)
+                structure_builder.atom = atoms[-1]
+                continue
+            for i in range(start, stop):
+                structure_builder.set_line_counter(line_counters[i])
+                name = atom_id_list[i]
+                structure_builder.init_atom(
+                    name,
+                    coords[i],
+                    b_factor_list[i],
+                    occupancy_list[i],
+                    altloc_list[i],
+                    name,
+                    element=element_list[i],
                 )
-                mapped_anisou = [float(x) for x in u]
-                anisou_array = np.array(mapped_anisou, np.float64)
-                structure_builder.atom.anisou_array = anisou_array
+                if aniso is not None:
+                    structure_builder.atom.anisou_array = aniso_list[i]
         # Now try to set the cell
         try:
             a = float(mmcif_dict["_cell.length_a"])
@@ -253,10 +389,10 @@ class MMCIFParser(Parser):
             pass  # no cell found, so just ignore
 
 
-class FastMMCIFParser(Parser):
+class FastMMCIFParser(MMCIFParser):
     """Parse an MMCIF file and return a Structure object."""
 
-    def __init__(self, structure_builder=None, use_auth_id=True):
+    def __init__(self, structure_builder=None, use_auth_id=True, **kwargs):
         """Create a FastMMCIFParser object.
 
         The mmCIF parser calls a number of standard methods in an aggregated
@@ -265,231 +401,15 @@ class FastMMCIFParser(Parser):
         StructureBuilder object, the latter is used instead.
 
         The main difference between this class and the regular MMCIFParser is
-        that only 'ATOM' and 'HETATM' lines are parsed here. Use if you are
-        interested only in coordinate information.
+        that only the '_atom_site' category is parsed here. Use if you are
+        interested only in coordinate information. This is equivalent to
+        ``MMCIFParser(coordinates_only=True)``.
 
         Arguments:
          - structure_builder - an optional user implemented StructureBuilder class.
          - use_auth_id - (BOOL). If `True` (default) the author chain and sequence id
          is used (match with PDB information). If True, the mmCIF seq and chain id is used.
+         - kwargs - the ``models``, ``chains``, ``altloc``, ``skip_water`` and
+         ``skip_hydrogen`` filters accepted by :class:`MMCIFParser`.
         """
-        if structure_builder is not None:
-            self._structure_builder = structure_builder
-        else:
-            self._structure_builder = StructureBuilder()
-
-        self.line_counter = 0
-        self.build_structure = None
-
-        # Author ids is an alternative label provided by the author
-        # in order to match the identification used in the publication
-        # this is what it is used by default in the PDB format
-        # however it can be confusing for other purposes
-        self.use_auth_id = use_auth_id
-
-    # Public methods
-
-    def get_structure(self, filename, structure_id=None):
-        """Return the structure.
-
-        Arguments:
-         - structure_id - string, the id that will be used for the structure
-         - filename - name of the mmCIF file OR an open filehandle
-        """
-        with as_handle(filename) as handle:
-            self._build_structure(handle, structure_id)
-
-        return self._structure_builder.get_structure()
-
-    # Private methods
-
-    def _build_structure(self, filehandle, structure_id):
-
-        # Read only _atom_site. and atom_site_anisotrop entries
-        read_atom, read_aniso = False, False
-        _fields, _records = [], []
-        _anisof, _anisors = [], []
-        for line in filehandle:
-            if structure_id is None and line.startswith("_pdbx_database_status.entry_id"):
-                structure_id = line.strip().split()[-1]
-            elif line.startswith("_atom_site."):
-                read_atom = True
-                _fields.append(line.strip())
-            elif line.startswith("_atom_site_anisotrop."):
-                read_aniso = True
-                _anisof.append(line.strip())
-            elif read_atom and line.startswith("#"):
-                read_atom = False
-            elif read_aniso and line.startswith("#"):
-                read_aniso = False
-            elif read_atom:
-                _records.append(line.strip())
-            elif read_aniso:
-                _anisors.append(line.strip())
-
-        # Dumping the shlex module here since this particular
-        # category should be rather straightforward.
-        # Quite a performance boost..
-        _record_tbl = zip(*map(str.split, _records))
-        _anisob_tbl = zip(*map(str.split, _anisors))
-
-        mmcif_dict = dict(zip(_fields, _record_tbl))
-        mmcif_dict.update(dict(zip(_anisof, _anisob_tbl)))
-
-        # Build structure object
-        atom_id_list = mmcif_dict["_atom_site.label_atom_id"]
-        residue_id_list = mmcif_dict["_atom_site.label_comp_id"]
-
-        try:
-            element_list = mmcif_dict["_atom_site.type_symbol"]
-        except KeyError:
-            element_list = None
-
-        if "_atom_site.auth_seq_id" in mmcif_dict and self.use_auth_id:
-            seq_id_list = mmcif_dict["_atom_site.auth_seq_id"]
-        else:
-            seq_id_list = mmcif_dict["_atom_site.label_seq_id"]
-            seq_id_auth_list = mmcif_dict["_atom_site.auth_seq_id"]
-
-        if self.use_auth_id:
-            chain_id_list = mmcif_dict["_atom_site.auth_asym_id"]
-        else:
-            chain_id_list = mmcif_dict["_atom_site.label_asym_id"]
-        # coords
-
-        x_list = [float(x) for x in mmcif_dict["_atom_site.Cartn_x"]]
-        y_list = [float(x) for x in mmcif_dict["_atom_site.Cartn_y"]]
-        z_list = [float(x) for x in mmcif_dict["_atom_site.Cartn_z"]]
-        alt_list = mmcif_dict["_atom_site.label_alt_id"]
-        icode_list = mmcif_dict["_atom_site.pdbx_PDB_ins_code"]
-        b_factor_list = mmcif_dict["_atom_site.B_iso_or_equiv"]
-        occupancy_list = mmcif_dict["_atom_site.occupancy"]
-        fieldname_list = mmcif_dict["_atom_site.group_PDB"]
-
-        try:
-            serial_list = [int(n) for n in mmcif_dict["_atom_site.pdbx_PDB_model_num"]]
-        except KeyError:
-            # No model number column
-            serial_list = None
-        except ValueError:
-            # Invalid model number (malformed file)
-            raise PDBConstructionException("Invalid model number")
-
-        try:
-            aniso_u11 = mmcif_dict["_atom_site.aniso_U[1][1]"]
-            aniso_u12 = mmcif_dict["_atom_site.aniso_U[1][2]"]
-            aniso_u13 = mmcif_dict["_atom_site.aniso_U[1][3]"]
-            aniso_u22 = mmcif_dict["_atom_site.aniso_U[2][2]"]
-            aniso_u23 = mmcif_dict["_atom_site.aniso_U[2][3]"]
-            aniso_u33 = mmcif_dict["_atom_site.aniso_U[3][3]"]
-            aniso_flag = 1
-        except KeyError:
-            # no anisotropic B factors
-            aniso_flag = 0
-
-        # Now loop over atoms and build the structure
-        current_chain_id = None
-        current_residue_id = None
-        current_resname = None
-        structure_builder = self._structure_builder
-        structure_builder.init_structure(structure_id)
-        structure_builder.init_seg(" ")
-
-        # Historically, Biopython PDB parser uses model_id to mean array index
-        # so serial_id means the Model ID specified in the file
-        current_model_id = -1
-        current_serial_id = -1
-        for i in range(0, len(atom_id_list)):
-
-            # set the line_counter for 'ATOM' lines only and not
-            # as a global line counter found in the PDBParser()
-            # this number should match the '_atom_site.id' index in the MMCIF
-            structure_builder.set_line_counter(i)
-
-            x = x_list[i]
-            y = y_list[i]
-            z = z_list[i]
-            resname = residue_id_list[i]
-            chainid = chain_id_list[i]
-            altloc = alt_list[i]
-            if altloc == ".":
-                altloc = " "
-
-            # hetero atoms do not have seq_id number in seq_label only '.'
-            # use the auth_seq number
-            if not self.use_auth_id and seq_id_list[i] == ".":
-                int_resseq = int(seq_id_auth_list[i])
-            else:
-                int_resseq = int(seq_id_list[i])
-
-            icode = icode_list[i]
-            if icode == "?":
-                icode = " "
-            # Remove occasional " from quoted atom names (e.g. xNA)
-            name = atom_id_list[i].strip('"')
-
-            # occupancy & B factor
-            try:
-                tempfactor = float(b_factor_list[i])
-            except ValueError:
-                raise PDBConstructionException("Invalid or missing B factor")
-
-            try:
-                occupancy = float(occupancy_list[i])
-            except ValueError:
-                raise PDBConstructionException("Invalid or missing occupancy")
-
-            fieldname = fieldname_list[i]
-            if fieldname == "HETATM":
-                if resname == "HOH" or resname == "WAT":
-                    hetatm_flag = "W"
-                else:
-                    hetatm_flag = "H"
-            else:
-                hetatm_flag = " "
-
-            resseq = (hetatm_flag, int_resseq, icode)
-
-            if serial_list is not None:
-                # model column exists; use it
-                serial_id = serial_list[i]
-                if current_serial_id != serial_id:
-                    # if serial changes, update it and start new model
-                    current_serial_id = serial_id
-                    current_model_id += 1
-                    structure_builder.init_model(current_model_id, current_serial_id)
-                    current_chain_id = None
-                    current_residue_id = None
-                    current_resname = None
-            else:
-                # no explicit model column; initialize single model
-                structure_builder.init_model(current_model_id)
-
-            if current_chain_id != chainid:
-                current_chain_id = chainid
-                structure_builder.init_chain(current_chain_id)
-                current_residue_id = None
-                current_resname = None
-
-            if current_residue_id != resseq or current_resname != resname:
-                current_residue_id = resseq
-                current_resname = resname
-                structure_builder.init_residue(resname, hetatm_flag, int_resseq, icode)
-
-            coord = np.array((x, y, z), np.float64)
-            element = element_list[i] if element_list else None
-            structure_builder.init_atom(
-                name, coord, tempfactor, occupancy, altloc, name, element=element
-            )
-            if aniso_flag == 1:
-                u = (
-                    aniso_u11[i],
-                    aniso_u12[i],
-                    aniso_u13[i],
-                    aniso_u22[i],
-                    aniso_u23[i],
-                    aniso_u33[i],
-                )
-                mapped_anisou = [float(x) for x in u]
-                anisou_array = np.array(mapped_anisou, np.float64)
-                structure_builder.atom.anisou_array = anisou_array
+        super().__init__(structure_builder, use_auth_id, coordinates_only=True, **kwargs)
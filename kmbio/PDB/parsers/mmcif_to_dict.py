@@ -9,18 +9,23 @@ from __future__ import print_function
 
 import shlex
 
+import numpy as np
 from Bio.File import as_handle
 
 
 class MMCIF2Dict(dict):
     """Parse a mmCIF file and return a dictionary."""
 
-    def __init__(self, filename):
+    def __init__(self, filename, categories=None, dtypes=None):
         """Parse a mmCIF file and return a dictionary.
 
         Arguments:
          - file - name of the PDB file OR an open filehandle
+         - categories - names of the categories to keep (default: all categories)
+         - dtypes - mapping from keys to the dtype (float64 or int32) of their values
         """
+        if categories is not None:
+            categories = {c if c.startswith("_") else "_" + c for c in categories}
         with as_handle(filename) as handle:
             loop_flag = False
             key = None
@@ -41,22 +46,47 @@ class MMCIF2Dict(dict):
                         if i > 0:
                             loop_flag = False
                         else:
-                            self[token] = []
                             keys.append(token)
+                            if categories is None or token.partition(".")[0] in categories:
+                                self[token] = []
                             n += 1
                             continue
                     else:
-                        self[keys[i % n]].append(token)
+                        column = self.get(keys[i % n])
+                        if column is not None:
+                            column.append(token)
                         i += 1
                         continue
                 if key is None:
                     key = token
                 else:
-                    self[key] = token
+                    if categories is None or key.partition(".")[0] in categories:
+                        self[key] = token
                     key = None
+        for key, dtype in (dtypes or {}).items():
+            if key in self:
+                self[key] = self._convert(key, self[key], dtype)
 
     # Private methods
 
+    def _convert(self, key, values, dtype):
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float64, np.int32):
+            raise ValueError(
+                "Unsupported dtype '{}' for key '{}' (use float64 or int32).".format(dtype, key)
+            )
+        if dtype == np.float64:
+            missing = ("?", ".")
+            if isinstance(values, str):
+                return np.float64("nan" if values in missing else values)
+            values = ["nan" if value in missing else value for value in values]
+        try:
+            return np.array(values, dtype=dtype)[()]
+        except (ValueError, OverflowError):
+            raise ValueError(
+                "Could not convert values of key '{}' to {}.".format(key, dtype)
+            ) from None
+
     def _tokenize(self, handle):
         for line in handle:
             if line.startswith("#"):
@@ -1,31 +1,172 @@
-from mmtf import fetch, parse
+from typing import Union
 
-from kmbio.PDB import StructureBuilder
+import msgpack
+import numpy as np
+import pandas as pd
+from mmtf import MMTFDecoder, fetch, parse, parse_gzip
+from mmtf.utils import constants
 
-from .parser import Parser
+from kmbio.PDB import Atom, Residue, StructureBuilder, uniqueify
+from kmbio.PDB.core.atom_store import _remap_bonds
+from kmbio.PDB.core.structure import StructureRow
+from kmbio.PDB.exceptions import BioassemblyError
 
+from .bioassembly import apply_bioassembly, get_mmtf_bioassembly_data
+from .parser import Parser, _as_set, _changes, _filter_mask, _gc_paused
 
-def get_from_decoded(decoder):
-    structure_decoder = StructureDecoder()
+#: Hetero flag of the residues in the chains of every type of entity
+ENTITY_TYPE_HETERO_FLAGS = {"polymer": " ", "non-polymer": "H", "water": "W"}
+
+
+def get_from_decoded(decoder, **filters):
+    """Build a structure from a decoded MMTF file, using the callbacks of `StructureDecoder`.
+
+    :class:`MMTFParser` reads the decoded arrays directly, which is much faster.
+    """
+    structure_decoder = StructureDecoder(**filters)
     decoder.pass_data_on(structure_decoder)
     return structure_decoder.structure_bulder.get_structure()
 
 
 class MMTFParser(Parser):
-    """Class to get a BioPython structure from a URL or a filename."""
+    """Class to get a BioPython structure from a URL or a filename.
 
-    def get_structure(self, filename, structure_id=None):
+    Structures are built directly from the arrays held by the MMTF decoder,
+    with the per-atom data expanded and filtered in bulk (see `_MMTFData`).
+
+    The bonds stored in the file are kept in the ``bonds`` and ``bond_orders`` attributes
+    of the structure, and the header information, entities and bioassemblies
+    in its ``header`` dictionary.
+    """
+
+    def __init__(
+        self, models=None, chains=None, altloc=None, skip_water=False, skip_hydrogen=False
+    ):
+        """Create a MMTFParser object.
+
+        :param models: model id or list of model ids (counted from 0) to build
+        :param chains: chain id or list of chain ids to build
+        :param altloc: alternate location or list of alternate locations to build,
+            or "first" / "highest_occupancy" to build a single alternate location of every residue
+            (atoms without an alternate location are always built)
+        :param skip_water: if True, water molecules are not built
+        :param skip_hydrogen: if True, hydrogen (and deuterium) atoms are not built
+        """
+        self.models = models
+        self.chains = chains
+        self.altloc = altloc
+        self.skip_water = skip_water
+        self.skip_hydrogen = skip_hydrogen
+
+    @property
+    def _filters(self):
+        return {
+            "models": self.models,
+            "chains": self.chains,
+            "altloc": self.altloc,
+            "skip_water": self.skip_water,
+            "skip_hydrogen": self.skip_hydrogen,
+        }
+
+    def get_structure(
+        self,
+        filename,
+        structure_id=None,
+        bioassembly_id: Union[int, bool] = 0,
+        lazy_bioassembly: bool = False,
+    ):
         """Get a structrue from a file - given a file path.
 
-        :param file_path: the input file path
+        :param file_path: the input file path (optionally gzipped) or a binary filehandle
+        :param structure_id: the id to use for the structure (defaults to the id in the file)
+        :param bioassembly_id: the id of the bioassembly to return
+            (if 0, return the asymmetric unit)
+        :param lazy_bioassembly: return the bioassembly as a `BioassemblyView`
         :return the structure
         """
-        decoder = parse(filename)
-        structure = get_from_decoded(decoder)
-        if structure_id is not None:
-            structure.id = structure_id
+        decoder = _decode(filename)
+        structure = self._build_structure(decoder, structure_id)
+        if bioassembly_id != 0:
+            try:
+                bioassembly_data = structure.header["bioassembly_data"][str(int(bioassembly_id))]
+            except KeyError:
+                if bioassembly_id is True:
+                    pass
+                else:
+                    raise BioassemblyError
+            else:
+                structure = apply_bioassembly(structure, bioassembly_data, lazy=lazy_bioassembly)
         return structure
 
+    def get_dataframe(self, filename, structure_id=None) -> pd.DataFrame:
+        """Get the atoms in a file as a DataFrame, without building a structure.
+
+        The DataFrame has the columns of :class:`StructureRow` and can be converted
+        into a structure using :meth:`Structure.from_dataframe`. Rows are in file order,
+        and every alternate location of a disordered atom has its own row
+        (use the `altloc` filter to keep only one).
+
+        :param file_path: the input file path (optionally gzipped) or a binary filehandle
+        :return the DataFrame
+        """
+        decoder = _decode(filename)
+        data = _MMTFData(decoder, self._filters)
+        columns = data.columns
+        atom_index = data.atom_index
+        atom_groups = data.atom_groups[atom_index]
+        # Chains with the same id in the same model are merged, as in `StructureBuilder`
+        chain_idxs = {}
+        chain_idx = np.array(
+            [
+                chain_idxs.setdefault(key, len(chain_idxs)) if selected else -1
+                for key, selected in zip(
+                    zip(data.chain_models.tolist(), data.chain_names.tolist()),
+                    data.chain_selected.tolist(),
+                )
+            ],
+            dtype=np.int64,
+        )
+        residue_starts = _changes(atom_groups)
+        residue_starts[:1] = True
+        # The hetero field of residue ids consists of H_ + the residue name (e.g. H_FUC)
+        hetero_flags = columns["hetero_flag"][atom_index]
+        resnames = columns["resname"][atom_index]
+        hetero_flags = np.where(hetero_flags == "H", np.char.add("H_", resnames), hetero_flags)
+        num_atoms = len(atom_index)
+        coord = columns["coord"][atom_index]
+        df = pd.DataFrame(
+            {
+                "structure_id": np.full(
+                    num_atoms,
+                    structure_id if structure_id is not None else decoder.structure_id,
+                    dtype=object,
+                ),
+                "model_idx": (np.cumsum(data.model_selected) - 1)[columns["model_id"][atom_index]],
+                "model_id": columns["model_id"][atom_index],
+                "chain_idx": chain_idx[data.group_chains[atom_groups]],
+                "chain_id": columns["chainid"][atom_index],
+                "residue_idx": np.cumsum(residue_starts) - 1,
+                "residue_id_0": hetero_flags,
+                "residue_id_1": columns["resseq"][atom_index],
+                "residue_id_2": columns["icode"][atom_index],
+                "residue_resname": resnames,
+                "residue_segid": np.full(num_atoms, " ", dtype=object),
+                "atom_idx": np.arange(num_atoms, dtype=np.int64),
+                "atom_name": columns["name"][atom_index],
+                "atom_fullname": columns["fullname"][atom_index],
+                "atom_x": coord[:, 0],
+                "atom_y": coord[:, 1],
+                "atom_z": coord[:, 2],
+                "atom_bfactor": columns["bfactor"][atom_index],
+                "atom_occupancy": columns["occupancy"][atom_index],
+                "atom_altloc": columns["altloc"][atom_index],
+                "atom_serial_number": columns["serial_number"][atom_index],
+                "atom_extra_bonds": [[] for _ in range(num_atoms)],
+            },
+            columns=StructureRow._fields,
+        )
+        return df.infer_objects()
+
     def get_structure_from_url(self, pdb_id):
         """Get a structure from a URL - given a PDB id.
 
@@ -33,14 +174,335 @@ class MMTFParser(Parser):
         :return the structure
         """
         decoder = fetch(pdb_id)
-        return get_from_decoded(decoder)
+        return self._build_structure(decoder)
+
+    def _build_structure(self, decoder, structure_id=None):
+        data = _MMTFData(decoder, self._filters)
+        columns = data.columns
+        atom_index = data.atom_index
+        # Bounds of the (selected) atoms of every group
+        group_bounds = np.searchsorted(
+            data.atom_groups[atom_index], np.arange(len(data.group_chains) + 1)
+        ).tolist()
+        # Every chain and model is a contiguous range of groups / chains
+        chain_bounds = np.r_[0, np.cumsum(decoder.groups_per_chain)].astype(np.int64).tolist()
+        model_bounds = np.r_[0, np.cumsum(decoder.chains_per_model)].astype(np.int64).tolist()
+
+        # Atom created for every selected atom
+        atoms = [None] * len(atom_index)
+
+        # Per-atom values, as Python objects
+        names = columns["name"][atom_index].tolist()
+        coords = list(columns["coord"][atom_index])
+        b_factors = columns["bfactor"][atom_index].tolist()
+        occupancies = columns["occupancy"][atom_index].tolist()
+        altlocs = columns["altloc"][atom_index].tolist()
+        serial_numbers = columns["serial_number"][atom_index].tolist()
+        elements = columns["element"][atom_index].tolist()
+        altloc_counts = np.r_[0, np.cumsum(columns["altloc"][atom_index] != " ")].tolist()
+        # Per-group and per-chain values
+        resnames = data.group_resnames.tolist()
+        resseqs = data.group_resseqs.tolist()
+        icodes = data.group_icodes.tolist()
+        hetero_flags = data.chain_hetero_flags.tolist()
+        chain_names = data.chain_names.tolist()
+
+        structure_builder = StructureBuilder()
+        structure_builder.init_structure(
+            structure_id if structure_id is not None else decoder.structure_id
+        )
+        structure_builder.init_seg(" ")
+        structure_builder.set_header(_get_header(decoder, data.chain_names.tolist()))
+        with _gc_paused():
+            for model_id, chain_start in enumerate(model_bounds[:-1]):
+                if not data.model_selected[model_id]:
+                    continue
+                structure_builder.init_model(model_id)
+                for chain_index in range(chain_start, model_bounds[model_id + 1]):
+                    if not data.chain_selected[chain_index]:
+                        continue
+                    # A Bradley - chose to use chain_name (auth_id) as it complies
+                    # with current BioPython. Chain_id might be better.
+                    structure_builder.init_chain(chain_names[chain_index])
+                    hetero_flag = hetero_flags[chain_index]
+                    for group_index in range(
+                        chain_bounds[chain_index], chain_bounds[chain_index + 1]
+                    ):
+                        start, stop = group_bounds[group_index], group_bounds[group_index + 1]
+                        if start == stop:
+                            # No residues are created for groups without any selected atoms
+                            continue
+                        structure_builder.init_residue(
+                            resnames[group_index],
+                            hetero_flag,
+                            resseqs[group_index],
+                            icodes[group_index],
+                        )
+                        residue = structure_builder.residue
+                        residue_names = names[start:stop]
+                        if (
+                            type(residue) is Residue
+                            and not len(residue)
+                            and altloc_counts[stop] == altloc_counts[start]
+                            and len(set(residue_names)) == len(residue_names)
+                        ):
+                            # A new residue without any disordered atoms
+                            # (atom_name is in twice - the full_name is with spaces)
+                            residue_atoms = [
+                                Atom(name, coord, b_factor, occupancy, " ", name, serial, element)
+                                for name, coord, b_factor, occupancy, serial, element in zip(
+                                    residue_names,
+                                    coords[start:stop],
+                                    b_factors[start:stop],
+                                    occupancies[start:stop],
+                                    serial_numbers[start:stop],
+                                    elements[start:stop],
+                                )
+                            ]
+                            residue.add(residue_atoms)
+                            structure_builder.atom = residue_atoms[-1]
+                            atoms[start:stop] = residue_atoms
+                            continue
+                        for i in range(start, stop):
+                            structure_builder.init_atom(
+                                names[i],
+                                coords[i],
+                                b_factors[i],
+                                occupancies[i],
+                                altlocs[i],
+                                names[i],
+                                serial_number=serial_numbers[i],
+                                element=elements[i],
+                            )
+                            atoms[i] = structure_builder.atom
+
+        space_group = decoder.space_group
+        unit_cell = decoder.unit_cell
+        structure_builder.set_symmetry(
+            space_group if space_group is not None else constants.UNKNOWN_SPACE_GROUP,
+            unit_cell if unit_cell is not None else constants.UNKNOWN_UNIT_CELL,
+        )
+        structure = structure_builder.get_structure()
+
+        # Bonds refer to atoms in the file, which are mapped to their position in the atom store
+        bonds, bond_orders = data.get_bonds(decoder)
+        store = structure.atom_store
+        store_index = np.full(len(columns["name"]), -1, dtype=np.int64)
+        store_index[atom_index] = [
+            atom._store_start if atom is not None and atom._store is store else -1 for atom in atoms
+        ]
+        # Bonds of atoms which are filtered out are dropped
+        structure.bonds, structure.bond_orders = _remap_bonds(bonds, bond_orders, store_index)
+        return structure
+
+
+class _MMTFData:
+    """Per-atom, per-group and per-chain arrays of a decoded MMTF file.
+
+    The MMTF decoder stores atom names and elements once per group type, and residue,
+    chain and model data once per group, chain and model. These are expanded into
+    per-atom columns with NumPy indexing, and the filters are applied to those columns.
+
+    Attributes:
+        columns: Per-atom columns, with the keys used by `_filter_mask` and the
+            ``coord``, ``bfactor``, ``serial_number`` and ``resname`` columns.
+        atom_index: Indices of the atoms which pass the filters.
+        atom_groups: Group index of every atom.
+        group_chains: Chain index of every group.
+        chain_models: Model index of every chain.
+        model_selected, chain_selected: Boolean masks of the models and chains to build.
+    """
+
+    def __init__(self, decoder, filters):
+        num_atoms = len(decoder.x_coord_list)
+        self.chain_models = np.repeat(
+            np.arange(len(decoder.chains_per_model)), decoder.chains_per_model
+        )
+        num_chains = len(self.chain_models)
+        self.group_chains = np.repeat(np.arange(num_chains), decoder.groups_per_chain)
+        group_types = np.asarray(decoder.group_type_list, dtype=np.int64)
+        group_list = decoder.group_list
+        self.group_types = group_types
+
+        # Atoms of every group, from the atom names and elements of its group type
+        type_num_atoms = np.array([len(group["atomNameList"]) for group in group_list], np.int64)
+        type_starts = np.r_[0, np.cumsum(type_num_atoms)][:-1]
+        group_num_atoms = type_num_atoms[group_types]
+        self.atom_groups = np.repeat(np.arange(len(group_types)), group_num_atoms)
+        self.group_starts = group_starts = np.r_[0, np.cumsum(group_num_atoms)][:-1]
+        type_atom_index = (
+            np.arange(num_atoms) + (type_starts[group_types] - group_starts)[self.atom_groups]
+        )
+        type_names = np.array(
+            [name for group in group_list for name in group["atomNameList"]], dtype=str
+        )
+        type_elements = np.char.upper(
+            np.array([el for group in group_list for el in group["elementList"]], dtype=str)
+        )
+        names = type_names[type_atom_index]
+
+        # MMTF uses "\x00" (the NUL character) to indicate a blank alternate location
+        # or insertion code, but StructureBuilder expects a space instead
+        if len(decoder.alt_loc_list):
+            altlocs = _blank_nul(decoder.alt_loc_list)
+        else:
+            altlocs = np.full(num_atoms, " ")
+        if len(decoder.ins_code_list):
+            self.group_icodes = _blank_nul(decoder.ins_code_list)
+        else:
+            self.group_icodes = np.full(len(group_types), " ")
+        self.group_resseqs = np.asarray(decoder.group_id_list, dtype=np.int64)
+        self.group_resnames = np.array([group["groupName"] for group in group_list], dtype=str)[
+            group_types
+        ]
+        self.chain_names = np.array(
+            decoder.chain_name_list if len(decoder.chain_name_list) else decoder.chain_id_list,
+            dtype=str,
+        )
+        chain_types = [None] * num_chains
+        for entity in decoder.entity_list:
+            for chain_index in entity["chainIndexList"]:
+                chain_types[chain_index] = entity["type"]
+        self.chain_hetero_flags = np.array(
+            [ENTITY_TYPE_HETERO_FLAGS.get(chain_type, " ") for chain_type in chain_types],
+            dtype=str,
+        )
+
+        atom_chains = self.group_chains[self.atom_groups]
+        self.columns = {
+            "model_id": self.chain_models[atom_chains],
+            "chainid": self.chain_names[atom_chains],
+            "hetero_flag": self.chain_hetero_flags[atom_chains],
+            "resseq": self.group_resseqs[self.atom_groups],
+            "icode": self.group_icodes[self.atom_groups],
+            "resname": self.group_resnames[self.atom_groups],
+            "name": names,
+            "fullname": names,
+            "altloc": altlocs,
+            "element": type_elements[type_atom_index],
+            "coord": np.c_[decoder.x_coord_list, decoder.y_coord_list, decoder.z_coord_list],
+            "bfactor": _float_column(decoder.b_factor_list, num_atoms, 0.0),
+            "occupancy": _float_column(decoder.occupancy_list, num_atoms, 1.0),
+            "serial_number": (
+                np.asarray(decoder.atom_id_list, dtype=np.int64)
+                if len(decoder.atom_id_list)
+                else np.arange(1, num_atoms + 1)
+            ),
+        }
+        keep = _filter_mask(self.columns, **filters)
+        self.atom_index = np.arange(num_atoms) if keep is None else np.flatnonzero(keep)
+
+        # Models and chains which are filtered out are not built at all
+        models = _as_set(filters.get("models"))
+        chains = _as_set(filters.get("chains"))
+        self.model_selected = np.ones(len(decoder.chains_per_model), dtype=bool)
+        if models is not None:
+            self.model_selected &= np.isin(np.arange(len(self.model_selected)), list(models))
+        self.chain_selected = self.model_selected[self.chain_models]
+        if chains is not None:
+            self.chain_selected &= np.isin(self.chain_names, list(chains))
+        if filters.get("skip_water"):
+            self.chain_selected &= self.chain_hetero_flags != "W"
+
+    def get_bonds(self, decoder):
+        """Return all bonds, as an ``(M, 2)`` array of atom indices and an array of bond orders.
+
+        Bonds within groups are stored once per group type, with atom indices relative
+        to the start of the group, and are expanded to every group of that type.
+        """
+        group_list = decoder.group_list
+        type_bonds = [np.reshape(group["bondAtomList"], (-1, 2)) for group in group_list]
+        type_num_bonds = np.array([len(bonds) for bonds in type_bonds], dtype=np.int64)
+        type_bond_starts = np.r_[0, np.cumsum(type_num_bonds)][:-1]
+        group_num_bonds = type_num_bonds[self.group_types]
+        bond_groups = np.repeat(np.arange(len(self.group_types)), group_num_bonds)
+        group_bond_starts = np.r_[0, np.cumsum(group_num_bonds)][:-1]
+        type_bond_index = (
+            np.arange(len(bond_groups))
+            + (type_bond_starts[self.group_types] - group_bond_starts)[bond_groups]
+        )
+        type_bonds = np.concatenate(type_bonds + [np.zeros((0, 2))]).astype(np.int64)
+        type_bond_orders = np.array(
+            [order for group in group_list for order in group["bondOrderList"]], dtype=np.int64
+        )
+        bonds = [type_bonds[type_bond_index] + self.group_starts[bond_groups, None]]
+        bond_orders = [type_bond_orders[type_bond_index]]
+        # Bonds between groups, with atom indices relative to the start of the structure
+        if decoder.bond_atom_list is not None and decoder.bond_order_list is not None:
+            bonds.append(np.reshape(np.asarray(decoder.bond_atom_list, dtype=np.int64), (-1, 2)))
+            bond_orders.append(np.asarray(decoder.bond_order_list, dtype=np.int64))
+        return np.concatenate(bonds), np.concatenate(bond_orders)
+
+
+def _decode(filename):
+    """Decode an MMTF file, given its path or a binary filehandle."""
+    if hasattr(filename, "read"):
+        decoder = MMTFDecoder()
+        decoder.decode_data(msgpack.unpackb(filename.read(), raw=False))
+        return decoder
+    if str(filename).endswith(".gz"):
+        return parse_gzip(filename)
+    return parse(filename)
+
+
+def _get_header(decoder, chain_names):
+    """Collect the header information of a decoded MMTF file.
+
+    Keys are the same as in the header returned by :class:`PDBParser`, where possible.
+    """
+    return {
+        "name": decoder.title,
+        "deposition_date": decoder.deposition_date,
+        "release_date": decoder.release_date,
+        "structure_method": ", ".join(decoder.experimental_methods or ["unknown"]).lower(),
+        "resolution": decoder.resolution,
+        "r_free": decoder.r_free,
+        "r_work": decoder.r_work,
+        "entities": [
+            {
+                "description": entity.get("description", ""),
+                "type": entity["type"],
+                "sequence": entity["sequence"],
+                "chain_ids": uniqueify(chain_names[i] for i in entity["chainIndexList"]),
+            }
+            for entity in decoder.entity_list
+        ],
+        "bioassembly_data": get_mmtf_bioassembly_data(decoder.bio_assembly, chain_names),
+    }
+
+
+def _blank_nul(values):
+    # Trailing NUL characters are dropped when creating NumPy string arrays
+    values = np.array(values, dtype=str)
+    values[values == ""] = " "
+    return values
+
+
+def _float_column(values, num_atoms, default):
+    if len(values):
+        return np.asarray(values, dtype=np.float64)
+    return np.full(num_atoms, default)
 
 
 class StructureDecoder(object):
     """Class to pass the data from mmtf-python into a BioPython data structure."""
 
-    def __init__(self):
+    def __init__(
+        self, models=None, chains=None, altloc=None, skip_water=False, skip_hydrogen=False
+    ):
         self.this_type = ""
+        self.models = _as_set(models)
+        self.chains = _as_set(chains)
+        self.altloc = altloc
+        self.skip_water = skip_water
+        self.skip_hydrogen = skip_hydrogen
+        # Models and chains which are filtered out
+        self.skip_model = False
+        self.skip_chain = False
+        # Residue and atoms of the current group, which are built once all of its atoms
+        # are known, so that they can be filtered together
+        self.residue_info = None
+        self.group_atoms = []
 
     def init_structure(
         self,
@@ -98,19 +560,61 @@ class StructureDecoder(object):
         # that to the space required by StructureBuilder
         if alternative_location_id == "\x00":
             alternative_location_id = " "
-
-        # Atom_name is in twice - the full_name is with spaces
-        self.structure_bulder.init_atom(
-            str(atom_name),
-            [x, y, z],
-            temperature_factor,
-            occupancy,
-            alternative_location_id,
-            str(atom_name),
-            serial_number=serial_number,
-            element=str(element).upper(),
+        if self.skip_model or self.skip_chain:
+            return
+        self.group_atoms.append(
+            (
+                str(atom_name),
+                [x, y, z],
+                temperature_factor,
+                occupancy,
+                alternative_location_id,
+                serial_number,
+                str(element).upper(),
+            )
         )
 
+    def _build_group(self):
+        """Build the residue and atoms of the current group, skipping filtered-out atoms."""
+        atoms = self.group_atoms
+        self.group_atoms = []
+        if not atoms:
+            return
+        if self.altloc is not None or self.skip_hydrogen:
+            names = [atom[0] for atom in atoms]
+            keep = _filter_mask(
+                {
+                    "model_id": np.zeros(len(atoms), dtype=int),
+                    "chainid": [" "] * len(atoms),
+                    "resseq": np.zeros(len(atoms), dtype=int),
+                    "icode": [" "] * len(atoms),
+                    "altloc": [atom[4] for atom in atoms],
+                    "occupancy": [atom[3] for atom in atoms],
+                    "element": [atom[6] for atom in atoms],
+                    "name": names,
+                    "fullname": names,
+                },
+                altloc=self.altloc,
+                skip_hydrogen=self.skip_hydrogen,
+            )
+            atoms = [atom for atom, selected in zip(atoms, keep) if selected]
+            if not atoms:
+                return
+        self.structure_bulder.init_seg(" ")
+        self.structure_bulder.init_residue(*self.residue_info)
+        for name, coord, bfactor, occupancy, altloc, serial_number, element in atoms:
+            # Atom_name is in twice - the full_name is with spaces
+            self.structure_bulder.init_atom(
+                name,
+                coord,
+                bfactor,
+                occupancy,
+                altloc,
+                name,
+                serial_number=serial_number,
+                element=element,
+            )
+
     def set_chain_info(self, chain_id, chain_name, num_groups):
         """Set the chain information.
 
@@ -118,9 +622,7 @@ class StructureDecoder(object):
         :param chain_name: the auth chain id from mmCIF
         :param num_groups: the number of groups this chain has
         """
-        # A Bradley - chose to use chain_name (auth_id) as it complies
-        # with current BioPython. Chain_id might be better.
-        self.structure_bulder.init_chain(chain_id=chain_name)
+        self._build_group()
         if self.chain_index_to_type_map[self.chain_counter] == "polymer":
             self.this_type = " "
         elif self.chain_index_to_type_map[self.chain_counter] == "non-polymer":
@@ -128,6 +630,15 @@ class StructureDecoder(object):
         elif self.chain_index_to_type_map[self.chain_counter] == "water":
             self.this_type = "W"
         self.chain_counter += 1
+        self.skip_chain = (
+            self.skip_model
+            or (self.chains is not None and chain_name not in self.chains)
+            or (self.skip_water and self.this_type == "W")
+        )
+        # A Bradley - chose to use chain_name (auth_id) as it complies
+        # with current BioPython. Chain_id might be better.
+        if not self.skip_chain:
+            self.structure_bulder.init_chain(chain_id=chain_name)
 
     def set_entity_info(self, chain_indices, sequence, description, entity_type):
         """Set the entity level information for the structure.
@@ -176,8 +687,8 @@ class StructureDecoder(object):
         if insertion_code == "\x00":
             insertion_code = " "
 
-        self.structure_bulder.init_seg(" ")
-        self.structure_bulder.init_residue(group_name, self.this_type, group_number, insertion_code)
+        self._build_group()
+        self.residue_info = (group_name, self.this_type, group_number, insertion_code)
 
     def set_model_info(self, model_id, chain_count):
         """Set the information for a model.
@@ -185,7 +696,10 @@ class StructureDecoder(object):
         :param model_id: the index for the model
         :param chain_count: the number of chains in the model
         """
-        self.structure_bulder.init_model(model_id)
+        self._build_group()
+        self.skip_model = self.models is not None and model_id not in self.models
+        if not self.skip_model:
+            self.structure_bulder.init_model(model_id)
 
     def set_xtal_info(self, space_group, unit_cell):
         """Set the crystallographic information for the structure
@@ -225,7 +739,7 @@ class StructureDecoder(object):
 
     def finalize_structure(self):
         """Any functions needed to cleanup the structure."""
-        pass
+        self._build_group()
 
     def set_group_bond(self, atom_index_one, atom_index_two, bond_order):
         """Add bonds within a group.
@@ -1,4 +1,12 @@
+import gc
+import itertools
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+import numpy as np
+from Bio.Data import IUPACData
+
+from kmbio.PDB.core.atom import _guess_element
 
 
 class Parser(ABC):
@@ -12,7 +20,7 @@ class Parser(ABC):
     """
 
     @abstractmethod
-    def get_structure(self, filename, structure_id=None, bioassembly_id=0):
+    def get_structure(self, filename, structure_id=None, bioassembly_id=0, lazy_bioassembly=False):
         """Return the structure.
 
         Parameters
@@ -25,5 +33,152 @@ class Parser(ABC):
         bioassembly : :class:`int`
             The ID of the bioassembly to return.
             If ``0``, return the raw structure (no bioassembly transformation).
+        lazy_bioassembly : :class:`bool`
+            Return the bioassembly as a :class:`BioassemblyView`, which calculates
+            the coordinates of the transformed chains on demand.
         """
         raise NotImplementedError
+
+
+def _changes(*columns):
+    """Return a boolean mask which is ``True`` where any of `columns` changes value."""
+    changes = np.zeros(len(columns[0]), dtype=bool)
+    for column in columns:
+        changes[1:] |= column[1:] != column[:-1]
+    return changes
+
+
+@contextmanager
+def _gc_paused():
+    """Disable the cyclic garbage collector while creating large numbers of objects.
+
+    None of the new objects are garbage, so collections triggered by the allocations
+    (which scan every object created so far) are wasted work.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _as_set(values):
+    """Normalize a model, chain or alternate location filter into a set (`None` selects all)."""
+    if values is None:
+        return None
+    if isinstance(values, (str, int)):
+        return {values}
+    return set(values)
+
+
+#: Presets for the `altloc` filter, which keep a single alternate location for every residue:
+#: the first one in the file, or the one with the highest (mean) occupancy
+ALTLOC_PRESETS = ("first", "highest_occupancy")
+
+_ALTLOC_PRESET_COLUMNS = ("model_id", "chainid", "resseq", "icode", "altloc", "occupancy")
+
+
+def _filter_mask(
+    columns, models=None, chains=None, altloc=None, skip_water=False, skip_hydrogen=False
+):
+    """Return a boolean mask of the atoms that pass the given filters.
+
+    Args:
+        columns: Mapping from ``"model_id"``, ``"chainid"``, ``"altloc"``, ``"hetero_flag"``,
+            ``"resseq"``, ``"icode"``, ``"occupancy"``, ``"element"``, ``"name"`` and
+            ``"fullname"`` to arrays or lists with one value per atom.
+            Only the columns required by the filters are accessed.
+        models: Model id or list of model ids to keep.
+        chains: Chain id or list of chain ids to keep.
+        altloc: Alternate location or list of alternate locations to keep, or one of
+            `ALTLOC_PRESETS`. Atoms without an alternate location (``" "``) are always kept.
+        skip_water: Drop water molecules.
+        skip_hydrogen: Drop hydrogen (and deuterium) atoms.
+
+    Returns:
+        Boolean mask, or `None` if no filter is set.
+    """
+    if models is None and chains is None and altloc is None:
+        if not skip_water and not skip_hydrogen:
+            return None
+    mask = np.ones(len(columns["altloc"]), dtype=bool)
+    if models is not None:
+        mask &= np.isin(columns["model_id"], list(_as_set(models)))
+    if chains is not None:
+        mask &= np.isin(columns["chainid"], list(_as_set(chains)))
+    if skip_water:
+        mask &= np.asarray(columns["hetero_flag"]) != "W"
+    if skip_hydrogen:
+        mask &= ~_hydrogen_mask(columns["element"], columns["name"], columns["fullname"])
+    if isinstance(altloc, str) and altloc in ALTLOC_PRESETS:
+        # Alternate locations are chosen among the atoms which pass all other filters
+        mask[mask] = _altloc_preset_mask(
+            {key: _take(columns[key], mask) for key in _ALTLOC_PRESET_COLUMNS}, altloc
+        )
+    elif altloc is not None:
+        mask &= np.isin(columns["altloc"], list(_as_set(altloc) | {" "}))
+    return mask
+
+
+def _altloc_preset_mask(columns, preset):
+    altlocs = np.asarray(columns["altloc"])
+    mask = altlocs == " "
+    idx = np.flatnonzero(~mask)
+    if not len(idx):
+        return mask
+    altlocs = altlocs[idx]
+    # Alternate locations of a residue can have different residue names (point mutations)
+    residue_ids = _group_ids(
+        *(np.asarray(columns[key])[idx] for key in ("model_id", "chainid", "resseq", "icode"))
+    )
+    # Every residue / alternate location pair, and the first atom of every pair
+    pair_ids = _group_ids(residue_ids, altlocs)
+    _, pair_starts = np.unique(pair_ids, return_index=True)
+    pair_residue_ids = residue_ids[pair_starts]
+    if preset == "first":
+        order = np.lexsort((pair_starts, pair_residue_ids))
+    else:
+        occupancies = np.asarray(columns["occupancy"])[idx]
+        pair_occupancies = np.bincount(pair_ids, weights=occupancies) / np.bincount(pair_ids)
+        order = np.lexsort((pair_starts, -pair_occupancies, pair_residue_ids))
+    # The first pair of every residue, in the sort order
+    best_pairs = order[np.r_[True, _changes(pair_residue_ids[order])[1:]]]
+    selected_pair = np.empty(len(best_pairs), dtype=np.int64)
+    selected_pair[pair_residue_ids[best_pairs]] = best_pairs
+    mask[idx] = pair_ids == selected_pair[residue_ids]
+    return mask
+
+
+def _group_ids(*columns):
+    """Label every row with the index of its unique combination of values in `columns`."""
+    order = np.lexsort(columns[::-1])
+    group_ids = np.empty(len(order), dtype=np.int64)
+    group_ids[order] = np.cumsum(_changes(*(column[order] for column in columns)))
+    return group_ids
+
+
+def _hydrogen_mask(elements, names, fullnames):
+    """Return a mask of the hydrogen and deuterium atoms.
+
+    Atoms without a valid element are identified from their names, as in :class:`Atom`.
+    """
+    unique_elements, inverse = np.unique(
+        np.array([element or "" for element in elements], dtype=str), return_inverse=True
+    )
+    is_known = np.array(
+        [element.capitalize() in IUPACData.atom_weights for element in unique_elements], bool
+    )[inverse.ravel()]
+    mask = np.isin(np.char.upper(unique_elements), ["H", "D"])[inverse.ravel()]
+    for i in np.flatnonzero(~is_known).tolist():
+        element = _guess_element(names[i], fullnames[i])
+        mask[i] = element.capitalize() in IUPACData.atom_weights and element.upper() in ("H", "D")
+    return mask
+
+
+def _take(values, mask):
+    """Select the elements of an array or list for which `mask` is ``True``."""
+    if isinstance(values, np.ndarray):
+        return values[mask]
+    return list(itertools.compress(values, mask))
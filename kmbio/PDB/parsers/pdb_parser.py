@@ -3,6 +3,8 @@
 # license.  Please see the LICENSE file that should have been included
 # as part of this package.
 """Parser for PDB files."""
+
+import itertools
 import logging
 import re
 from typing import Dict, NamedTuple, Tuple, Union
@@ -11,11 +13,11 @@ import numpy as np
 from Bio import File
 from Bio.File import as_handle
 
-from kmbio.PDB import StructureBuilder
+from kmbio.PDB import Atom, Residue, StructureBuilder
 from kmbio.PDB.exceptions import BioassemblyError, PDBConstructionException
 
 from .bioassembly import ProcessRemark350, apply_bioassembly
-from .parser import Parser
+from .parser import Parser, _as_set, _changes, _filter_mask, _gc_paused, _take
 
 logger = logging.getLogger(__name__)
 
@@ -48,7 +50,17 @@ class PDBParser(Parser):
     # Private
     _error_message_counter: Dict[str, int]
 
-    def __init__(self, PERMISSIVE=True, get_header=False, structure_builder=None):
+    def __init__(
+        self,
+        PERMISSIVE=True,
+        get_header=False,
+        structure_builder=None,
+        models=None,
+        chains=None,
+        altloc=None,
+        skip_water=False,
+        skip_hydrogen=False,
+    ):
         """Create a PDBParser object.
 
         The PDB parser call a number of standard methods in an aggregated
@@ -62,6 +74,14 @@ class PDBParser(Parser):
            the exceptions are caught, but some residues or atoms will be missing.
            THESE EXCEPTIONS ARE DUE TO PROBLEMS IN THE PDB FILE!.
          - structure_builder - an optional user implemented StructureBuilder class.
+         - models - model id or list of model ids (counted from 0) to build.
+           Parsing stops once all selected models have been read.
+         - chains - chain id or list of chain ids to build.
+         - altloc - alternate location or list of alternate locations to build,
+           or "first" / "highest_occupancy" to build a single alternate location
+           of every residue. Atoms without an alternate location are always built.
+         - skip_water - if true, water molecules are not built.
+         - skip_hydrogen - if true, hydrogen (and deuterium) atoms are not built.
         """
         if structure_builder is not None:
             self.structure_builder = structure_builder
@@ -71,6 +91,11 @@ class PDBParser(Parser):
         self.trailer = None
         self.line_counter = 0
         self.PERMISSIVE = bool(PERMISSIVE)
+        self.models = models
+        self.chains = chains
+        self.altloc = altloc
+        self.skip_water = skip_water
+        self.skip_hydrogen = skip_hydrogen
 
         self.header = None
         self.trailer = None
@@ -79,23 +104,28 @@ class PDBParser(Parser):
     # Public methods
 
     def get_structure(
-        self, filename, structure_id: str = None, bioassembly_id: Union[int, bool] = 0
+        self,
+        filename,
+        structure_id: str = None,
+        bioassembly_id: Union[int, bool] = 0,
+        lazy_bioassembly: bool = False,
     ):
         """Return the structure.
 
         Arguments:
          - id - string, the id that will be used for the structure
          - file - name of the PDB file OR an open filehandle
+         - bioassembly_id - id of the bioassembly to return (0 for the asymmetric unit)
+         - lazy_bioassembly - return the bioassembly as a `BioassemblyView`
         """
         with as_handle(filename, mode="r") as handle:
-            data = handle.readlines()
-
-        self.header, coords_trailer = self._get_header(data)
-        if structure_id is None:
-            structure_id = self.header["id"]
+            header, coords_trailer = self._get_header(handle)
+            self.header = _parse_pdb_header_list(header)
+            if structure_id is None:
+                structure_id = self.header["id"]
 
-        self.structure_builder.init_structure(structure_id)
-        self.trailer = self._parse_coordinates(coords_trailer)
+            self.structure_builder.init_structure(structure_id)
+            self.trailer = self._parse_coordinates(coords_trailer)
         self.structure_builder.set_header(self.header)
         structure = self.structure_builder.get_structure()
 
@@ -108,42 +138,301 @@ class PDBParser(Parser):
                 else:
                     raise BioassemblyError
             else:
-                structure = apply_bioassembly(structure, bioassembly_data)
+                structure = apply_bioassembly(structure, bioassembly_data, lazy=lazy_bioassembly)
 
         return structure
 
     # Private methods
 
-    def _get_header(self, header_coords_trailer):
-        """Get the header of the PDB file, return the rest (PRIVATE)."""
-        structure_builder = self.structure_builder
-        i = 0
-        for i in range(0, len(header_coords_trailer)):
-            structure_builder.set_line_counter(i + 1)
-            line = header_coords_trailer[i]
+    def _get_header(self, handle):
+        """Read the header of the PDB file (PRIVATE).
+
+        Returns the list of header lines, and an iterator over the remaining lines of `handle`.
+        """
+        header = []
+        lines = iter(handle)
+        for line in lines:
             record_type = line[0:6]
             if record_type == "ATOM  " or record_type == "HETATM" or record_type == "MODEL ":
+                coords_trailer = itertools.chain([line], lines)
                 break
-        header = header_coords_trailer[0:i]
-        # Return the rest of the coords+trailer for further processing
-        self.line_counter = i
-        coords_trailer = header_coords_trailer[i:]
-        header_dict = _parse_pdb_header_list(header)
-        return header_dict, coords_trailer
+            header.append(line)
+        else:
+            # No coordinates, the last line is part of the trailer
+            header, coords_trailer = header[:-1], iter(header[-1:])
+        self.line_counter = len(header)
+        self.structure_builder.set_line_counter(len(header) + 1)
+        return header, coords_trailer
 
     def _parse_coordinates(self, coords_trailer):
-        """Parse the atomic data in the PDB file."""
+        """Parse the atomic data in the PDB file.
+
+        Lines are consumed from the `coords_trailer` iterator one model at a time,
+        so that only the records of the current model are held in memory.
+        Models which are filtered out are skipped here, before any of their records are parsed.
+        Returns the trailer, starting at the first END or CONECT record.
+        """
+        models = _as_set(self.models)
+        self._current_model_id = 0
+        self._current_segid = None
+        lines = []
+        model_open = False
+        skip_model = False
+        for line in coords_trailer:
+            record_type = line[0:6]
+            is_atom = record_type == "ATOM  " or record_type == "HETATM"
+            if record_type == "END   " or record_type == "CONECT":
+                self._parse_coordinate_lines(lines)
+                return [line] + list(coords_trailer)
+            if record_type == "MODEL " or (is_atom and not model_open):
+                # Start of a new model
+                self._parse_coordinate_lines(lines)
+                lines = []
+                model_open = True
+                if models is not None:
+                    if all(self._current_model_id > model_id for model_id in models):
+                        # All selected models have been read
+                        return []
+                    skip_model = self._current_model_id not in models
+                    if skip_model:
+                        self._current_model_id += 1
+            if skip_model:
+                self.line_counter += 1
+                if record_type == "ENDMDL":
+                    model_open = skip_model = False
+                continue
+            lines.append(line)
+            if record_type == "ENDMDL":
+                model_open = False
+                self._parse_coordinate_lines(lines)
+                lines = []
+        # EOF (does not end in END or CONECT)
+        self._parse_coordinate_lines(lines)
+        return []
+
+    def _parse_coordinate_lines(self, lines):
+        """Parse a list of lines with the atomic data of a single model.
+
+        ATOM and HETATM records are parsed in bulk, by viewing them as rows of a fixed-width
+        character array and converting whole columns at once. Atoms which are filtered out
+        are masked before any objects are created. Lines with malformed records
+        are parsed one at a time (see `_parse_coordinates_by_line`), which reports errors
+        at the offending line.
+        """
+        if not lines:
+            return
+        try:
+            columns = _parse_atom_columns(
+                [line for line in lines if line[0:6] == "ATOM  " or line[0:6] == "HETATM"]
+            )
+        except ValueError:
+            self._parse_coordinates_by_line(lines)
+            return
+        columns["model_id"] = np.zeros(len(columns["altloc"]), dtype=np.int64)
+        keep = _filter_mask(
+            columns,
+            chains=self.chains,
+            altloc=self.altloc,
+            skip_water=self.skip_water,
+            skip_hydrogen=self.skip_hydrogen,
+        )
+        if keep is not None:
+            _blank_records(lines, keep)
+            columns = {key: _take(values, keep) for key, values in columns.items()}
+        if np.isnan(columns["occupancy"]).any() or np.isnan(columns["bfactor"]).any():
+            self._parse_coordinates_by_line(lines)
+            return
+
+        num_atoms = 0
+        atom_line_counters = []
+        # Models (atom index, model id, MODEL line or None if the model is implicit, line counter)
+        model_events = []
+        # Atom indices at which the chain and residue have to be reinitialized
+        chain_resets = []
+        # ANISOU, SIGUIJ and SIGATM records, with the index of the atom they refer to
+        atom_records = []
+        current_model_id = self._current_model_id
+        model_open = False
+        for local_line_counter, line in enumerate(lines):
+            record_type = line[0:6]
+            if record_type == "ATOM  " or record_type == "HETATM":
+                if not model_open:
+                    model_events.append((num_atoms, current_model_id, None, local_line_counter))
+                    current_model_id += 1
+                    model_open = True
+                num_atoms += 1
+                atom_line_counters.append(local_line_counter)
+            elif record_type == "ANISOU" or record_type == "SIGUIJ" or record_type == "SIGATM":
+                atom_records.append((num_atoms - 1, record_type, line))
+            elif record_type == "MODEL ":
+                model_events.append((num_atoms, current_model_id, line, local_line_counter))
+                chain_resets.append(num_atoms)
+                current_model_id += 1
+                model_open = True
+            elif record_type == "ENDMDL":
+                chain_resets.append(num_atoms)
+                model_open = False
+
+        if (columns["occupancy"] < 0).any():
+            logger.info("Negative occupancy in one or more atoms")
+        line_counter = self.line_counter + 1
+        with _gc_paused():
+            atoms = self._build_atoms(
+                columns,
+                [i + line_counter for i in atom_line_counters],
+                [(i, model_id, line, j + line_counter) for i, model_id, line, j in model_events],
+                chain_resets,
+            )
+        self._current_model_id = current_model_id
+
+        for atom_index, record_type, line in atom_records:
+            atom = atoms[atom_index] if atom_index >= 0 else None
+            if atom is None:
+                continue
+            if record_type == "ANISOU":
+                # U's are scaled by 10^4
+                atom.anisou_array = _parse_floats(line, _ANISOU_COLUMNS) / 10000.0
+            elif record_type == "SIGUIJ":
+                # U sigma's are scaled by 10^4
+                atom.siguij_array = _parse_floats(line, _SIGUIJ_COLUMNS) / 10000.0
+            else:
+                # standard deviation of atomic positions
+                atom.sigatm_array = _parse_floats(line, _SIGATM_COLUMNS)
+
+        self.line_counter += len(lines)
+
+    def _build_atoms(self, columns, line_counters, model_events, chain_resets):
+        """Create the models, chains, residues and atoms described by `columns`.
+
+        Returns a list with the atom created for every ATOM / HETATM record.
+        """
+        structure_builder = self.structure_builder
+        num_atoms = len(line_counters)
+        segids = columns["segid"]
+        chainids = columns["chainid"]
+        hetero_flags = columns["hetero_flag"]
+        resseqs = columns["resseq"]
+        icodes = columns["icode"]
+        resnames = columns["resname"]
+        names = columns["name"]
+        altlocs = columns["altloc"]
+
+        # A new chain starts after MODEL and ENDMDL records, or when the chain id changes
+        chain_starts = _changes(np.asarray(chainids))
+        chain_starts[:1] = True
+        chain_starts[[i for i in chain_resets if i < num_atoms]] = True
+        residue_starts = chain_starts | _changes(
+            np.asarray(hetero_flags), resseqs, np.asarray(icodes), np.asarray(resnames)
+        )
+        bounds = np.r_[np.flatnonzero(residue_starts), num_atoms].tolist()
+        altloc_counts = np.r_[0, np.cumsum(np.asarray(altlocs) != " ")]
+
+        coords = list(columns["coord"])
+        occupancies = columns["occupancy"].tolist()
+        bfactors = columns["bfactor"].tolist()
+        serial_numbers = columns["serial_number"]
+        fullnames = columns["fullname"]
+        elements = columns["element"]
+        resseqs = resseqs.tolist()
+
+        # Atoms can be created in bulk, unless the structure builder has custom logic for that
+        create_atoms = type(structure_builder).init_atom is StructureBuilder.init_atom
+        atoms = [None] * num_atoms
+        model_events = iter(model_events + [(num_atoms + 1, None, None, None)])
+        next_model = next(model_events)
+        for start, stop in zip(bounds[:-1] + [num_atoms], bounds[1:] + [None]):
+            # Models are initialized before their first atom (and may be empty)
+            while next_model[0] <= start:
+                self._init_model(*next_model[1:])
+                next_model = next(model_events)
+            if stop is None:
+                break
+            global_line_counter = line_counters[start]
+            structure_builder.set_line_counter(global_line_counter)
+            if self._current_segid != segids[start]:
+                self._current_segid = segids[start]
+                structure_builder.init_seg(self._current_segid)
+            if chain_starts[start]:
+                structure_builder.init_chain(chainids[start])
+            try:
+                structure_builder.init_residue(
+                    resnames[start], hetero_flags[start], resseqs[start], icodes[start]
+                )
+            except PDBConstructionException as message:
+                self._handle_PDB_exception(message, global_line_counter)
+            residue = structure_builder.residue
+            residue_names = names[start:stop]
+            if (
+                create_atoms
+                and type(residue) is Residue
+                and not len(residue)
+                and altloc_counts[stop] == altloc_counts[start]
+                and len(set(residue_names)) == len(residue_names)
+            ):
+                # A new residue without any disordered atoms
+                residue_atoms = [
+                    Atom(*args)
+                    for args in zip(
+                        residue_names,
+                        coords[start:stop],
+                        bfactors[start:stop],
+                        occupancies[start:stop],
+                        altlocs[start:stop],
+                        fullnames[start:stop],
+                        serial_numbers[start:stop],
+                        elements[start:stop],
+                    )
+                ]
+                residue.add(residue_atoms)
+                structure_builder.atom = residue_atoms[-1]
+                atoms[start:stop] = residue_atoms
+                continue
+            for i in range(start, stop):
+                structure_builder.set_line_counter(line_counters[i])
+                try:
+                    structure_builder.init_atom(
+                        names[i],
+                        coords[i],
+                        bfactors[i],
+                        occupancies[i],
+                        altlocs[i],
+                        fullnames[i],
+                        serial_numbers[i],
+                        elements[i],
+                    )
+                except PDBConstructionException as message:
+                    self._handle_PDB_exception(message, line_counters[i])
+                atoms[i] = getattr(structure_builder, "atom", None)
+        return atoms
+
+    def _init_model(self, model_id, model_line, global_line_counter):
+        self.structure_builder.set_line_counter(global_line_counter)
+        if model_line is None:
+            logger.debug("Adding new model: %s", model_id)
+            self.structure_builder.init_model(model_id)
+            return
+        try:
+            serial_num = int(model_line[10:14])
+        except Exception:
+            self._handle_PDB_exception(
+                "Invalid or missing model serial number", global_line_counter
+            )
+            serial_num = 0
+        self.structure_builder.init_model(model_id, serial_num)
+
+    def _parse_coordinates_by_line(self, lines):
+        """Parse a list of lines with the atomic data of one or more models, one at a time."""
         local_line_counter = 0
         structure_builder = self.structure_builder
-        current_model_id = 0
+        current_model_id = self._current_model_id
         # Flag we have an open model
         model_open = 0
         current_chain_id = None
-        current_segid = None
+        current_segid = self._current_segid
         current_residue_id = None
         current_resname = None
-        for i in range(0, len(coords_trailer)):
-            line = coords_trailer[i].rstrip("\n")
+        for i in range(0, len(lines)):
+            line = lines[i].rstrip("\n")
             record_type = line[0:6]
             global_line_counter = self.line_counter + local_line_counter + 1
             structure_builder.set_line_counter(global_line_counter)
@@ -229,10 +518,6 @@ class PDBParser(Parser):
                 model_open = 1
                 current_chain_id = None
                 current_residue_id = None
-            elif record_type == "END   " or record_type == "CONECT":
-                # End of atomic data, return the trailer
-                self.line_counter += local_line_counter
-                return coords_trailer[local_line_counter:]
             elif record_type == "ENDMDL":
                 model_open = 0
                 current_chain_id = None
@@ -252,7 +537,7 @@ class PDBParser(Parser):
                 ]
                 # U sigma's are scaled by 10^4
                 siguij_array = np.array(siguij, np.float64) / 10000.0
-                structure_builder.atom.set_siguij = siguij_array
+                structure_builder.atom.siguij_array = siguij_array
             elif record_type == "SIGATM":
                 # standard deviation of atomic positions
                 sigatm = [
@@ -262,9 +547,9 @@ class PDBParser(Parser):
                 sigatm_array = np.array(sigatm, np.float64)
                 structure_builder.atom.sigatm_array = sigatm_array
             local_line_counter += 1
-        # EOF (does not end in END or CONECT)
-        self.line_counter = self.line_counter + local_line_counter
-        return []
+        self._current_model_id = current_model_id
+        self._current_segid = current_segid
+        self.line_counter += local_line_counter
 
     def _parse_atom_line(self, line: str, global_line_counter: int) -> AtomData:
         record_type = line[0:6]
@@ -364,6 +649,124 @@ class PDBParser(Parser):
             raise PDBConstructionException(message_full)
 
 
+# Columns of the ANISOU, SIGUIJ and SIGATM records
+_ANISOU_COLUMNS = ((28, 35), (35, 42), (43, 49), (49, 56), (56, 63), (63, 70))
+_SIGUIJ_COLUMNS = ((28, 35), (35, 42), (42, 49), (49, 56), (56, 63), (63, 70))
+_SIGATM_COLUMNS = ((30, 38), (38, 45), (46, 54), (54, 60), (60, 66))
+
+
+def _parse_floats(line, columns):
+    return np.array([float(line[start:stop]) for start, stop in columns], np.float64)
+
+
+def _parse_atom_columns(atom_lines):
+    """Parse ATOM and HETATM records into arrays and lists, one for every field.
+
+    Lines are padded with null bytes into an ``(N, 80)`` character array, so that every field
+    can be sliced out as a fixed-width column. Null bytes are dropped from ``numpy.bytes_``
+    values, which means that fields past the end of short lines are empty, as they would be
+    when slicing the line itself.
+
+    Invalid occupancies and B factors are set to NaN.
+
+    Raises:
+        ValueError: If a residue number or coordinate could not be parsed.
+    """
+    data = "".join(line.rstrip("\n")[:80].ljust(80, "\0") for line in atom_lines)
+    chars = np.frombuffer(data.encode("latin-1", errors="replace"), dtype="S1").reshape(-1, 80)
+
+    def column(start, stop):
+        return np.ascontiguousarray(chars[:, start:stop]).view("S%i" % (stop - start)).ravel()
+
+    resnames = _decode(column(17, 20), str.strip)
+    hetero_flags = np.where(
+        column(0, 6) == b"HETATM",
+        np.where(np.isin(resnames, ["HOH", "WAT"]), "W", "H"),
+        " ",
+    ).tolist()
+    try:
+        serial_numbers = column(6, 11).astype(np.int64).tolist()
+    except ValueError:
+        serial_numbers = [_parse_serial_number(value) for value in column(6, 11)]
+    coord = np.empty((len(atom_lines), 3), dtype=np.float64)
+    coord[:, 0] = column(30, 38).astype(np.float64)
+    coord[:, 1] = column(38, 46).astype(np.float64)
+    coord[:, 2] = column(46, 54).astype(np.float64)
+    return {
+        "fullname": _decode(column(12, 16)),
+        "name": _decode(column(12, 16), _strip_atom_name),
+        "altloc": _decode(column(16, 17), lambda altloc: altloc or " "),
+        "resname": resnames,
+        "chainid": _decode(column(20, 22), lambda chainid: chainid.strip(" ") or " "),
+        "serial_number": serial_numbers,
+        "resseq": column(22, 26).astype(np.int64),
+        "icode": _decode(column(26, 27)),
+        "hetero_flag": hetero_flags,
+        "coord": coord,
+        "occupancy": _parse_float_column(column(54, 60)),
+        "bfactor": _parse_float_column(column(60, 66)),
+        "segid": _decode(column(72, 76)),
+        "element": _decode(column(76, 78), lambda element: element.strip().upper()),
+    }
+
+
+def _parse_float_column(values):
+    try:
+        return values.astype(np.float64)
+    except ValueError:
+        return np.array([_parse_float(value) for value in values], dtype=np.float64)
+
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+def _blank_records(lines, keep):
+    """Blank the ATOM / HETATM records which are not in `keep`, in place.
+
+    The ANISOU, SIGUIJ and SIGATM records of these atoms are blanked as well.
+    Records are replaced by empty lines, so that line numbers stay the same.
+    """
+    atom_index = -1
+    for i, line in enumerate(lines):
+        record_type = line[0:6]
+        if record_type == "ATOM  " or record_type == "HETATM":
+            atom_index += 1
+        elif record_type != "ANISOU" and record_type != "SIGUIJ" and record_type != "SIGATM":
+            continue
+        if atom_index >= 0 and not keep[atom_index]:
+            lines[i] = ""
+
+
+def _decode(values, func=None):
+    """Decode an array of ``numpy.bytes_`` into a list of strings, applying `func` to each."""
+    unique_values, inverse = np.unique(values, return_inverse=True)
+    decoded = [value.decode("latin-1") for value in unique_values]
+    if func is not None:
+        decoded = [func(value) for value in decoded]
+    return [decoded[i] for i in inverse.ravel().tolist()]
+
+
+def _strip_atom_name(fullname):
+    split_list = fullname.split()
+    if len(split_list) != 1:
+        # atom name has internal spaces, e.g. " N B ", so
+        # we do not strip spaces
+        return fullname
+    # atom name is like " CA ", so we can strip spaces
+    return split_list[0]
+
+
+def _parse_serial_number(value):
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+
 def _get_journal(inl):
     # JRNL        AUTH   L.CHEN,M.DOI,F.S.MATHEWS,A.Y.CHISTOSERDOV,           2BBK   7
     journal = ""
@@ -1,5 +1,8 @@
 # flake8: noqa
 
+# Neighbor search
+from .neighbor_search import NeighborSearch, coordinate_index
+
 # Superimpose atom sets
 from .superimposer import Superimposer
 
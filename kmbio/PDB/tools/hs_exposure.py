@@ -6,14 +6,39 @@
 import logging
 from math import pi
 
+import numpy as np
+
 from kmbio.PDB import PDBParser, rotaxis
 from kmbio.PDB.polypeptide import CaPPBuilder, is_aa
 
 from ._abstract_property_map import AbstractPropertyMap
+from .neighbor_search import NeighborSearch
 
 logger = logging.getLogger(__name__)
 
 
+def _get_ca_search(ppl):
+    """Index the CA atoms of all amino acids in a list of polypeptides.
+
+    Returns:
+        A :class:`NeighborSearch` over the CA atoms, and arrays with the index of the polypeptide
+        and the position within that polypeptide of every CA atom.
+    """
+    ca_atoms, ca_pp_idxs, ca_positions = [], [], []
+    for pp_idx, pp in enumerate(ppl):
+        for i, residue in enumerate(pp):
+            if not is_aa(residue) or "CA" not in residue:
+                continue
+            ca_atoms.append(residue["CA"])
+            ca_pp_idxs.append(pp_idx)
+            ca_positions.append(i)
+    return (
+        NeighborSearch(ca_atoms),
+        np.array(ca_pp_idxs, dtype=np.int64),
+        np.array(ca_positions, dtype=np.int64),
+    )
+
+
 class _AbstractHSExposure(AbstractPropertyMap):
     """
     Abstract class to calculate Half-Sphere Exposure (HSE).
@@ -50,10 +75,11 @@ class _AbstractHSExposure(AbstractPropertyMap):
         self.ca_cb_list = []
         ppb = CaPPBuilder()
         ppl = ppb.build_peptides(model)
+        ca_search, ca_pp_idxs, ca_positions = _get_ca_search(ppl)
         hse_map = {}
         hse_list = []
         hse_keys = []
-        for pp1 in ppl:
+        for pp1_idx, pp1 in enumerate(ppl):
             for i in range(0, len(pp1)):
                 if i == 0:
                     r1 = None
@@ -70,24 +96,17 @@ class _AbstractHSExposure(AbstractPropertyMap):
                     # Missing atoms, or i==0, or i==len(pp1)-1
                     continue
                 pcb, angle = result
-                hse_u = 0
-                hse_d = 0
-                ca2 = r2["CA"].get_vector()
-                for pp2 in ppl:
-                    for j in range(0, len(pp2)):
-                        if pp1 is pp2 and abs(i - j) <= offset:
-                            # neighboring residues in the chain are ignored
-                            continue
-                        ro = pp2[j]
-                        if not is_aa(ro) or "CA" not in ro:
-                            continue
-                        cao = ro["CA"].get_vector()
-                        d = cao - ca2
-                        if d.norm() < radius:
-                            if d.angle(pcb) < (pi / 2):
-                                hse_u += 1
-                            else:
-                                hse_d += 1
+                ca2 = r2["CA"].coord
+                neighbors = ca_search.search_indices(ca2, radius)
+                # Neighboring residues in the chain are ignored
+                neighbors = neighbors[
+                    (ca_pp_idxs[neighbors] != pp1_idx)
+                    | (np.abs(ca_positions[neighbors] - i) > offset)
+                ]
+                d = ca_search.coord[neighbors] - ca2
+                is_up = np.dot(d, pcb.get_array()) > 0
+                hse_u = int(is_up.sum())
+                hse_d = len(neighbors) - hse_u
                 res_id = r2.id
                 chain_id = r2.parent.id
                 # Fill the 3 data structures
@@ -282,27 +301,24 @@ class ExposureCN(AbstractPropertyMap):
         assert offset >= 0
         ppb = CaPPBuilder()
         ppl = ppb.build_peptides(model)
+        ca_search, ca_pp_idxs, ca_positions = _get_ca_search(ppl)
+        # Count the neighbors of all CA atoms at once
+        pairs = ca_search.search_all_indices(radius)
+        i, j = pairs[:, 0], pairs[:, 1]
+        ignored = (ca_pp_idxs[i] == ca_pp_idxs[j]) & (
+            np.abs(ca_positions[i] - ca_positions[j]) <= offset
+        )
+        counts = np.bincount(pairs[~ignored].ravel(), minlength=len(ca_search.atoms))
+        ca_to_idx = {id(ca): idx for idx, ca in enumerate(ca_search.atoms)}
         fs_map = {}
         fs_list = []
         fs_keys = []
         for pp1 in ppl:
             for i in range(0, len(pp1)):
-                fs = 0
                 r1 = pp1[i]
                 if not is_aa(r1) or "CA" not in r1:
                     continue
-                ca1 = r1["CA"]
-                for pp2 in ppl:
-                    for j in range(0, len(pp2)):
-                        if pp1 is pp2 and abs(i - j) <= offset:
-                            continue
-                        r2 = pp2[j]
-                        if not is_aa(r2) or "CA" not in r2:
-                            continue
-                        ca2 = r2["CA"]
-                        d = ca2 - ca1
-                        if d < radius:
-                            fs += 1
+                fs = int(counts[ca_to_idx[id(r1["CA"])]])
                 res_id = r1.id
                 chain_id = r1.parent.id
                 # Fill the 3 data structures
@@ -0,0 +1,282 @@
+"""Fast search for neighboring atoms.
+
+Typical use:
+
+    >>> ns = NeighborSearch(structure[0])
+    >>> close_residues = ns.search(ligand_atom.coord, 5.0, level="R")
+    >>> contacts = ns.search_all(4.0, level="C")
+
+Distances are evaluated using a KD-tree (:class:`scipy.spatial.cKDTree`) if SciPy is installed,
+and a pure-NumPy cell list otherwise.
+"""
+import itertools
+import logging
+
+import numpy as np
+
+from kmbio.PDB.core.entity import Entity
+from kmbio.PDB.exceptions import PDBException
+from kmbio.PDB.utils import ENTITY_LEVELS
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+logger = logging.getLogger(__name__)
+
+
+class GridIndex:
+    """Spatial index over an array of points, using a cell list.
+
+    A cell list with a cell size equal to the search radius is built the first time a search
+    with that radius is performed, so every search only has to look at the 27 cells surrounding
+    each query point.
+    """
+
+    def __init__(self, coord):
+        self.coord = np.asarray(coord, dtype=np.float64).reshape(-1, 3)
+        self._cell_lists = {}
+
+    def query_ball(self, points, radius):
+        """Find all pairs of (query point, indexed point) which are within `radius`.
+
+        Returns:
+            Two integer arrays, with indices into `points` and into the indexed points.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        cell_list = self._get_cell_list(radius)
+        return cell_list.query(points, radius, _NEIGHBOR_OFFSETS)
+
+    def query_pairs(self, radius):
+        """Find all pairs of indexed points ``(i, j)``, ``i < j``, which are within `radius`."""
+        cell_list = self._get_cell_list(radius)
+        i, j = cell_list.query(self.coord, radius, _HALF_NEIGHBOR_OFFSETS)
+        # Pairs within the same cell are found twice (and each point is paired with itself)
+        keep = i < j
+        keep[cell_list.cell_keys[i] != cell_list.cell_keys[j]] = True
+        i, j = i[keep], j[keep]
+        return np.minimum(i, j), np.maximum(i, j)
+
+    def query_nearest(self, points):
+        """Find the nearest indexed point for every query point.
+
+        Returns:
+            An array of distances and an array of indices of the nearest points.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        distances = np.full(len(points), np.inf)
+        indices = np.full(len(points), -1, dtype=np.int64)
+        if not len(self.coord):
+            return distances, indices
+        # The closest point within any radius is the closest point overall,
+        # so keep doubling the radius until every query point has a neighbor
+        extent = np.ptp(self.coord, axis=0).max()
+        radius = max(extent / max(len(self.coord), 1) ** (1 / 3), 1.0)
+        remaining = np.arange(len(points))
+        while len(remaining):
+            qi, ai = self.query_ball(points[remaining], radius)
+            d = np.sqrt(((points[remaining[qi]] - self.coord[ai]) ** 2).sum(axis=1))
+            order = np.lexsort((d, qi))
+            qi, ai, d = qi[order], ai[order], d[order]
+            first = np.r_[True, qi[1:] != qi[:-1]] if len(qi) else np.zeros(0, dtype=bool)
+            found = remaining[qi[first]]
+            distances[found] = d[first]
+            indices[found] = ai[first]
+            remaining = remaining[indices[remaining] == -1]
+            radius *= 2
+        return distances, indices
+
+    def _get_cell_list(self, radius):
+        if radius <= 0:
+            raise PDBException("Radius must be positive (got %s)." % radius)
+        try:
+            return self._cell_lists[radius]
+        except KeyError:
+            cell_list = _CellList(self.coord, radius)
+            self._cell_lists[radius] = cell_list
+            return cell_list
+
+
+class KDTreeIndex:
+    """Spatial index over an array of points, using :class:`scipy.spatial.cKDTree`."""
+
+    def __init__(self, coord):
+        self.coord = np.asarray(coord, dtype=np.float64).reshape(-1, 3)
+        self._tree = cKDTree(self.coord)
+
+    def query_ball(self, points, radius):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        neighbors = self._tree.query_ball_point(points, radius)
+        lengths = np.array([len(n) for n in neighbors], dtype=np.int64)
+        qi = np.repeat(np.arange(len(points)), lengths)
+        ai = np.fromiter(itertools.chain.from_iterable(neighbors), np.int64, lengths.sum())
+        return qi, ai
+
+    def query_pairs(self, radius):
+        pairs = self._tree.query_pairs(radius, output_type="ndarray")
+        return pairs[:, 0].astype(np.int64), pairs[:, 1].astype(np.int64)
+
+    def query_nearest(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if not len(self.coord):
+            return np.full(len(points), np.inf), np.full(len(points), -1, dtype=np.int64)
+        distances, indices = self._tree.query(points)
+        return distances, indices.astype(np.int64)
+
+
+def coordinate_index(coord, backend="auto"):
+    """Create a spatial index over the `(N, 3)` array `coord`.
+
+    Args:
+        coord: Coordinates to index.
+        backend: One of {"auto", "kdtree", "grid"}. "auto" uses a KD-tree if SciPy is available.
+    """
+    if backend == "auto":
+        backend = "kdtree" if cKDTree is not None else "grid"
+    if backend == "kdtree":
+        if cKDTree is None:
+            raise ImportError("The 'kdtree' backend requires SciPy to be installed.")
+        return KDTreeIndex(coord)
+    elif backend == "grid":
+        return GridIndex(coord)
+    else:
+        raise ValueError("Wrong backend: '{}'".format(backend))
+
+
+class NeighborSearch:
+    """Search for atoms (or residues, chains, etc.) within a given distance of one another.
+
+    The spatial index is built once, from the coordinates of all atoms in an entity
+    (typically a model) or from a list of atoms.
+    When an entity is given, its coordinates are taken directly from the columnar
+    :class:`kmbio.PDB.AtomStore`, and all alternate locations of disordered atoms are included.
+    """
+
+    def __init__(self, atoms, backend="auto"):
+        """
+        Args:
+            atoms: An entity (structure, model, chain or residue), or a list of atoms.
+            backend: Spatial index to use. See :func:`coordinate_index`.
+        """
+        if isinstance(atoms, Entity):
+            coord = atoms._get_store_coord()
+            self.atoms = atoms._store.atoms[atoms._store_start : atoms._store_stop]
+        else:
+            self.atoms = list(atoms)
+            coord = np.array([atom.coord for atom in self.atoms], dtype=np.float64)
+        self.coord = np.array(coord, dtype=np.float64).reshape(-1, 3)
+        self.index = coordinate_index(self.coord, backend)
+        self._level_index = {}
+
+    def search(self, center, radius, level="A"):
+        """Return all entities at `level` that have an atom within `radius` of `center`.
+
+        Args:
+            center: Coordinates of the query point.
+            radius: Search radius, in Angstroms.
+            level: One of {"A", "R", "C", "M", "S"}.
+        """
+        _, atom_idxs = self.index.query_ball(center, radius)
+        entity_idxs, entities = self._get_level_index(level)
+        return [entities[i] for i in np.unique(entity_idxs[atom_idxs])]
+
+    def search_indices(self, center, radius):
+        """Return sorted indices (into :attr:`atoms`) of atoms within `radius` of `center`."""
+        _, atom_idxs = self.index.query_ball(center, radius)
+        return np.sort(atom_idxs)
+
+    def search_all(self, radius, level="A"):
+        """Return all pairs of entities at `level` that have atoms within `radius` of each other.
+
+        Pairs are unique and an entity is never paired with itself.
+        """
+        i, j = self.index.query_pairs(radius)
+        entity_idxs, entities = self._get_level_index(level)
+        i, j = entity_idxs[i], entity_idxs[j]
+        keep = i != j
+        pairs = np.unique(np.c_[np.minimum(i, j)[keep], np.maximum(i, j)[keep]], axis=0)
+        return [(entities[a], entities[b]) for a, b in pairs]
+
+    def search_all_indices(self, radius):
+        """Return an ``(M, 2)`` array of pairs of atom indices within `radius` of each other."""
+        i, j = self.index.query_pairs(radius)
+        pairs = np.c_[i, j]
+        return pairs[np.lexsort((j, i))]
+
+    def _get_level_index(self, level):
+        """Map every atom to the index of its parent at `level`."""
+        if level not in ENTITY_LEVELS:
+            raise PDBException("%s: Not an entity level." % level)
+        try:
+            return self._level_index[level]
+        except KeyError:
+            pass
+        n_up = ENTITY_LEVELS.index(level)
+        entity_idxs = np.empty(len(self.atoms), dtype=np.int64)
+        entities = []
+        entity_to_idx = {}
+        for i, entity in enumerate(self.atoms):
+            for _ in range(n_up):
+                entity = entity.parent
+            key = id(entity)
+            if key not in entity_to_idx:
+                entity_to_idx[key] = len(entities)
+                entities.append(entity)
+            entity_idxs[i] = entity_to_idx[key]
+        self._level_index[level] = (entity_idxs, entities)
+        return entity_idxs, entities
+
+
+class _CellList:
+    """Points sorted by the cubic cell that they fall into."""
+
+    def __init__(self, coord, cell_size):
+        self.coord = coord
+        self.cell_size = cell_size
+        self.origin = coord.min(axis=0) if len(coord) else np.zeros(3)
+        cells = self._get_cells(coord)
+        self.shape = cells.max(axis=0) + 1 if len(coord) else np.ones(3, dtype=np.int64)
+        self.cell_keys = self._get_keys(cells)
+        self.order = np.argsort(self.cell_keys, kind="stable")
+        self.keys, self.starts, counts = np.unique(
+            self.cell_keys[self.order], return_index=True, return_counts=True
+        )
+        self.stops = self.starts + counts
+
+    def _get_cells(self, points):
+        return np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+
+    def _get_keys(self, cells):
+        return (cells[:, 0] * self.shape[1] + cells[:, 1]) * self.shape[2] + cells[:, 2]
+
+    def query(self, points, radius, offsets):
+        """Find all pairs of (query point, indexed point) in cells separated by `offsets`."""
+        point_cells = self._get_cells(points)
+        radius_sq = radius * radius
+        query_idxs, point_idxs = [], []
+        for offset in offsets:
+            cells = point_cells + offset
+            qi = np.flatnonzero(((cells >= 0) & (cells < self.shape)).all(axis=1))
+            keys = self._get_keys(cells[qi])
+            pos = np.searchsorted(self.keys, keys)
+            pos[pos == len(self.keys)] = 0
+            found = self.keys[pos] == keys
+            qi, pos = qi[found], pos[found]
+            # Expand every query point into all the points of the neighboring cell
+            starts = self.starts[pos]
+            counts = self.stops[pos] - starts
+            total = counts.sum()
+            qi = np.repeat(qi, counts)
+            offsets = starts - (np.cumsum(counts) - counts)
+            sorted_idxs = np.arange(total) + np.repeat(offsets, counts)
+            ai = self.order[sorted_idxs]
+            close = ((points[qi] - self.coord[ai]) ** 2).sum(axis=1) <= radius_sq
+            query_idxs.append(qi[close])
+            point_idxs.append(ai[close])
+        return np.concatenate(query_idxs), np.concatenate(point_idxs)
+
+
+_NEIGHBOR_OFFSETS = np.array(list(itertools.product([-1, 0, 1], repeat=3)), dtype=np.int64)
+#: The cell itself plus one of every pair of opposite neighbors
+_HALF_NEIGHBOR_OFFSETS = _NEIGHBOR_OFFSETS[13:]
@@ -45,6 +45,7 @@ from kmbio.PDB import unfold_entities
 from kmbio.PDB.polypeptide import is_aa
 
 from ._abstract_property_map import AbstractPropertyMap
+from .neighbor_search import coordinate_index
 
 
 def _read_vertex_array(filename):
@@ -100,10 +101,21 @@ def min_dist(coord, surface):
     """
     Return minimum distance between coord
     and surface.
+
+    The surface can also be a spatial index created using
+    L{kmbio.PDB.coordinate_index}, which is much faster when
+    calculating distances for many atoms.
     """
-    d = surface - coord
-    d2 = numpy.sum(d * d, 1)
-    return numpy.sqrt(min(d2))
+    return _min_dists(numpy.reshape(coord, (1, 3)), surface)[0]
+
+
+def _min_dists(coords, surface):
+    """Return the minimum distance between each of `coords` and surface."""
+    if isinstance(surface, numpy.ndarray):
+        d = surface[None, :, :] - coords[:, None, :]
+        d2 = numpy.sum(d * d, 2)
+        return numpy.sqrt(d2.min(1))
+    return surface.query_nearest(coords)[0]
 
 
 def residue_depth(residue, surface):
@@ -112,12 +124,8 @@ def residue_depth(residue, surface):
     atoms in a residue, ie. the residue depth.
     """
     atom_list = residue.get_unpacked_list()
-    length = len(atom_list)
-    d = 0
-    for atom in atom_list:
-        coord = atom.coord
-        d = d + min_dist(coord, surface)
-    return d / length
+    coords = numpy.array([atom.coord for atom in atom_list])
+    return _min_dists(coords, surface).mean()
 
 
 def ca_depth(residue, surface):
@@ -140,7 +148,7 @@ class ResidueDepth(AbstractPropertyMap):
         # get_residue
         residue_list = unfold_entities(model, "R")
         # make surface from PDB file
-        surface = get_surface(pdb_file)
+        surface = coordinate_index(get_surface(pdb_file))
         # calculate rdepth for each residue
         for residue in residue_list:
             if not is_aa(residue):
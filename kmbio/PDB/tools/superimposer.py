@@ -5,6 +5,7 @@
 """Superimpose two structures."""
 import numpy as np
 
+from kmbio.PDB.core.entity import Entity
 from kmbio.PDB.exceptions import PDBException
 from kmbio.SVDSuperimposer import SVDSuperimposer
 
@@ -30,11 +31,8 @@ class Superimposer(object):
         """
         if not (len(fixed) == len(moving)):
             raise PDBException("Fixed and moving atom lists differ in size")
-        fixed_coord = np.zeros((len(fixed), 3))
-        moving_coord = np.zeros((len(fixed), 3))
-        for i in range(0, len(fixed)):
-            fixed_coord[i] = fixed[i].coord
-            moving_coord[i] = moving[i].coord
+        fixed_coord = np.array([atom.coord for atom in fixed]).reshape(-1, 3)
+        moving_coord = np.array([atom.coord for atom in moving]).reshape(-1, 3)
         sup = SVDSuperimposer()
         sup.set(fixed_coord, moving_coord)
         sup.run()
@@ -43,15 +41,20 @@ class Superimposer(object):
 
     def apply(self, atom_list):
         """
-        Rotate/translate a list of atoms.
+        Rotate/translate a list of atoms (or an entity).
         """
         if self.rotran is None:
             raise PDBException("No transformation has been calculated yet")
         rot, tran = self.rotran
         rot = rot.astype(np.float64)
         tran = tran.astype(np.float64)
-        for atom in atom_list:
-            atom.transform(rot, tran)
+        if isinstance(atom_list, Entity):
+            atom_list.transform(rot, tran)
+            return
+        # Gather, transform and scatter back the coordinates in one go
+        coords = np.dot(np.array([atom.coord for atom in atom_list]).reshape(-1, 3), rot) + tran
+        for atom, coord in zip(atom_list, coords):
+            atom.coord = coord
 
 
 if __name__ == "__main__":
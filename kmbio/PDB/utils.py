@@ -27,19 +27,21 @@ logger = logging.getLogger(__name__)
 ENTITY_LEVELS = ["A", "R", "C", "M", "S"]
 
 
-def sort_ordered_dict(ordered_dict: OrderedDict) -> None:
-    """Sort ordered dict in ascending order using selection sort.
+def sort_ordered_dict(ordered_dict: OrderedDict, key: Callable = None) -> None:
+    """Sort ordered dict in place, in ascending order of its keys.
+
+    The sort is stable, so items whose keys compare equal under `key` keep their relative order.
+    Runs in ``O(n log n)`` time.
 
     Parameters
     ----------
     ordered_dict:
         Dictionary to sort.
-    n_sorted:
-        Number of items *at the end of the dictionary* that are sored.
+    key:
+        Function which is applied to every key of `ordered_dict` to obtain the value to sort by.
     """
-    for n_sorted in range(len(ordered_dict)):
-        min_key = min(list(ordered_dict)[: -n_sorted or None])
-        ordered_dict.move_to_end(min_key)
+    for dict_key in sorted(ordered_dict, key=key):
+        ordered_dict.move_to_end(dict_key)
 
 
 def _unfold_disordered_atom(atom):
@@ -90,13 +92,16 @@ def uniqueify(items):
 
 
 def sort_structure(structure):
+    """Sort the models, chains, residues and atoms of `structure` in place, by id."""
     sort_ordered_dict(structure._children)
     for model in structure:
         sort_ordered_dict(model._children)
         for chain in model:
             sort_ordered_dict(chain._children)
-            for residue in chain:
+            for residue in chain.get_unpacked_list():
                 sort_ordered_dict(residue._children)
+    # Atoms in the columnar store are kept in hierarchy order
+    structure._invalidate_store()
 
 
 def get_unique_parents(entity_list):
@@ -222,8 +227,11 @@ def read_ff(url: str):
 
 
 @contextlib.contextmanager
-def open_url(url: str) -> Generator[IO, None, None]:
-    """Return a filehandle to a tempfile containig `url` data."""
+def open_url(url: str, binary: bool = False) -> Generator[IO, None, None]:
+    """Return a filehandle to a tempfile containig `url` data.
+
+    If `binary` is ``True``, the filehandle is opened in binary mode.
+    """
     if any(url.startswith(prefix) for prefix in ["ftp://", "http://", "https://", "ff://"]):
         if any(url.startswith(prefix) for prefix in ["ftp://", "http://", "https://"]):
             data_raw = read_web(url)
@@ -232,11 +240,14 @@ def open_url(url: str) -> Generator[IO, None, None]:
         else:
             raise TypeError
 
+        if binary:
+            yield io.BytesIO(anyzip(url).decompress(data_raw))
+            return
         data_text = anyzip(url).decompress(data_raw).decode("utf-8")
         fio = io.StringIO()
         fio.write(data_text)
         fio.seek(0)
         yield fio
     else:
-        with anyzip(url).open(url, mode="rt") as fh:
+        with anyzip(url).open(url, mode="rb" if binary else "rt") as fh:
             yield fh
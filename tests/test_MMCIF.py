@@ -8,11 +8,13 @@
 # as part of this package.
 """Unit tests for the MMCIF portion of the Bio.PDB module."""
 
+import io
 import unittest
 
 from Bio.Seq import Seq
 
-from kmbio.PDB import CaPPBuilder, FastMMCIFParser, MMCIFParser, PPBuilder
+import kmbio.PDB
+from kmbio.PDB import CaPPBuilder, FastMMCIFParser, MMCIFParser, PPBuilder, StructureBuilder
 
 
 class ParseReal(unittest.TestCase):
@@ -228,6 +230,87 @@ class ParseReal(unittest.TestCase):
         structure = parser.get_structure(open("PDB/1A8O.cif"), "example")
         self.assertEqual(len(structure), 1)
 
+    def test_custom_structure_builder(self):
+        """Test that atoms are created the same way in bulk and by the structure builder."""
+
+        class AtomByAtomBuilder(StructureBuilder):
+            def init_atom(self, *args, **kwargs):
+                self.num_atoms = getattr(self, "num_atoms", 0) + 1
+                super().init_atom(*args, **kwargs)
+
+        for filename in ["PDB/3JQH.cif", "PDB/4ZHL.cif", "PDB/2OFG.cif"]:
+            structure = MMCIFParser().get_structure(filename)
+            structure_builder = AtomByAtomBuilder()
+            reference = MMCIFParser(structure_builder).get_structure(filename)
+            self.assertEqual(structure_builder.num_atoms, len(reference.atom_store))
+            self.assertTrue(structure.to_dataframe().equals(reference.to_dataframe()))
+            for atom, ref_atom in zip(structure.atoms, reference.atoms):
+                self.assertEqual(atom.element, ref_atom.element)
+                self.assertEqual(atom.disordered, ref_atom.disordered)
+
+    def test_fast_parser_quoted_values(self):
+        """Test that the fast parser handles quoted values and skips other categories."""
+        data = "\n".join(
+            [
+                "data_TEST",
+                "_cell.length_a 10.0",
+                "loop_",
+                "_struct_conf.id",
+                "_struct_conf.details",
+                "HELX1 'Quoted _atom_site. and # values'",
+                "#",
+                "loop_",
+                "_atom_site.group_PDB",
+                "_atom_site.id",
+                "_atom_site.type_symbol",
+                "_atom_site.label_atom_id",
+                "_atom_site.label_alt_id",
+                "_atom_site.label_comp_id",
+                "_atom_site.label_asym_id",
+                "_atom_site.label_seq_id",
+                "_atom_site.pdbx_PDB_ins_code",
+                "_atom_site.Cartn_x",
+                "_atom_site.Cartn_y",
+                "_atom_site.Cartn_z",
+                "_atom_site.occupancy",
+                "_atom_site.B_iso_or_equiv",
+                "_atom_site.auth_seq_id",
+                "_atom_site.auth_asym_id",
+                "_atom_site.pdbx_PDB_model_num",
+                "ATOM 1 O \"O5'\" . DA A 1 ? 1.0 2.0 3.0 1.00 10.0 1 A 1",
+                "ATOM 2 C \"C5'\" . DA A 1 ? 2.0 3.0 4.0 1.00 11.0 1 A 1",
+                "HETATM 3 O O . HOH B . ? 5.0 5.0 5.0 0.50 20.0 101 B 1",
+                "#",
+            ]
+        )
+        parser = FastMMCIFParser()
+        structure = parser.get_structure(io.StringIO(data))
+        self.assertEqual([a.name for a in structure.atoms], ["O5'", "C5'", "O"])
+        self.assertEqual([r.id for r in structure.residues], [(" ", 1, " "), ("W", 101, " ")])
+        self.assertEqual(structure[0]["B"][("W", 101, " ")]["O"].occupancy, 0.5)
+        self.assertNotIn("_cell.length_a", parser._mmcif_dict)
+        self.assertNotIn("_struct_conf.id", parser._mmcif_dict)
+
+    def test_load_fast(self):
+        """Test that ``load(..., fast=True)`` gives the same atoms as the full parser."""
+        for filename in ["PDB/1A8O.cif", "PDB/4ZHL.cif"]:
+            structure = kmbio.PDB.load(filename)
+            fast_structure = kmbio.PDB.load(filename, fast=True)
+            self.assertTrue(structure.to_dataframe().equals(fast_structure.to_dataframe()))
+
+    def test_fast_parser_options(self):
+        """Test that FastMMCIFParser accepts the same filters and options as MMCIFParser."""
+        filters = {"chains": "A", "altloc": "first", "skip_water": True, "skip_hydrogen": True}
+        structure = MMCIFParser(**filters).get_structure("PDB/4CUP.cif")
+        fast_structure = FastMMCIFParser(**filters).get_structure("PDB/4CUP.cif")
+        self.assertTrue(structure.to_dataframe().equals(fast_structure.to_dataframe()))
+        bioassembly = MMCIFParser().get_structure("PDB/4CUP.cif", bioassembly_id=1)
+        fast_bioassembly = FastMMCIFParser().get_structure(
+            "PDB/4CUP.cif", bioassembly_id=1, lazy_bioassembly=True
+        )
+        self.assertEqual(fast_bioassembly.model_ids, [model.id for model in bioassembly])
+        self.assertTrue(kmbio.PDB.allequal(fast_bioassembly.to_structure(), bioassembly))
+
     def test_point_mutations_main_PDB(self):
         """Test if MMCIFParser parse point mutations correctly."""
 
@@ -729,6 +729,46 @@ class ParseReal(unittest.TestCase):
         finally:
             os.remove(filename)
 
+    def test_parse_handle(self):
+        """Parse a multi-model file from an open handle."""
+        parser = PDBParser()
+        with open("PDB/1LCD.pdb") as handle:
+            structure = parser.get_structure(handle, "1lcd")
+            self.assertEqual(handle.read(), "")
+        self.assertEqual([m.serial_num for m in structure], [1, 2, 3])
+        self.assertEqual(parser.header["name"].split()[:3], ["structure", "of", "the"])
+        self.assertTrue(parser.trailer[0].startswith("CONECT"))
+        with open("PDB/1LCD.pdb") as handle:
+            lines = handle.readlines()
+        self.assertEqual(parser.trailer, lines[parser.line_counter :])
+
+    def test_bulk_parsing(self):
+        """Parse ATOM records in bulk and line by line, with the same result."""
+
+        class LineByLineParser(PDBParser):
+            def _parse_coordinate_lines(self, lines):
+                self._parse_coordinates_by_line(lines)
+
+        for filename in ["PDB/1A8O.pdb", "PDB/1LCD.pdb", "PDB/a_structure.pdb"]:
+            structure = PDBParser().get_structure(filename, "bulk")
+            reference = LineByLineParser().get_structure(filename, "line")
+            self.assertEqual(
+                [(m.id, m.serial_num) for m in structure], [(m.id, m.serial_num) for m in reference]
+            )
+            atoms = [a for r in structure.residues for a in r.get_unpacked_list()]
+            reference_atoms = [a for r in reference.residues for a in r.get_unpacked_list()]
+            self.assertEqual(len(atoms), len(reference_atoms))
+            for atom, reference_atom in zip(atoms, reference_atoms):
+                self.assertEqual(atom.full_id[1:], reference_atom.full_id[1:])
+                self.assertEqual(atom.parent.segid, reference_atom.parent.segid)
+                for attr in ["fullname", "serial_number", "element", "occupancy", "bfactor"]:
+                    self.assertEqual(getattr(atom, attr), getattr(reference_atom, attr))
+                self.assertTrue(np.array_equal(atom.coord, reference_atom.coord))
+                for attr in ["anisou_array", "siguij_array", "sigatm_array"]:
+                    self.assertTrue(
+                        np.array_equal(getattr(atom, attr), getattr(reference_atom, attr))
+                    )
+
 
 class WriteTest(unittest.TestCase):
     def setUp(self):
@@ -819,6 +859,30 @@ class WriteTest(unittest.TestCase):
         finally:
             os.remove(filename)
 
+    def test_pdbio_write_bulk(self):
+        """Write a structure in bulk, with the same output as atom by atom"""
+
+        class AllAtoms(Select):
+            """
+            Accepts everything, but is written atom by atom
+            """
+
+        structure = self.structure
+        atoms = list(structure.atoms)
+        # Negative zero and rounding ties
+        atoms[0].coord = np.array([-0.0001, 0.0005, -999.9994])
+        atoms[1].bfactor = 0.125
+        for atom_numbering in ["keep", "by_model", "by_chain"]:
+            for use_model_flag in [0, 1]:
+                outputs = []
+                for select in [Select(), AllAtoms()]:
+                    io = PDBIO(use_model_flag)
+                    io.set_structure(structure)
+                    fh = StringIO()
+                    io.save(fh, select, atom_numbering=atom_numbering)
+                    outputs.append(fh.getvalue())
+                self.assertEqual(outputs[0], outputs[1])
+
     def test_pdbio_missing_occupancy(self):
         """Write PDB file with missing occupancy"""
         io = PDBIO()
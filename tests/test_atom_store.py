@@ -0,0 +1,134 @@
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import kmbio.PDB
+from kmbio.PDB import Atom, allequal
+
+TESTS_DIR = Path(__file__).absolute().parent
+
+
+@pytest.fixture(params=["1A8O.pdb", "2BEG.pdb", "1LCD.cif", "4CUP.cif"])
+def structure(request):
+    return kmbio.PDB.load(TESTS_DIR.joinpath("PDB", request.param))
+
+
+def test_pack(structure):
+    atoms = [a for r in structure.residues for a in r.get_unpacked_list()]
+    coords = np.array([a.coord for a in atoms])
+    store = structure.atom_store
+    assert len(store) == len(atoms)
+    assert store.coord.shape == (len(atoms), 3)
+    assert np.allclose(store.coord, coords)
+    # Atom data are views into the store
+    for i, atom in enumerate(atoms):
+        assert np.shares_memory(atom.coord, store.coord)
+        assert atom.bfactor == store.bfactor[i]
+    store.coord += 1
+    store.bfactor[0] = 99
+    assert np.allclose(atoms[0].coord, coords[0] + 1)
+    assert atoms[0].bfactor == 99
+    atoms[-1].coord = (0, 0, 0)
+    atoms[-1].occupancy = 0.5
+    assert np.allclose(store.coord[-1], 0)
+    assert store.occupancy[-1] == 0.5
+
+
+def test_entity_slices(structure):
+    store = structure.atom_store
+    for chain in structure.chains:
+        chain_atoms = store.atoms[chain._store_start : chain._store_stop]
+        assert chain_atoms == [a for r in chain.get_unpacked_list() for a in r.get_unpacked_list()]
+
+
+def test_invalidate(structure):
+    store = structure.atom_store
+    chain = next(structure.chains)
+    residue = next(chain.residues)
+    del chain[residue.id]
+    assert not store.valid
+    new_store = structure.atom_store
+    assert new_store is not store
+    assert len(new_store) == len(store) - len(residue.get_unpacked_list())
+    # Detached atoms keep their data
+    assert all(np.isfinite(a.coord).all() for a in residue.get_unpacked_list())
+
+
+def test_copy_and_pickle(structure):
+    store = structure.atom_store
+    structure_copy = structure.copy()
+    atom = next(structure.atoms)
+    atom_copy = next(structure_copy.atoms)
+    assert atom_copy._store is None
+    assert not np.shares_memory(atom_copy.coord, store.coord)
+    atom_copy.coord = atom_copy.coord + 1
+    assert not np.allclose(atom.coord, atom_copy.coord)
+    structure_ = pickle.loads(pickle.dumps(structure))
+    assert allequal(structure, structure_)
+    assert len(structure_.atom_store) == len(store)
+
+
+def test_unpacked_atom():
+    atom = Atom("CA", [1, 2, 3], 10.0, 1.0, " ", " CA ", 1, "C")
+    assert isinstance(atom.coord, np.ndarray)
+    assert atom.bfactor == 10.0
+    assert atom._store is None
+
+
+def _random_rotation(seed):
+    q, _ = np.linalg.qr(np.random.RandomState(seed).normal(size=(3, 3)))
+    return q
+
+
+def test_transform(structure):
+    rot = _random_rotation(0)
+    tran = np.array([1.0, -2.0, 3.0])
+    chain = next(structure.chains)
+    atoms = [a for r in chain.get_unpacked_list() for a in r.get_unpacked_list()]
+    coords = np.array([a.coord for a in atoms])
+    selected_coords = np.array([a.coord for a in chain.atoms])
+    other_atoms = [a for a in structure.atoms if a.parent.parent is not chain]
+    other_coords = np.array([a.coord for a in other_atoms]).reshape(-1, 3)
+    chain.transform(rot, tran)
+    assert np.allclose(np.array([a.coord for a in atoms]), np.dot(coords, rot) + tran)
+    assert np.allclose(np.array([a.coord for a in other_atoms]).reshape(-1, 3), other_coords)
+    # Unpacked entities are packed on the fly
+    chain_copy = chain.copy()
+    assert chain_copy._store is None
+    chain_copy.transform(rot.T, -np.dot(tran, rot.T))
+    assert chain_copy._store is not None
+    assert np.allclose(np.array([a.coord for a in chain_copy.atoms]), selected_coords)
+
+
+def test_transform_copies(structure):
+    rotations = np.array([_random_rotation(i) for i in range(3)])
+    translations = np.arange(9, dtype=np.float64).reshape(3, 3)
+    chain = next(structure.chains)
+    copies = chain.transform_copies(rotations, translations)
+    assert len(copies) == 3
+    for copy, rot, tran in zip(copies, rotations, translations):
+        chain_ref = chain.copy()
+        chain_ref.transform(rot, tran)
+        assert allequal(copy, chain_ref)
+        assert copy.parent is None
+
+
+def test_slots(structure):
+    atom = next(structure.atoms)
+    residue = next(structure.residues)
+    for entity in [atom, residue]:
+        assert not hasattr(entity, "__dict__")
+        assert entity._xtra is None
+        entity.xtra["key"] = "value"
+        assert entity.xtra == {"key": "value"}
+    assert len(atom) == 0 and list(atom) == []
+    atom_copy = atom.copy()
+    assert atom_copy.xtra == {"key": "value"} and atom_copy.xtra is not atom.xtra
+    atom_ = pickle.loads(pickle.dumps(atom))
+    assert atom_.name == atom.name and atom_.xtra == atom.xtra
+    assert np.allclose(atom_.coord, atom.coord) and atom_.bfactor == atom.bfactor
+    residue_ = pickle.loads(pickle.dumps(residue))
+    assert residue_ == residue and residue_.xtra == residue.xtra
+    assert [a.name for a in residue_] == [a.name for a in residue]
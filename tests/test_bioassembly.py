@@ -4,12 +4,15 @@ import os.path as op
 import random
 import re
 
+import numpy as np
+import pandas as pd
 import pytest
 import yaml
 
 import kmbio.PDB
 from kmbio.PDB import (
     DEFAULT_ROUTES,
+    BioassemblyView,
     MMCIFParser,
     PDBParser,
     ProcessRemark350,
@@ -19,6 +22,13 @@ from kmbio.PDB import (
     open_url,
     sort_structure,
 )
+from kmbio.PDB.exceptions import BioassemblyError
+from kmbio.PDB.parsers.bioassembly import (
+    apply_bioassembly,
+    get_rotation,
+    get_translation,
+    mmcif_key_to_dataframe,
+)
 from kmbio.test_helpers import parametrize
 
 random.seed(42)
@@ -53,6 +63,72 @@ def test_process_line_350_1(remark_350_data, bioassembly_data_ref):
     assert bioassembly_data == bioassembly_data_ref
 
 
+@pytest.mark.parametrize("pdb_id", ["1A8O", "2OFG", "3JQH", "4CUP", "4ZHL"])
+@pytest.mark.parametrize("use_auth_id", [False, True])
+def test_get_mmcif_bioassembly_data(pdb_id, use_auth_id):
+    sdict = mmcif2dict(op.join(op.dirname(__file__), "PDB", pdb_id + ".cif"))
+    oper_list = mmcif_key_to_dataframe(sdict, "_pdbx_struct_oper_list").set_index(
+        "_pdbx_struct_oper_list.id"
+    )
+    bioassembly_data = get_mmcif_bioassembly_data(sdict, use_auth_id)
+    assert bioassembly_data
+    for chain_transformations in bioassembly_data.values():
+        for chain_id, transformations in chain_transformations.items():
+            assert (
+                chain_id
+                in sdict["_atom_site.auth_asym_id" if use_auth_id else "_atom_site.label_asym_id"]
+            )
+            for transformation_id, rotation, translation in transformations:
+                row = oper_list.loc[str(transformation_id)]
+                assert np.allclose(rotation, get_rotation(row))
+                assert np.allclose(translation, get_translation(row))
+
+
+@pytest.mark.parametrize("pdb_id", ["1A8O", "3JQH", "4CUP"])
+def test_apply_bioassembly_as_dataframe(pdb_id):
+    filename = op.join(op.dirname(__file__), "PDB", pdb_id + ".cif")
+    structure = MMCIFParser().get_structure(filename)
+    bioassembly_data = get_mmcif_bioassembly_data(mmcif2dict(filename), use_auth_id=True)["1"]
+    bioassembly = apply_bioassembly(structure, bioassembly_data)
+    df = apply_bioassembly(structure, bioassembly_data, as_dataframe=True)
+    assert df["model_id"].unique().tolist() == [model.id for model in bioassembly]
+    pd.testing.assert_frame_equal(df, bioassembly.to_dataframe())
+
+
+@pytest.mark.parametrize("filename", ["PDB/1A8O.pdb", "PDB/3JQH.cif", "PDB/4CUP.mmtf"])
+def test_lazy_bioassembly(filename):
+    filename = op.join(op.dirname(__file__), filename)
+    bioassembly = kmbio.PDB.load(filename, bioassembly_id=1)
+    view = kmbio.PDB.load(filename, bioassembly_id=1, lazy_bioassembly=True)
+    assert isinstance(view, BioassemblyView)
+    assert view.model_ids == [model.id for model in bioassembly]
+    df = bioassembly.to_dataframe()
+    assert np.array_equal(view.coord, df[["atom_x", "atom_y", "atom_z"]].values)
+    for model in bioassembly:
+        assert np.array_equal(view.get_coord(model.id), np.array([a.coord for a in model.atoms]))
+        assert allequal(view[model.id], model)
+
+
+@pytest.mark.parametrize("use_auth_id", [False, True])
+def test_load_with_unsupported_bioassembly(use_auth_id, tmp_path):
+    """Bioassembly data which can not be extracted only matters if a bioassembly is requested."""
+    with open(op.join(op.dirname(__file__), "PDB/4CUP.cif")) as fin:
+        data = fin.read()
+    # Products of transformations are not supported
+    data = data.replace(
+        "_pdbx_struct_assembly_gen.oper_expression   1,2 ",
+        "_pdbx_struct_assembly_gen.oper_expression   (1,2)(1) ",
+    )
+    filename = tmp_path / "4CUP.cif"
+    filename.write_text(data)
+    parser = MMCIFParser(use_auth_id=use_auth_id)
+    structure = parser.get_structure(str(filename))
+    assert len(list(structure.atoms)) == 1094
+    assert "bioassembly_data" not in structure.header
+    with pytest.raises(BioassemblyError):
+        parser.get_structure(str(filename), bioassembly_id=1)
+
+
 # #############################################################################
 # TEST_DATA
 # #############################################################################
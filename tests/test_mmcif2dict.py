@@ -0,0 +1,128 @@
+import io
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from kmbio.PDB.parsers._mmcif_to_dict import mmcif2dict, tokenize
+from kmbio.PDB.parsers.mmcif_to_dict import MMCIF2Dict
+
+TESTS_DIR = Path(__file__).absolute().parent
+
+MMCIF_DATA = b"""\
+data_1ABC
+#
+_entry.id 1ABC
+_struct.title "A 'quoted' title with O5' atoms"
+_struct.pdbx_descriptor ''
+#
+_entity_poly.pdbx_seq_one_letter_code
+;MKV
+  LAA
+;
+#
+loop_
+_atom_site.group_PDB
+_atom_site.label_atom_id
+_atom_site.Cartn_x
+ATOM N   1.0
+ATOM "O5'" 2.0
+HETATM 'C1 A' 3.0
+_exptl.method 'X-RAY DIFFRACTION'
+"""
+
+
+def test_tokenize():
+    tokens = list(tokenize(b"_a.b 'x y' \"it's\" #comment\n;line 1\n line 2\n;\nz"))
+    assert tokens == ["_a.b", "x y", "it's", "line 1line 2", "z"]
+    assert list(tokenize(b"")) == []
+
+
+@pytest.mark.parametrize(
+    "make_input",
+    [
+        lambda: MMCIF_DATA,
+        lambda: bytearray(MMCIF_DATA),
+        lambda: io.BytesIO(MMCIF_DATA),
+        lambda: io.StringIO(MMCIF_DATA.decode()),
+    ],
+)
+def test_mmcif2dict(make_input):
+    sdict = mmcif2dict(make_input())
+    assert sdict["data_"] == "1ABC"
+    assert sdict["_entry.id"] == "1ABC"
+    assert sdict["_struct.title"] == "A 'quoted' title with O5' atoms"
+    assert sdict["_struct.pdbx_descriptor"] == ""
+    assert sdict["_entity_poly.pdbx_seq_one_letter_code"] == "MKVLAA"
+    assert sdict["_atom_site.group_PDB"] == ["ATOM", "ATOM", "HETATM"]
+    assert sdict["_atom_site.label_atom_id"] == ["N", "O5'", "C1 A"]
+    assert sdict["_atom_site.Cartn_x"] == ["1.0", "2.0", "3.0"]
+    # A new key ends the loop, even without a separating comment
+    assert sdict["_exptl.method"] == "X-RAY DIFFRACTION"
+
+
+def test_mmcif2dict_file(tmp_path):
+    cif_file = TESTS_DIR.joinpath("PDB", "4CUP.cif")
+    sdict = mmcif2dict(cif_file.as_posix())
+    assert sdict == mmcif2dict(cif_file)
+    with cif_file.open() as fh:
+        assert sdict == mmcif2dict(fh)
+    assert sdict["data_"] == "4CUP"
+    assert len(sdict["_atom_site.id"]) == len(sdict["_atom_site.Cartn_x"]) > 0
+    empty_file = tmp_path.joinpath("empty.cif")
+    empty_file.touch()
+    assert mmcif2dict(empty_file) == {}
+
+
+@pytest.mark.parametrize("categories", [["_atom_site"], ["atom_site", "_exptl"], ["_struct"], []])
+def test_mmcif2dict_categories(categories):
+    sdict = mmcif2dict(MMCIF_DATA)
+    selected = {c if c.startswith("_") else "_" + c for c in categories}
+    expected = {k: v for k, v in sdict.items() if k == "data_" or k.split(".")[0] in selected}
+    assert mmcif2dict(MMCIF_DATA, categories=categories) == expected
+    assert MMCIF2Dict(io.StringIO(MMCIF_DATA.decode()), categories=categories) == expected
+
+
+def test_mmcif2dict_categories_file():
+    cif_file = TESTS_DIR.joinpath("PDB", "4CUP.cif")
+    sdict = mmcif2dict(cif_file)
+    categories = {key.split(".")[0] for key in sdict if key != "data_"}
+    for category in categories:
+        for selected in [{category}, categories - {category}]:
+            expected = {
+                k: v for k, v in sdict.items() if k == "data_" or k.split(".")[0] in selected
+            }
+            assert mmcif2dict(cif_file, categories=selected) == expected
+
+
+def test_mmcif2dict_dtypes():
+    cif_file = TESTS_DIR.joinpath("PDB", "4CUP.cif")
+    sdict = mmcif2dict(cif_file)
+    dtypes = {
+        "_atom_site.Cartn_x": np.float64,
+        "_atom_site.occupancy": "float64",
+        "_atom_site.pdbx_PDB_model_num": np.int32,
+        "_cell.length_a": float,
+    }
+    for typed_sdict in [
+        mmcif2dict(cif_file, dtypes=dtypes),
+        MMCIF2Dict(cif_file.as_posix(), dtypes=dtypes),
+    ]:
+        assert typed_sdict.keys() == sdict.keys()
+        for key, dtype in dtypes.items():
+            values = np.atleast_1d(typed_sdict[key])
+            assert values.dtype == np.dtype(dtype)
+            assert values.tolist() == np.atleast_1d(np.array(sdict[key], dtype=dtype)).tolist()
+        for key in sdict.keys() - dtypes.keys():
+            assert typed_sdict[key] == sdict[key]
+
+
+def test_mmcif2dict_dtypes_missing():
+    data = b"data_x\nloop_\n_a.x\n_a.n\n1.5 1\n? 2\n. -3\n-1.0E-2 +4\n"
+    sdict = mmcif2dict(data, dtypes={"_a.x": np.float64, "_a.n": np.int32})
+    assert np.array_equal(sdict["_a.x"], [1.5, np.nan, np.nan, -0.01], equal_nan=True)
+    assert sdict["_a.n"].tolist() == [1, 2, -3, 4]
+    with pytest.raises(ValueError):
+        mmcif2dict(data, dtypes={"_a.x": np.int32})
+    with pytest.raises(ValueError):
+        mmcif2dict(data, dtypes={"_a.x": np.float32})
@@ -2,9 +2,14 @@ import logging
 import os.path as op
 import unittest
 
+import numpy as np
+import pandas as pd
 import pytest
+from mmtf import parse
 
-from kmbio.PDB import MMCIFParser, MMTFParser
+from kmbio.PDB import MMCIFParser, MMTFParser, Structure, load
+from kmbio.PDB.parsers.mmtf_parser import get_from_decoded
+from kmbio.PDB.utils import sort_structure
 
 logger = logging.getLogger(__name__)
 
@@ -103,3 +108,103 @@ class SimpleParseMMTF(unittest.TestCase):
         """Parse 1A8O.mmtf"""
         structure = MMTFParser().get_structure("PDB/1A8O.mmtf")
         assert len(structure)
+
+
+@pytest.mark.parametrize("filename", ["PDB/1A8O.mmtf", "PDB/4CUP.mmtf", "PDB/4ZHL.mmtf"])
+@pytest.mark.parametrize("filters", [{}, {"altloc": "A", "skip_water": True}])
+def test_bulk_vs_decoder(filename, filters):
+    """Structures built from the decoded arrays match those built through the callbacks."""
+    structure = MMTFParser(**filters).get_structure(filename)
+    structure_ref = get_from_decoded(parse(filename), **filters)
+    assert structure.id == structure_ref.id
+    for residue, residue_ref in zip(structure.residues, structure_ref.residues):
+        assert residue.full_id == residue_ref.full_id
+        assert residue.resname == residue_ref.resname
+    atoms = list(structure.atoms)
+    atoms_ref = list(structure_ref.atoms)
+    assert len(atoms) == len(atoms_ref)
+    for atom, atom_ref in zip(atoms, atoms_ref):
+        assert atom.full_id == atom_ref.full_id
+        assert (atom.coord == atom_ref.coord).all()
+        assert (atom.bfactor, atom.occupancy, atom.altloc, atom.serial_number, atom.element) == (
+            atom_ref.bfactor,
+            atom_ref.occupancy,
+            atom_ref.altloc,
+            atom_ref.serial_number,
+            atom_ref.element,
+        )
+
+
+@pytest.mark.parametrize("filename", ["PDB/1A8O.mmtf", "PDB/4CUP.mmtf", "PDB/4ZHL.mmtf"])
+def test_get_dataframe(filename):
+    parser = MMTFParser(altloc="first")
+    df = parser.get_dataframe(filename)
+    pd.testing.assert_frame_equal(
+        Structure.from_dataframe(df).to_dataframe(), parser.get_structure(filename).to_dataframe()
+    )
+
+
+@pytest.mark.parametrize("filename", ["PDB/1A8O.mmtf", "PDB/4CUP.mmtf", "PDB/4ZHL.mmtf"])
+@pytest.mark.parametrize("filters", [{}, {"altloc": "first", "skip_hydrogen": True}])
+def test_bonds(filename, filters):
+    structure = MMTFParser(**filters).get_structure(filename)
+    assert len(structure.bonds) > 0
+    _check_bonds(structure)
+
+
+def test_bonds_follow_atoms():
+    """Bonds keep referring to the same atoms when the atom store is repacked."""
+    structure = load("PDB/4CUP.mmtf")
+    bonded_atoms = _bonded_atoms(structure)
+    # Selections only keep the bonds between selected atoms
+    selection = structure.select(chains=["A"])
+    _check_bonds(selection)
+    assert 0 < len(selection.bonds) < len(structure.bonds)
+    # (only the selected siblings of disordered atoms are copied)
+    selected_atoms = set(_atom_keys(selection))
+    assert {key[1] for key in selected_atoms} == {"A"}
+    assert _bonded_atoms(selection) == {
+        (a, b) for a, b in bonded_atoms if a in selected_atoms and b in selected_atoms
+    }
+    # Sorting changes the order of the atoms
+    sort_structure(structure)
+    _check_bonds(structure)
+    assert _bonded_atoms(structure) == bonded_atoms
+    # Bonds of detached atoms are dropped
+    chain = structure[0]["A"]
+    residue = chain.pop(next(iter(chain)).id)
+    _check_bonds(structure)
+    assert _bonded_atoms(structure) == {
+        (a, b) for a, b in bonded_atoms if residue.id not in (a[2], b[2]) or "A" not in (a[1], b[1])
+    }
+
+
+def _check_bonds(structure):
+    assert structure.bonds.shape == (len(structure.bond_orders), 2)
+    coord = structure.atom_store.coord
+    lengths = np.linalg.norm(coord[structure.bonds[:, 0]] - coord[structure.bonds[:, 1]], axis=1)
+    assert (lengths > 0.8).all() and (lengths < 2.1).all()
+    assert set(structure.bond_orders.tolist()) <= {1, 2, 3}
+
+
+def _atom_keys(structure):
+    return [
+        (a.parent.parent.parent.id, a.parent.parent.id, a.parent.id, a.name, a.altloc)
+        for a in structure.atom_store.atoms
+    ]
+
+
+def _bonded_atoms(structure):
+    keys = _atom_keys(structure)
+    return {(keys[i], keys[j]) for i, j in structure.bonds.tolist()}
+
+
+def test_bioassembly():
+    structure = load("PDB/4CUP.mmtf", bioassembly_id=1)
+    structure_ref = load("PDB/4CUP.cif", bioassembly_id=1, use_auth_id=True)
+    assert [(m.id, [c.id for c in m]) for m in structure] == [
+        (m.id, [c.id for c in m]) for m in structure_ref
+    ]
+    assert np.allclose(
+        [a.coord for a in structure.atoms], [a.coord for a in structure_ref.atoms], atol=1e-3
+    )
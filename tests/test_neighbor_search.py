@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import kmbio.PDB
+from kmbio.PDB import NeighborSearch, coordinate_index
+
+TESTS_DIR = Path(__file__).absolute().parent
+
+BACKENDS = ["grid", pytest.param("kdtree", marks=pytest.mark.skipif(
+    kmbio.PDB.tools.neighbor_search.cKDTree is None, reason="SciPy is not installed"
+))]
+
+
+@pytest.fixture(params=["1A8O.pdb", "1LCD.cif", "4CUP.cif"])
+def model(request):
+    return kmbio.PDB.load(TESTS_DIR.joinpath("PDB", request.param))[0]
+
+
+def _brute_force_pairs(coord, radius):
+    d = np.sqrt(((coord[:, None, :] - coord[None, :, :]) ** 2).sum(axis=2))
+    i, j = np.nonzero(np.triu(d <= radius, 1))
+    return np.c_[i, j]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("radius", [1.7, 4.0, 10.0])
+def test_search_all_indices(model, backend, radius):
+    ns = NeighborSearch(model, backend=backend)
+    coord = np.array([a.coord for a in ns.atoms])
+    assert len(ns.atoms) == len(list(a for r in model.residues for a in r.get_unpacked_list()))
+    assert (ns.search_all_indices(radius) == _brute_force_pairs(coord, radius)).all()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_search(model, backend):
+    ns = NeighborSearch(list(model.atoms), backend=backend)
+    center = ns.coord[len(ns.coord) // 2]
+    d = np.sqrt(((ns.coord - center) ** 2).sum(axis=1))
+    assert (ns.search_indices(center, 8.0) == np.flatnonzero(d <= 8.0)).all()
+    atoms = ns.search(center, 8.0)
+    assert atoms == [ns.atoms[i] for i in np.flatnonzero(d <= 8.0)]
+    residues = ns.search(center, 8.0, level="R")
+    assert len({id(r) for r in residues}) == len(residues)
+    assert {id(a.parent) for a in atoms} == {id(r) for r in residues}
+    assert ns.search(center, 8.0, level="M") == [model]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_search_all_levels(model, backend):
+    ns = NeighborSearch(model, backend=backend)
+    residue_pairs = ns.search_all(4.0, level="R")
+    assert all(r1 is not r2 for r1, r2 in residue_pairs)
+    assert len({(id(r1), id(r2)) for r1, r2 in residue_pairs}) == len(residue_pairs)
+    atom_pairs = ns.search_all(4.0)
+    assert {(id(a1.parent), id(a2.parent)) for a1, a2 in atom_pairs if a1.parent is not a2.parent}
+    assert ns.search_all(4.0, level="M") == []
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_query_nearest(backend):
+    random_state = np.random.RandomState(42)
+    coord = random_state.uniform(0, 50, size=(2000, 3))
+    points = random_state.uniform(-20, 70, size=(100, 3))
+    distances, indices = coordinate_index(coord, backend=backend).query_nearest(points)
+    d = np.sqrt(((points[:, None, :] - coord[None, :, :]) ** 2).sum(axis=2))
+    assert np.allclose(distances, d.min(axis=1))
+    assert (indices == d.argmin(axis=1)).all()
@@ -35,7 +35,10 @@ def _get_local_url(pdb_id, pdb_type):
 
 @pytest.mark.parametrize(
     "url, pdb_type",
-    [("ftp://ftp.wwpdb.org/pub/pdb/data/structures/divided/mmCIF/dk/4dkl.cif.gz", "cif")],
+    [
+        ("ftp://ftp.wwpdb.org/pub/pdb/data/structures/divided/mmCIF/dk/4dkl.cif.gz", "cif"),
+        ("/tmp/4dkl.kmb", "kmb"),
+    ],
 )
 def test_guess_pdb_type(url, pdb_type):
     assert guess_pdb_type(url) == pdb_type
@@ -104,3 +107,98 @@ def test_atom_defined_twice(pdb_id):
     """Tests for the ``Atom defined twice`` error."""
     s = kmbio.PDB.load("rcsb://{}.{}".format(pdb_id, "cif"))
     assert s
+
+
+@pytest.mark.parametrize("filename", ["PDB/1A8O.pdb", "PDB/3JQH.cif", "PDB/4CUP.mmtf"])
+def test_save_cif(filename, tmp_path):
+    """Make sure that structures saved as mmCIF files are loaded back unchanged."""
+    s1 = kmbio.PDB.load(filename)
+    kmbio.PDB.save(s1, tmp_path / "structure.cif")
+    s2 = kmbio.PDB.load(tmp_path / "structure.cif")
+    assert allequal(s1, s2)
+
+
+@pytest.mark.parametrize("filename", ["PDB/1A8O.pdb", "PDB/4ZHL.mmtf", "PDB/1LCD.pdb"])
+def test_save_cif_label_columns(filename, tmp_path):
+    """Make sure that model numbers start at 1 and that hetero residues have no label_seq_id."""
+    s1 = kmbio.PDB.load(filename)
+    kmbio.PDB.save(s1, tmp_path / "structure.cif")
+    mmcif_dict = kmbio.PDB.mmcif2dict(str(tmp_path / "structure.cif"))
+    model_nums = [int(num) for num in mmcif_dict["_atom_site.pdbx_PDB_model_num"]]
+    assert sorted(set(model_nums)) == list(range(1, len(s1) + 1))
+    for group, label_seq_id, auth_seq_id in zip(
+        mmcif_dict["_atom_site.group_PDB"],
+        mmcif_dict["_atom_site.label_seq_id"],
+        mmcif_dict["_atom_site.auth_seq_id"],
+    ):
+        assert label_seq_id == ("." if group == "HETATM" else auth_seq_id)
+
+
+def test_save_cif_past_pdb_limits(tmp_path):
+    """Make sure that mmCIF files can hold more atoms and chains than PDB files."""
+    chain = kmbio.PDB.load("PDB/1A8O.pdb")[0]["A"]
+    s1 = kmbio.PDB.Structure("big")
+    s1.add(kmbio.PDB.Model(0, 1))
+    for i in range(160):
+        chain_copy = chain.copy()
+        chain_copy.id = "C{}".format(i)
+        s1[0].add(chain_copy)
+    assert len(list(s1.atoms)) > 99999
+    kmbio.PDB.save(s1, tmp_path / "big.cif", fmt="cif")
+    s2 = kmbio.PDB.load(tmp_path / "big.cif")
+    assert allequal(s1, s2)
+
+
+@pytest.mark.parametrize(
+    "filename", ["PDB/1A8O.pdb", "PDB/3JQH.cif", "PDB/4CUP.mmtf", "PDB/a_structure.pdb"]
+)
+def test_save_kmb(filename, tmp_path):
+    """Make sure that structures saved as .kmb files are loaded back unchanged."""
+    s1 = kmbio.PDB.load(filename)
+    kmbio.PDB.save(s1, tmp_path / "structure.kmb")
+    s2 = kmbio.PDB.load(tmp_path / "structure.kmb")
+    assert s2.id == s1.id
+    assert allequal(s1, s2)
+    assert s2.header == s1.header
+    if s1.bonds is None:
+        assert s2.bonds is None
+    else:
+        assert (s2.bonds == s1.bonds).all()
+        assert (s2.bond_orders == s1.bond_orders).all()
+    # Disordered atoms and residues keep all siblings, and the same siblings are selected
+    store1, store2 = s1.atom_store, s2.atom_store
+    assert (store2.coord == store1.coord).all()
+    for key in ["altloc", "resname", "selected_sibling"]:
+        assert (store2.annotations[key] == store1.annotations[key]).all()
+    for atom1, atom2 in zip(store1.atoms, store2.atoms):
+        assert type(atom2.parent.parent[atom2.parent.id]) is type(
+            atom1.parent.parent[atom1.parent.id]
+        )
+        assert type(atom2.parent[atom2.id]) is type(atom1.parent[atom1.id])
+        assert (atom2.serial_number, atom2.fullname, atom2.disordered) == (
+            atom1.serial_number,
+            atom1.fullname,
+            atom1.disordered,
+        )
+
+
+@pytest.mark.parametrize(
+    "filename, kwargs",
+    [
+        ("PDB/3JQH.cif", {"chains": "A"}),
+        ("PDB/3JQH.cif", {"altloc": "B"}),
+        ("PDB/3JQH.cif", {"altloc": "first", "skip_water": True, "skip_hydrogen": True}),
+        ("PDB/4CUP.mmtf", {"chains": "A", "skip_hydrogen": True}),
+        ("PDB/4CUP.mmtf", {"bioassembly_id": 1}),
+        ("PDB/3JQH.cif", {"bioassembly_id": 1}),
+        ("PDB/4ZHL.cif", {"bioassembly_id": 1}),
+    ],
+)
+def test_load_kmb_filters(filename, kwargs, tmp_path):
+    """Make sure that .kmb files are filtered like the files that they were made from."""
+    kmbio.PDB.save(kmbio.PDB.load(filename), tmp_path / "structure.kmb")
+    s1 = kmbio.PDB.load(filename, **kwargs)
+    s2 = kmbio.PDB.load(tmp_path / "structure.kmb", **kwargs)
+    assert allequal(s1, s2)
+    if s1.bonds is not None:
+        assert (s2.bonds == s1.bonds).all()
@@ -0,0 +1,201 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import kmbio.PDB
+from kmbio.PDB import AtomSelection, PDBException
+
+TESTS_DIR = Path(__file__).absolute().parent
+
+
+@pytest.fixture(params=["1A8O.pdb", "2BEG.pdb", "1LCD.cif", "4CUP.cif"])
+def structure(request):
+    return kmbio.PDB.load(TESTS_DIR.joinpath("PDB", request.param))
+
+
+def _atom_rows(structure):
+    """Reference annotations, collected using the object API."""
+    return [
+        (model.id, chain.id, residue.id, residue.resname, atom.element, atom.altloc.strip(), atom)
+        for model in structure
+        for chain in model
+        for residue in chain.get_unpacked_list()
+        for atom in residue.get_unpacked_list()
+    ]
+
+
+def test_annotations(structure):
+    store = structure.atom_store
+    annotations = store.annotations
+    rows = _atom_rows(structure)
+    assert [row[-1] for row in rows] == store.atoms
+    assert list(annotations["model_id"]) == [row[0] for row in rows]
+    assert list(annotations["chain_id"]) == [row[1] for row in rows]
+    assert list(zip(annotations["hetflag"], annotations["resseq"], annotations["icode"])) == [
+        row[2] for row in rows
+    ]
+    assert list(annotations["resname"]) == [row[3] for row in rows]
+    assert list(annotations["element"]) == [row[4] for row in rows]
+    assert list(annotations["altloc"]) == [row[5] for row in rows]
+    assert [store.residues[i] for i in store.residue_index] == [a.parent for a in store.atoms]
+
+
+def test_select_mask(structure):
+    rows = _atom_rows(structure)
+    chain_id = rows[0][1]
+    mask = kmbio.PDB.select_mask(structure, chains=chain_id, residues=[range(5, 15), 20])
+    assert list(mask) == [
+        row[1] == chain_id and (5 <= row[2][1] < 15 or row[2][1] == 20) for row in rows
+    ]
+    mask = kmbio.PDB.select_mask(structure, elements=["c", "N"], hetatms=False)
+    assert list(mask) == [row[4] in {"C", "N"} and row[2][0] == " " for row in rows]
+    mask = kmbio.PDB.select_mask(structure, altlocs=["", "A"])
+    assert list(mask) == [row[5] in {"", "A"} for row in rows]
+    mask = kmbio.PDB.select_mask(structure, resnames="HOH", hetatms=True)
+    assert list(mask) == [row[3] == "HOH" for row in rows]
+
+
+def test_select_numpy_scalars(structure):
+    """Values taken from `to_dataframe()` are NumPy scalars."""
+    rows = _atom_rows(structure)
+    model_id = next(iter(structure)).id
+    resseq = rows[0][2][1]
+    mask = kmbio.PDB.select_mask(structure, models=np.int64(model_id), residues=np.int64(resseq))
+    expected = kmbio.PDB.select_mask(structure, models=model_id, residues=int(resseq))
+    assert mask.any()
+    assert (mask == expected).all()
+    new_structure = structure.select(models=np.int64(model_id), residues=np.int64(resseq))
+    assert len(list(new_structure.atoms)) == mask.sum()
+
+
+def test_select_within(structure):
+    rows = _atom_rows(structure)
+    chain_id = rows[0][1]
+    mask = kmbio.PDB.select_mask(structure, within=(4.5, {"chains": chain_id, "residues": 10}))
+    coords = np.array([row[-1].coord for row in rows])
+    expected = np.zeros(len(rows), dtype=bool)
+    for model in structure:
+        in_model = np.array([row[0] == model.id for row in rows])
+        is_target = in_model & [row[1] == chain_id and row[2][1] == 10 for row in rows]
+        if is_target.any():
+            d = np.sqrt(((coords[:, None, :] - coords[None, is_target, :]) ** 2).sum(axis=2))
+            expected |= in_model & (d.min(axis=1) <= 4.5)
+    assert (mask == expected).all()
+
+
+def test_select_hetatms_within(structure):
+    chain_id = next(structure.chains).id
+    selection = structure.select(chains=chain_id, hetatms=5.0, view=True)
+    assert isinstance(selection, AtomSelection)
+    protein = structure.select(chains=chain_id, hetatms=False, view=True)
+    store = structure.atom_store
+    added = selection.mask & ~kmbio.PDB.select_mask(structure, chains=chain_id)
+    added_residues = {
+        id(store.atoms[i].parent): store.atoms[i].parent for i in np.flatnonzero(added)
+    }
+    for residue in added_residues.values():
+        assert residue.id[0] != " "
+        d = np.sqrt(((_residue_coord(residue)[:, None] - protein.coord[None]) ** 2).sum(axis=2))
+        assert d.min() <= 5.0
+        # Whole residues are added
+        assert all(selection.mask[a._store_start] for a in residue.get_unpacked_list())
+
+
+def _residue_coord(residue):
+    return np.array([a.coord for a in residue.get_unpacked_list()])
+
+
+def test_select_structure(structure):
+    chain = next(structure.chains)
+    new_structure = structure.select(chains=chain.id, elements="C")
+    assert new_structure is not structure
+    assert [c.id for c in new_structure.chains] == [chain.id] * len(structure)
+    new_chain = next(new_structure.chains)
+    assert [r.id for r in new_chain] == [r.id for r in chain if any(a.element == "C" for a in r)]
+    for atom in new_structure.atoms:
+        assert atom.element == "C"
+        assert atom.parent.parent.id == chain.id
+    # Copies are independent from the original structure
+    atom = next(new_structure.atoms)
+    original_coord = structure[0][chain.id][atom.parent.id][atom.name].coord.copy()
+    atom.coord = atom.coord + 1
+    assert np.allclose(structure[0][chain.id][atom.parent.id][atom.name].coord, original_coord)
+
+
+def test_select_empty(structure):
+    new_structure = structure.select(chains="nonexistent")
+    assert new_structure.id == structure.id
+    assert len(new_structure) == 0
+    with pytest.raises(PDBException):
+        kmbio.PDB.extract_atoms(structure, np.ones(3, dtype=bool))
+    with pytest.raises(PDBException):
+        structure.select(hetatms="yes")
+
+
+def _check_filtered(load):
+    """Compare structures loaded with filters to atoms selected from the full structure."""
+    structure = load()
+    model_id = list(structure)[-1].id
+    chain_ids = sorted({chain.id for chain in structure[model_id]})[:2]
+    altlocs = sorted(set(structure.atom_store.annotations["altloc"]) - {""})[:1]
+    for query in [
+        {"models": model_id},
+        {"chains": chain_ids},
+        {"altloc": altlocs},
+        {"models": [model_id], "chains": chain_ids[0], "altloc": altlocs},
+        {"skip_water": True, "skip_hydrogen": True},
+        {"altloc": "first"},
+        {"altloc": "highest_occupancy", "skip_water": True},
+    ]:
+        filtered = load(**query)
+        mask = _reference_mask(structure, **query)
+        expected = [row for row, selected in zip(_atom_rows(structure), mask) if selected]
+        assert [row[:-1] for row in _atom_rows(filtered)] == [row[:-1] for row in expected]
+        assert np.array_equal(filtered.atom_store.coord, structure.atom_store.coord[mask])
+
+
+def _reference_mask(
+    structure, models=None, chains=None, altloc=None, skip_water=False, skip_hydrogen=False
+):
+    rows = _atom_rows(structure)
+    mask = kmbio.PDB.select_mask(structure, models=models, chains=chains)
+    if skip_water:
+        mask &= [row[2][0] != "W" for row in rows]
+    if skip_hydrogen:
+        mask &= [row[4] not in ("H", "D") for row in rows]
+    if altloc in ("first", "highest_occupancy"):
+        # Occupancies of every alternate location, in order of appearance, for every residue
+        occupancies = {}
+        for row, selected in zip(rows, mask):
+            if selected and row[5]:
+                residue_occupancies = occupancies.setdefault(row[:2] + row[2][1:], {})
+                residue_occupancies.setdefault(row[5], []).append(row[-1].occupancy)
+        selected_altlocs = {
+            key: max(value, key=lambda a: np.mean(value[a]) if altloc != "first" else 0)
+            for key, value in occupancies.items()
+        }
+        mask &= [not row[5] or selected_altlocs[row[:2] + row[2][1:]] == row[5] for row in rows]
+    elif altloc is not None:
+        mask &= kmbio.PDB.select_mask(structure, altlocs=[""] + altloc)
+    return mask
+
+
+@pytest.mark.parametrize(
+    "filename",
+    ["1A8O.pdb", "1LCD.pdb", "2BEG.pdb", "1LCD.cif", "4CUP.cif", "3JQH.cif", "4ZHL.mmtf"],
+)
+def test_load_filtered(filename):
+    pdb_file = TESTS_DIR.joinpath("PDB", filename)
+    if filename.endswith(".mmtf"):
+        _check_filtered(lambda **kwargs: kmbio.PDB.MMTFParser(**kwargs).get_structure(pdb_file))
+    else:
+        _check_filtered(lambda **kwargs: kmbio.PDB.load(pdb_file, **kwargs))
+
+
+def test_load_filtered_altlocs(tmp_path):
+    pdb_file = tmp_path.joinpath("4cup.pdb").as_posix()
+    io = kmbio.PDB.PDBIO()
+    io.set_structure(kmbio.PDB.load(TESTS_DIR.joinpath("PDB", "4CUP.cif")))
+    io.save(pdb_file)
+    _check_filtered(lambda **kwargs: kmbio.PDB.load(pdb_file, **kwargs))
@@ -42,3 +42,37 @@ def test_df_s_df(df):
     structure = Structure.from_dataframe(df)
     df_ = structure.to_dataframe()
     assert df.equals(df_)
+
+
+def test_to_dataframe_categorical(structure):
+    df = structure.to_dataframe()
+    df_cat = structure.to_dataframe(categorical=True)
+    for column in ["chain_id", "residue_resname", "atom_name"]:
+        assert isinstance(df_cat[column].dtype, pd.CategoricalDtype)
+        assert (df_cat[column].astype(str) == df[column]).all()
+    assert df_cat.drop(columns=["chain_id", "residue_resname", "atom_name"]).equals(
+        df.drop(columns=["chain_id", "residue_resname", "atom_name"])
+    )
+
+
+def test_to_dataframe_disordered(structure):
+    """Only the selected siblings of disordered atoms and residues are included."""
+    df = structure.to_dataframe()
+    atoms = list(structure.atoms)
+    assert len(df) == len(atoms)
+    assert list(df["atom_name"]) == [a.name for a in atoms]
+    assert list(df["atom_altloc"]) == [a.altloc for a in atoms]
+    assert (df[["atom_x", "atom_y", "atom_z"]].values == [a.coord for a in atoms]).all()
+
+
+def test_from_dataframe_does_not_modify_input(df):
+    df_before = df.copy()
+    Structure.from_dataframe(df)
+    assert df.equals(df_before)
+
+
+def test_from_dataframe_shuffled(df):
+    """Rows are ordered by their model, chain, residue and atom indices."""
+    structure = Structure.from_dataframe(df)
+    structure_ = Structure.from_dataframe(df.sample(frac=1, random_state=42))
+    assert structure.to_dataframe().equals(structure_.to_dataframe())
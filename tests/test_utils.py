@@ -3,8 +3,9 @@ from pathlib import Path
 
 import pytest
 
+import kmbio.PDB
 from kmbio.PDB.io.loaders import get_parser
-from kmbio.PDB.utils import open_url, sort_ordered_dict
+from kmbio.PDB.utils import open_url, sort_ordered_dict, sort_structure
 
 TESTS_DIR = Path(__file__).absolute().parent
 
@@ -26,6 +27,38 @@ def test_sort_ordered_dict(unsorted_dict, sorted_dict):
     assert unsorted_dict == sorted_dict
 
 
+def test_sort_ordered_dict_key():
+    ordered_dict = OrderedDict([((" ", 3, " "), 0), (("W", 1, " "), 1), ((" ", 2, "A"), 2)])
+    sort_ordered_dict(ordered_dict, key=lambda residue_id: residue_id[1])
+    assert list(ordered_dict.values()) == [1, 2, 0]
+    # Stable with respect to equal keys
+    ordered_dict = OrderedDict([("b", 0), ("a", 1), ("c", 2), ("d", 3)])
+    sort_ordered_dict(ordered_dict, key=lambda key: key in {"b", "d"})
+    assert list(ordered_dict) == ["a", "c", "b", "d"]
+
+
+def test_sort_structure():
+    structure = kmbio.PDB.load(TESTS_DIR.joinpath("PDB", "4CUP.cif"))
+    store = structure.atom_store
+    chain = structure[0]["A"]
+    residue_ids = list(chain._children)
+    for residue_id in residue_ids[::2]:
+        chain._children.move_to_end(residue_id)
+    sort_structure(structure)
+    assert list(chain._children) == sorted(residue_ids)
+    for residue in chain:
+        assert list(residue._children) == sorted(residue._children)
+    assert not store.valid
+    assert structure.atom_store.atoms == [
+        a for r in chain.get_unpacked_list() for a in r.get_unpacked_list()
+    ] + [
+        a
+        for c in list(structure[0])[1:]
+        for r in c.get_unpacked_list()
+        for a in r.get_unpacked_list()
+    ]
+
+
 @pytest.mark.parametrize(
     "pdb_url, pdb_type",
     sum(